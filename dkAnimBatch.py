@@ -0,0 +1,228 @@
+##############################################################################################################
+#NAME: dkAnimBatch
+#AUTHOR: David Saber, www.dreamcraftdigital.com, based on Dan Erwin and Daniel Kramer's code.
+#SCRIPTING LANGUAGE: Maya Python (mayapy), or plain Python 3 with --maya fake
+#USAGE: Non-interactive export and import of many .dkanim files, with no window and no dialog :
+#           mayapy dkAnimBatch.py jobs.json [--workers 4] [--summary results.json] [--maya standalone|fake|module:function]
+#                                            [--log-progress]
+#       jobs.json holds a list of jobs (or {"jobs": [...]}), each job is run by dkAnimEhEh.dk_animWrite or dk_animRead :
+#           {"action": "export", "scene": "shot010.ma", "selection": ["|rig|ctl"], "file": "shot010.dkanim",
+#            "hierarchy": true, "binary": false, "compression": null, "reduce": {"rotate": 0.1}, "start": 1001, "end": 1100,
+#            "incremental": true, "share": true}
+#           {"action": "import", "scene": "shot010_v2.ma", "file": "shot010.dkanim", "save": "shot010_v3.ma",
+#            "paths": true, "unKeyed": false, "search": "", "replace": "", "prefix": "", "topNodes": false, "scope": null,
+#            "regexRules": [["^old_", "new_"]], "mappingFile": "names.txt", "fast": true}
+#       Jobs are run in a pool of worker processes, each one with its own Maya session. The result and timing of each
+#       job is printed and written to the summary file. The exit code is 1 if any job failed.
+#       "start", "end" and "moveTo" limit the keys exported or imported to a time range, moved to a new start time, see
+#       dkAnimParser.dk_timeRange.
+#       "share" writes identical curves once (dkAnimEhEh.DKANIM_SHARE_CURVES by default, off), older versions of dkAnim skip
+#       the channels referencing a curve. Compressed files do not share curves.
+#       "incremental" only formats the curves that changed since the previous incremental export to the same file.
+#       "reduce" is true, or a dictionary of tolerances per attribute type, to reduce the keys of the export, see dkAnimReduce.
+#       "engine" is the dkAnimImport engine of an import job : "cmds" by default, "api" keys new curves through OpenMaya (faster,
+#       not undoable, which does not matter when the scene is saved by the job).
+#       "fast" imports in the fast import mode (dkAnimScene.DkFastImport), the summary of the job gives the time spent applying the
+#       animation ("applySeconds") to compare both modes.
+#       "profile" times the phases and maya.cmds commands of the job and writes a JSON report, see dkAnimProfile, the name of
+#       the report is in the summary of the job ("profile").
+#       --log-progress logs the progress of each job every few seconds (dkAnimProgress.DkLoggingReporter).
+#       --maya fake runs the jobs on dkAnimFakeMaya (no Maya needed), module:function on the maya.cmds stand-in that
+#       function returns, to test the batch without Maya.
+##############################################################################################################
+
+
+# Imports
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+try:
+    from . import dkAnimParser
+    from . import dkAnimProgress
+except ImportError:
+    import dkAnimParser
+    import dkAnimProgress
+
+# Keys of the import jobs that are passed to dkAnimEhEh.DkReadOptions, and their default value
+DK_READ_OPTION_DEFAULTS = {"doReplace": None, "search": "", "replace": "", "prefix": "", "topNodes": False, "paths": True, "unKeyed": False, "scope": None,
+                           "regexRules": [], "mappingFile": "", "fast": False, "engine": None}
+
+# dkAnimEhEh module of the worker process, imported by _dk_initWorker once maya.cmds is available
+_dk_module = None
+# Error raised by _dk_initWorker, reported by every job of the worker (a failing pool initializer would be restarted forever)
+_dk_initError = None
+# True to log the progress of the jobs, set by _dk_initWorker
+_dk_logProgress = False
+
+
+def dk_loadManifest(filename):
+    # Returns the list of jobs of a manifest file, see header
+    with open(filename, "r") as stream:
+        manifest = json.load(stream)
+    if isinstance(manifest, dict):
+        manifest = manifest.get("jobs", [])
+    for i, job in enumerate(manifest):
+        if job.get("action") not in ("export", "import"):
+            raise ValueError("Job {} : action must be 'export' or 'import', not {!r}".format(i, job.get("action")))
+        if not job.get("file"):
+            raise ValueError("Job {} : no file".format(i))
+    return manifest
+
+
+def dk_installMaya(maya_spec):
+    # Makes maya.cmds importable in this process. maya_spec is "standalone", "fake" or "module:function".
+    if maya_spec == "standalone":
+        import maya.standalone
+        maya.standalone.initialize(name="python")
+        return
+    try:
+        from . import dkAnimFakeMaya
+    except ImportError:
+        import dkAnimFakeMaya
+    if maya_spec == "fake":
+        dkAnimFakeMaya.dk_installFakeMaya()
+        return
+    module_name, _, function_name = maya_spec.partition(":")
+    if not function_name:
+        raise ValueError("--maya must be standalone, fake or module:function, not {!r}".format(maya_spec))
+    module = __import__(module_name, fromlist=[function_name])
+    dkAnimFakeMaya.dk_installFakeMaya(getattr(module, function_name)())
+
+
+def _dk_initWorker(maya_spec, log_progress=False):
+    # Pool initializer : one Maya session per worker process
+    global _dk_module
+    global _dk_initError
+    global _dk_logProgress
+    _dk_logProgress = log_progress
+    if log_progress:
+        logging.basicConfig(level=logging.INFO, format="dkAnimBatch[%(process)d]: %(message)s")
+    try:
+        dk_installMaya(maya_spec)
+        try:
+            from . import dkAnimEhEh
+        except ImportError:
+            import dkAnimEhEh
+        _dk_module = dkAnimEhEh
+    except Exception as e:
+        _dk_initError = "Maya initialization failed, {}: {}".format(type(e).__name__, e)
+
+
+def dk_readOptions(job):
+    # DkReadOptions of an import job, the keys missing from the job take their DK_READ_OPTION_DEFAULTS value
+    options = dict(DK_READ_OPTION_DEFAULTS)
+    options.update((key, job[key]) for key in DK_READ_OPTION_DEFAULTS if key in job)
+    if options["doReplace"] is None:
+        options["doReplace"] = bool(options["search"])
+    if options["scope"] is not None:
+        options["scope"] = frozenset(options["scope"])
+    options["regexRules"] = tuple((pattern, replacement) for pattern, replacement in options["regexRules"])
+    options["timeRange"] = dk_timeRange(job)
+    return _dk_module.DkReadOptions(**options)
+
+
+def dk_timeRange(job):
+    # dkAnimParser.DkTimeRange of the "start", "end" and "moveTo" keys of a job, None when it has none
+    return dkAnimParser.dk_timeRange(job.get("start"), job.get("end"), job.get("moveTo"))
+
+
+def dk_runJob(job):
+    # Runs one job in the current Maya session. Never raises : errors are returned in the result of the job.
+    index, job = job
+    result = {"job": index, "action": job["action"], "scene": job.get("scene"), "file": job["file"], "ok": False, "error": None}
+    start = time.perf_counter()
+    if _dk_initError is not None:
+        result["error"] = _dk_initError
+        result["seconds"] = 0.0
+        return result
+    cmds = _dk_module.cmds
+    reporter = dkAnimProgress.DkLoggingReporter() if _dk_logProgress else dkAnimProgress.DkProgressReporter()
+    try:
+        if job.get("scene"):
+            cmds.file(job["scene"], open=True, force=True, prompt=False)
+        result["openSeconds"] = time.perf_counter() - start
+        if job.get("selection"):
+            cmds.select(job["selection"], replace=True)
+        elif "selection" in job:
+            cmds.select(clear=True)
+        reporter.begin("job {} {} {}".format(index, job["action"], job["file"]), 0)
+        if job["action"] == "export":
+            if not cmds.ls(sl=True):
+                raise RuntimeError("No objects selected to export animation for.")
+            directory = os.path.dirname(os.path.abspath(job["file"]))
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            result["summary"] = _dk_module.dk_animWrite(job["file"], job.get("hierarchy", True), job.get("binary", False), compression=job.get("compression"), reporter=reporter, reduce=job.get("reduce"), time_range=dk_timeRange(job), incremental=job.get("incremental", False), share=job.get("share"), profile=job.get("profile"))
+        else:
+            if not os.path.isfile(job["file"]):
+                raise RuntimeError("File Doesn't Exist")
+            options = dk_readOptions(job)
+            result["summary"] = _dk_module.dk_animRead(job["file"], options.paths, options, interactive=False, reporter=reporter, profile=job.get("profile"))
+            if job.get("save"):
+                cmds.file(rename=job["save"])
+                cmds.file(save=True, force=True)
+        reporter.end()
+        result["ok"] = True
+    except Exception as e:
+        result["error"] = "{}: {}".format(type(e).__name__, e)
+        result["traceback"] = traceback.format_exc()
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def dk_runBatch(jobs, workers=1, maya_spec="standalone", log_progress=False):
+    # Runs the jobs and returns their results, in the order of the jobs. workers=1 runs them in this process.
+    indexed_jobs = list(enumerate(jobs))
+    results = []
+    if workers <= 1:
+        _dk_initWorker(maya_spec, log_progress)
+        for job in indexed_jobs:
+            results.append(dk_runJob(job))
+            dk_printResult(results[-1])
+        return results
+    pool = multiprocessing.Pool(workers, initializer=_dk_initWorker, initargs=(maya_spec, log_progress))
+    try:
+        # Results are printed as jobs finish, whatever the order
+        for result in pool.imap_unordered(dk_runJob, indexed_jobs):
+            dk_printResult(result)
+            results.append(result)
+    finally:
+        pool.close()
+        pool.join()
+    results.sort(key=lambda result: result["job"])
+    return results
+
+
+def dk_printResult(result):
+    state = "ok" if result["ok"] else "FAILED " + result["error"]
+    print("dkAnimBatch: job {} {} {} : {} ({:.2f} s)".format(result["job"], result["action"], result["file"], state, result["seconds"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Non-interactive export and import of .dkanim files")
+    parser.add_argument("manifest", help="JSON list of jobs, see the header of dkAnimBatch.py")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes, each one runs its own Maya session")
+    parser.add_argument("--summary", help="JSON file receiving the result and timing of every job")
+    parser.add_argument("--maya", default="standalone", help="standalone (mayapy), fake (dkAnimFakeMaya) or module:function returning a maya.cmds stand-in")
+    parser.add_argument("--log-progress", action="store_true", help="log the progress of each job every few seconds")
+    args = parser.parse_args(argv)
+    jobs = dk_loadManifest(args.manifest)
+    start = time.perf_counter()
+    results = dk_runBatch(jobs, args.workers, args.maya, args.log_progress)
+    failed = [result for result in results if not result["ok"]]
+    summary = {"manifest": args.manifest, "workers": args.workers, "jobs": len(results), "failed": len(failed),
+               "seconds": time.perf_counter() - start, "results": results}
+    print("dkAnimBatch: {} jobs, {} failed, {:.2f} s".format(len(results), len(failed), summary["seconds"]))
+    if args.summary:
+        with open(args.summary, "w") as stream:
+            json.dump(summary, stream, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
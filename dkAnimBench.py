@@ -0,0 +1,478 @@
+##############################################################################################################
+#NAME: dkAnimBench
+#AUTHOR: David Saber, www.dreamcraftdigital.com, based on Dan Erwin and Daniel Kramer's code.
+#SCRIPTING LANGUAGE: Python (no Maya import)
+#USAGE: Timing of the dkAnimEhEh file handling outside of Maya, from a plain Python 3 interpreter :
+#       python dkAnimBench.py parse big.dkanim [--no-keys] [--repeat 3]
+#       python dkAnimBench.py apply big.dkanim      (maya.cmds calls per key of the import engines, with dkAnimFakeMaya)
+#       python dkAnimBench.py format big.dkanim     (dkAnimWriter formatting of the curves of a file, as dk_animWrite does)
+#       python dkAnimBench.py statics [--objects 200] [--attrs 40]   (maya.cmds calls of the static values export, with dkAnimFakeMaya)
+#       python dkAnimBench.py generate out.dkanim --nodes 100 --channels 10 --keys 200 [--weighted 0.1] [--fixed 0.25] [--statics 2]
+#       python dkAnimBench.py suite --scale 100x10x200 [--scale ...] [--json results.json]
+#           for each scale (nodes x channels x keys), generates a synthetic file and measures the parse and format
+#           throughput, and the maya.cmds calls per key and per channel of dk_animRead, dk_animWrite, dk_loadChannels and
+#           dre_fileLineCount on a dkAnimFakeMaya.DkFakeScene holding the channels of the file. --json writes the results,
+#           one object per scale, for regression tracking.
+#       python dkAnimBench.py compression big.dkanim [--mbps 40]   (bytes to read and parse time, plain and compressed)
+#       python dkAnimBench.py check      (checks of the file handling on synthetic files, exit code 1 on failure)
+##############################################################################################################
+
+
+# Imports
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+try:
+    from . import dkAnimBinary
+    from . import dkAnimParser
+    from . import dkAnimWriter
+except ImportError:
+    import dkAnimBinary
+    import dkAnimParser
+    import dkAnimWriter
+
+
+def dk_benchParse(filename, keys=True, repeat=1):
+    # Parses filename repeat times with dkAnimParser and returns the timings of the fastest run
+    size = os.path.getsize(filename)
+    best = None
+    for run in range(repeat):
+        counts = {"sceneUnit": 0, "static": 0, "anim": 0}
+        key_count = 0
+        start = time.perf_counter()
+        for record in dkAnimParser.dk_iterDkAnim(filename, keys=keys):
+            counts[record.kind] += 1
+            if record.kind == "anim":
+                key_count += record.keyCount
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    best = max(best, 1e-9)
+    return {
+        "file": filename,
+        "bytes": size,
+        "keys_parsed": keys,
+        "seconds": best,
+        "curves": counts["anim"],
+        "statics": counts["static"],
+        "keys": key_count,
+        "mb_per_second": size / best / (1024.0 * 1024.0),
+        "keys_per_second": key_count / best,
+    }
+
+
+def dk_benchApply(filename, engines=("keys", "cmds")):
+    # Counts the maya.cmds calls made by each dkAnimImport engine to key all the curves of filename.
+    # The "api" engine makes no cmds call but needs a Maya session, it can not be measured here.
+    try:
+        from . import dkAnimFakeMaya
+    except ImportError:
+        import dkAnimFakeMaya
+    cmds = dkAnimFakeMaya.dk_installFakeMaya()
+    try:
+        from . import dkAnimImport
+    except ImportError:
+        import dkAnimImport
+    curves = [record for record in dkAnimParser.dk_iterDkAnim(filename) if record.kind == "anim"]
+    key_count = max(sum(curve.keyCount for curve in curves), 1)
+    result = {"file": filename, "curves": len(curves), "keys": key_count}
+    for engine in engines:
+        cmds.dk_reset()
+        start = time.perf_counter()
+        for curve in curves:
+            dkAnimImport.dk_applyCurve(curve.node, curve.attr, curve, engine)
+        result[engine + "_seconds"] = time.perf_counter() - start
+        result[engine + "_calls"] = cmds.dk_total()
+        result[engine + "_calls_per_key"] = cmds.dk_total() / float(key_count)
+    return result
+
+
+def dk_benchFormat(filename, repeat=1):
+    # Formats all the records of filename with dkAnimWriter, in memory, and returns the timings of the fastest run
+    records = list(dkAnimParser.dk_iterDkAnim(filename))
+    key_count = sum(record.keyCount for record in records if record.kind == "anim")
+    best = None
+    size = 0
+    for run in range(repeat):
+        start = time.perf_counter()
+        size = 0
+        for record in records:
+            if record.kind == "anim":
+                size += len(dkAnimWriter.dk_formatCurve(record))
+            elif record.kind == "static":
+                size += len(dkAnimWriter.dk_formatStatic(record))
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    best = max(best, 1e-9)
+    return {"file": filename, "keys": key_count, "characters": size, "seconds": best, "keys_per_second": key_count / best, "mb_per_second": size / best / (1024.0 * 1024.0)}
+
+
+def dk_benchCompression(filename, codecs=("gzip", "bz2", "xz"), repeat=1, mbps=None):
+    # Writes the records of filename again, plain and with each codec, in a temporary folder, and parses each copy.
+    # bytes is what a read has to fetch from the disk. The copies are parsed from the local disk (most likely from the
+    # system cache), so with mbps, read_seconds estimates the time to fetch those bytes from a share of that speed.
+    records = list(dkAnimParser.dk_iterDkAnim(filename))
+    directory = tempfile.mkdtemp(prefix="dkAnimBench")
+    results = []
+    try:
+        for codec in (None,) + tuple(codecs):
+            if codec is not None and dkAnimParser.DK_COMPRESSIONS[codec][1] is None:
+                continue
+            copy = os.path.join(directory, "{}.dkanim".format(codec or "plain"))
+            start = time.perf_counter()
+            writer = dkAnimWriter.dk_openDkAnimWriter(copy, filename, compression=codec)
+            for record in records:
+                writer.writeRecord(record)
+            writer.close()
+            write_seconds = time.perf_counter() - start
+            parse = dk_benchParse(copy, repeat=repeat)
+            result = {"file": filename, "compression": codec or "none", "bytes": parse["bytes"], "write_seconds": write_seconds,
+                      "parse_seconds": parse["seconds"], "keys_per_second": parse["keys_per_second"]}
+            result["ratio"] = float(results[0]["bytes"]) / parse["bytes"] if results else 1.0
+            if mbps:
+                result["read_seconds"] = parse["bytes"] / (mbps * 1024.0 * 1024.0)
+                result["total_seconds"] = result["read_seconds"] + parse["seconds"]
+            results.append(result)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def dk_benchStatics(objects=200, attrs=40, connected=0.25, engines=("attrs", "cmds")):
+    # Counts the maya.cmds calls made by dkAnimExport.dk_queryStatics to export the static values of a synthetic scene :
+    # objects transforms under one group, with attrs animatable channels each, the first connected fraction of them keyed.
+    # "attrs" is the former per channel export, the "api" engine needs a Maya session.
+    try:
+        from . import dkAnimFakeMaya
+    except ImportError:
+        import dkAnimFakeMaya
+    cmds = dkAnimFakeMaya.dk_installFakeMaya()
+    try:
+        from . import dkAnimExport
+    except ImportError:
+        import dkAnimExport
+    names = ["attr{}".format(i) for i in range(attrs)]
+    keyed = set(names[:int(attrs * connected)])
+
+    def node_name(plug):
+        return plug.rpartition(".")[0].split("|")[-1]
+
+    def list_connections(plugs, **kwargs):
+        # Pairs of destination and source plugs, for the keyed channels of plugs
+        pairs = []
+        for plug in plugs if isinstance(plugs, list) else [plugs]:
+            attr = plug.rpartition(".")[2]
+            if attr in keyed:
+                pairs += [plug, "{}_{}.output".format(node_name(plug), attr)]
+        if not kwargs.get("c"):
+            return pairs[1::2] or None
+        return pairs or None
+
+    cmds.handlers.update({
+        "listAnimatable": lambda item: ["{}.{}".format(item, name) for name in names],
+        "ls": lambda node, **kwargs: ["|group|" + node.split("|")[-1]],
+        "listRelatives": lambda node, **kwargs: ["group"],
+        "keyframe": lambda plug, **kwargs: [1.0] if plug.rpartition(".")[2] in keyed else None,
+        "listConnections": list_connections,
+        "getAttr": lambda plug, **kwargs: 1.0,
+    })
+    items = ["|group|object{}".format(i) for i in range(objects)]
+    channel_count = objects * attrs
+    result = {"objects": objects, "channels": channel_count, "keyed": objects * len(keyed)}
+    for engine in engines:
+        cmds.dk_reset()
+        start = time.perf_counter()
+        statics = 0
+        node_infos = {}
+        for item in items:
+            statics += len(dkAnimExport.dk_queryStatics(item, node_infos, engine))
+        result[engine + "_seconds"] = time.perf_counter() - start
+        result[engine + "_statics"] = statics
+        result[engine + "_calls"] = cmds.dk_total()
+        result[engine + "_calls_per_channel"] = cmds.dk_total() / float(max(channel_count, 1))
+    return result
+
+
+def dk_generateDkAnim(filename, nodes=100, channels=10, keys=200, weighted=0.1, fixed=0.25, statics=2, seed=0):
+    # Writes a synthetic .dkanim file with dkAnimWriter : nodes nodes under one group, with channels curves of keys keys
+    # and statics static values each. weighted is the fraction of weighted curves, fixed the fraction of fixed tangents.
+    rand = random.Random(seed)
+    tangents = ("spline", "linear", "clamped", "flat", "step", "auto")
+    writer = dkAnimWriter.dk_openDkAnimWriter(filename, "synthetic.ma")
+    try:
+        writer.writeRecord(dkAnimParser.DkSceneUnit("cm"))
+        for n in range(nodes):
+            node = "|dkBench|node{}".format(n)
+            for c in range(channels):
+                is_weighted = rand.random() < weighted
+                value = rand.uniform(-10.0, 10.0)
+                curve_keys = []
+                for k in range(keys):
+                    value += rand.uniform(-1.0, 1.0)
+                    in_type = "fixed" if is_weighted or rand.random() < fixed else rand.choice(tangents)
+                    out_type = "fixed" if is_weighted or rand.random() < fixed else rand.choice(tangents)
+                    curve_keys.append((float(k), round(value, 4), in_type, out_type, True, False, int(rand.random() < 0.05),
+                                       round(rand.uniform(-60.0, 60.0), 3), round(rand.uniform(0.5, 2.0), 3) if is_weighted else 1.0,
+                                       round(rand.uniform(-60.0, 60.0), 3), round(rand.uniform(0.5, 2.0), 3) if is_weighted else 1.0))
+                writer.writeRecord(dkAnimParser.DkAnimCurve("channel{}".format(c), node, 1, is_weighted, "constant", "constant", curve_keys))
+            for c in range(statics):
+                writer.writeRecord(dkAnimParser.DkStatic("static{}".format(c), node, 1, round(rand.uniform(-10.0, 10.0), 4)))
+    finally:
+        writer.close()
+    return filename
+
+
+def dk_benchCalls(cmds, function, *args, **kwargs):
+    # Runs function with the maya.cmds calls recorded by cmds (a dkAnimFakeMaya.DkFakeCmds), its prints silenced.
+    # Returns (its result, seconds, calls, calls per command).
+    cmds.dk_reset()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        value = function(*args, **kwargs)
+    return value, time.perf_counter() - start, cmds.dk_total(), dict(cmds.calls)
+
+
+def dk_benchScale(cmds, directory, nodes, channels, keys, weighted=0.1, fixed=0.25, statics=2, repeat=1):
+    # Measures one scale of the suite, see header. cmds is the DkFakeCmds installed by dk_benchSuite.
+    # Returns a JSON serializable dictionary.
+    try:
+        from . import dkAnimFakeMaya
+        from . import dkAnimEhEh
+    except ImportError:
+        import dkAnimFakeMaya
+        import dkAnimEhEh
+    filename = os.path.join(directory, "synthetic_{}x{}x{}.dkanim".format(nodes, channels, keys))
+    start = time.perf_counter()
+    dk_generateDkAnim(filename, nodes, channels, keys, weighted, fixed, statics)
+    result = {"scale": {"nodes": nodes, "channels": channels, "keys": keys, "weighted": weighted, "fixed": fixed, "statics": statics},
+              "generate_seconds": time.perf_counter() - start}
+    result["parse"] = dk_benchParse(filename, repeat=repeat)
+    result["format"] = dk_benchFormat(filename, repeat=repeat)
+    records = list(dkAnimParser.dk_iterDkAnim(filename))
+    key_count = max(sum(record.keyCount for record in records if record.kind == "anim"), 1)
+    channel_count = max(sum(1 for record in records if record.kind in ("anim", "static")), 1)
+    scene = dkAnimFakeMaya.DkFakeScene(records, ui={"dk_inname": filename})
+    cmds.handlers.clear()
+    scene.install(cmds)
+    options = dkAnimEhEh.DkReadOptions(doReplace=False, search="", replace="", prefix="", topNodes=False, paths=True, unKeyed=True, scope=None)
+    export = os.path.join(directory, "export.dkanim")
+    runs = (("dk_animRead", dkAnimEhEh.dk_animRead, (filename, True, options), {"interactive": False}),
+            ("dk_animWrite", dkAnimEhEh.dk_animWrite, (export, False), {"share": False}),
+            ("dk_loadChannels", dkAnimEhEh.dk_loadChannels, (), {}),
+            ("dre_fileLineCount", dkAnimEhEh.dre_fileLineCount, (filename,), {}))
+    for name, function, args, kwargs in runs:
+        value, seconds, calls, commands = dk_benchCalls(cmds, function, *args, **kwargs)
+        result[name] = {"seconds": seconds, "calls": calls, "calls_per_key": calls / float(key_count),
+                        "calls_per_channel": calls / float(channel_count), "commands": commands}
+    return result
+
+
+def dk_benchSuite(scales, weighted=0.1, fixed=0.25, statics=2, repeat=1, directory=None):
+    # Runs dk_benchScale for each (nodes, channels, keys) of scales, in a temporary folder unless directory is given.
+    # The stand-in is installed once : the dkAnimEhEh modules keep the maya.cmds they were imported with.
+    try:
+        from . import dkAnimFakeMaya
+    except ImportError:
+        import dkAnimFakeMaya
+    cmds = dkAnimFakeMaya.dk_installFakeMaya()
+    temporary = directory is None
+    directory = directory or tempfile.mkdtemp(prefix="dkAnimBench")
+    try:
+        return [dk_benchScale(cmds, directory, nodes, channels, keys, weighted, fixed, statics, repeat) for nodes, channels, keys in scales]
+    finally:
+        if temporary:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def dk_parseScale(text):
+    # "100x10x200" : (nodes, channels, keys)
+    parts = text.lower().split("x")
+    if len(parts) != 3:
+        raise argparse.ArgumentTypeError("scale must be NODESxCHANNELSxKEYS, not {!r}".format(text))
+    return tuple(int(part) for part in parts)
+
+
+def dk_printSuite(results):
+    for result in results:
+        scale = result["scale"]
+        print("{nodes} nodes x {channels} channels x {keys} keys".format(**scale))
+        print("{:>24} : {:.1f} MB/s, {:.0f} keys/s".format("parse", result["parse"]["mb_per_second"], result["parse"]["keys_per_second"]))
+        print("{:>24} : {:.1f} MB/s, {:.0f} keys/s".format("format", result["format"]["mb_per_second"], result["format"]["keys_per_second"]))
+        for name in ("dk_animRead", "dk_animWrite", "dk_loadChannels", "dre_fileLineCount"):
+            run = result[name]
+            print("{:>24} : {} calls, {:.3f} per key, {:.3f} per channel, {:.2f} s".format(name, run["calls"], run["calls_per_key"], run["calls_per_channel"], run["seconds"]))
+        print("")
+
+
+def dk_printResult(result):
+    for name in sorted(result):
+        print("{:>16} : {}".format(name, result[name]))
+
+
+def dk_checkIncrementalAbort(directory):
+    # An incremental export failing partway, as dk_animWrite closes it, keeps the previous file and its .dkhash.
+    # Returns the list of the failures.
+    failures = []
+    source = os.path.join(directory, "source.dkanim")
+    dk_generateDkAnim(source, nodes=5, channels=4, keys=20, seed=1)
+    records = list(dkAnimParser.dk_iterDkAnim(source))
+    target = os.path.join(directory, "incremental.dkanim")
+    writer = dkAnimWriter.dk_openDkAnimWriter(target, "check", incremental=True)
+    for record in records:
+        writer.writeRecord(record)
+    writer.close()
+    with open(target, "rb") as stream:
+        previous = stream.read()
+    previous_hashes = dkAnimWriter.dk_loadCurveHashes(target)
+    writer = dkAnimWriter.dk_openDkAnimWriter(target, "check", incremental=True)
+    completed = False
+    try:
+        for i, record in enumerate(records):
+            if i == len(records) // 2:
+                raise RuntimeError("export failed")
+            writer.writeRecord(record)
+        completed = True
+    except RuntimeError:
+        pass
+    finally:
+        writer.close(completed)
+    with open(target, "rb") as stream:
+        if stream.read() != previous:
+            failures.append("a failed incremental export replaced the previous file")
+    if dkAnimWriter.dk_loadCurveHashes(target) != previous_hashes:
+        failures.append("a failed incremental export changed the hashes of the previous file")
+    if os.path.exists(writer.temp_filename):
+        failures.append("a failed incremental export left its partial file")
+    # The next export still copies the curves of the previous file
+    writer = dkAnimWriter.dk_openDkAnimWriter(target, "check", incremental=True)
+    for record in records:
+        writer.writeRecord(record)
+    writer.close()
+    if writer.copied != len([record for record in records if record.kind == "anim"]):
+        failures.append("the export after a failed incremental export copied {} curves".format(writer.copied))
+    return failures
+
+
+def _dk_recordFields(record):
+    # Comparable content of a record, whatever the form of the file it was read from
+    if record.kind == "sceneUnit":
+        return (record.kind, record.unit)
+    if record.kind == "static":
+        return (record.kind, record.attr, record.node, int(record.parent), str(record.value))
+    return (record.kind, record.attr, record.node, int(record.parent), str(record.weighted) in ("True", "1", "true"),
+            record.preInfinity, record.postInfinity, record.keys)
+
+
+def dk_checkBinaryRoundTrip(directory, max_ratio=0.6):
+    # A text file converted to binary and back keeps all its records, and the binary file is at most max_ratio of the text size.
+    # Returns the list of the failures.
+    failures = []
+    source = os.path.join(directory, "roundtrip.dkanim")
+    dk_generateDkAnim(source, nodes=20, channels=10, keys=50, seed=2)
+    binary = os.path.join(directory, "roundtrip_binary.dkanim")
+    text = os.path.join(directory, "roundtrip_text.dkanim")
+    dkAnimBinary.dk_convertDkAnim(source, binary, binary=True)
+    dkAnimBinary.dk_convertDkAnim(binary, text, binary=False)
+    expected = [_dk_recordFields(record) for record in dkAnimParser.dk_iterDkAnim(source)]
+    for filename in (binary, text):
+        if [_dk_recordFields(record) for record in dkAnimParser.dk_iterDkAnim(filename)] != expected:
+            failures.append("the records of {} differ from the converted text file".format(os.path.basename(filename)))
+    ratio = float(os.path.getsize(binary)) / os.path.getsize(source)
+    if ratio > max_ratio:
+        failures.append("the binary file is {:.0%} of the size of the text file, expected at most {:.0%}".format(ratio, max_ratio))
+    return failures
+
+
+def dk_check():
+    # Checks of the file handling on synthetic files in a temporary folder, returns the list of the failures
+    directory = tempfile.mkdtemp(prefix="dkAnimCheck")
+    failures = []
+    try:
+        for check in (dk_checkIncrementalAbort, dk_checkBinaryRoundTrip):
+            failures.extend(check(directory))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the dkAnimEhEh file handling outside of Maya.")
+    commands = parser.add_subparsers(dest="command")
+    parse_cmd = commands.add_parser("parse", help="Stream a .dkanim file through dkAnimParser")
+    parse_cmd.add_argument("file")
+    parse_cmd.add_argument("--no-keys", action="store_true", help="only count the key lines, as dk_loadChannels does")
+    parse_cmd.add_argument("--repeat", type=int, default=1, help="number of runs, the fastest one is reported")
+    apply_cmd = commands.add_parser("apply", help="Count the maya.cmds calls of the import engines")
+    apply_cmd.add_argument("file")
+    format_cmd = commands.add_parser("format", help="Format the records of a .dkanim file with dkAnimWriter")
+    format_cmd.add_argument("file")
+    format_cmd.add_argument("--repeat", type=int, default=1, help="number of runs, the fastest one is reported")
+    statics_cmd = commands.add_parser("statics", help="Count the maya.cmds calls of the static values export")
+    statics_cmd.add_argument("--objects", type=int, default=200, help="number of objects of the synthetic scene")
+    statics_cmd.add_argument("--attrs", type=int, default=40, help="animatable channels per object")
+    statics_cmd.add_argument("--connected", type=float, default=0.25, help="fraction of the channels that are keyed")
+    generate_cmd = commands.add_parser("generate", help="Write a synthetic .dkanim file")
+    generate_cmd.add_argument("file")
+    generate_cmd.add_argument("--nodes", type=int, default=100)
+    generate_cmd.add_argument("--channels", type=int, default=10, help="curves per node")
+    generate_cmd.add_argument("--keys", type=int, default=200, help="keys per curve")
+    generate_cmd.add_argument("--weighted", type=float, default=0.1, help="fraction of weighted curves")
+    generate_cmd.add_argument("--fixed", type=float, default=0.25, help="fraction of fixed tangents")
+    generate_cmd.add_argument("--statics", type=int, default=2, help="static values per node")
+    generate_cmd.add_argument("--seed", type=int, default=0)
+    suite_cmd = commands.add_parser("suite", help="Generate synthetic files and measure parsing, formatting and the maya.cmds calls of the tool")
+    suite_cmd.add_argument("--scale", type=dk_parseScale, action="append", help="NODESxCHANNELSxKEYS, may be repeated (default 100x10x200)")
+    suite_cmd.add_argument("--weighted", type=float, default=0.1, help="fraction of weighted curves")
+    suite_cmd.add_argument("--fixed", type=float, default=0.25, help="fraction of fixed tangents")
+    suite_cmd.add_argument("--statics", type=int, default=2, help="static values per node")
+    suite_cmd.add_argument("--repeat", type=int, default=1, help="number of parse and format runs, the fastest one is reported")
+    suite_cmd.add_argument("--json", help="file receiving the results")
+    compression_cmd = commands.add_parser("compression", help="Bytes read and parse time of plain and compressed copies of a .dkanim file")
+    compression_cmd.add_argument("file")
+    compression_cmd.add_argument("--codecs", default="gzip,bz2,xz", help="comma separated codecs of dkAnimParser.DK_COMPRESSIONS")
+    compression_cmd.add_argument("--mbps", type=float, help="read speed of the share in MB/s, to estimate the read time of each copy")
+    compression_cmd.add_argument("--repeat", type=int, default=1, help="number of runs, the fastest one is reported")
+    commands.add_parser("check", help="Check the file handling on synthetic files")
+    args = parser.parse_args(argv)
+    if args.command == "check":
+        failures = dk_check()
+        for failure in failures:
+            print("dkAnimBench: FAILED {}".format(failure))
+        print("dkAnimBench: check {}".format("failed" if failures else "passed"))
+        return 1 if failures else 0
+    if args.command == "parse":
+        dk_printResult(dk_benchParse(args.file, keys=not args.no_keys, repeat=args.repeat))
+    elif args.command == "apply":
+        dk_printResult(dk_benchApply(args.file))
+    elif args.command == "format":
+        dk_printResult(dk_benchFormat(args.file, repeat=args.repeat))
+    elif args.command == "statics":
+        dk_printResult(dk_benchStatics(args.objects, args.attrs, args.connected))
+    elif args.command == "generate":
+        dk_generateDkAnim(args.file, args.nodes, args.channels, args.keys, args.weighted, args.fixed, args.statics, args.seed)
+    elif args.command == "suite":
+        results = dk_benchSuite(args.scale or [(100, 10, 200)], args.weighted, args.fixed, args.statics, args.repeat)
+        dk_printSuite(results)
+        if args.json:
+            with open(args.json, "w") as stream:
+                json.dump({"python": sys.version.split()[0], "results": results}, stream, indent=2)
+    elif args.command == "compression":
+        for result in dk_benchCompression(args.file, args.codecs.split(","), args.repeat, args.mbps):
+            dk_printResult(result)
+            print("")
+    else:
+        parser.print_help()
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
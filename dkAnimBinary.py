@@ -0,0 +1,347 @@
+##############################################################################################################
+#NAME: dkAnimBinary
+#AUTHOR: David Saber, www.dreamcraftdigital.com, based on Dan Erwin and Daniel Kramer's code.
+#SCRIPTING LANGUAGE: Python (no Maya import, NumPy is used when available but is not required)
+#USAGE: Compact binary form of the *.dkanim files, written by dk_animWrite when "Binary File" is checked and
+#       detected automatically by every reader (dkAnimParser.dk_iterDkAnim).
+#       Each curve stores its keys as columns : times and values are contiguous little-endian float64 arrays,
+#       tangent types are 1 byte indexes in a table of names and locks/breakdown are 1 byte of flags.
+#       As in the text form, angles and weights are only stored for fixed tangents : the in angles and weights of the
+#       keys with a fixed in tangent, then the out angles and weights of the keys with a fixed out tangent.
+#       The file is read through mmap, and the times and values are NumPy views on it (no copy).
+#       Converter between the text and binary forms :
+#           python dkAnimBinary.py convert in.dkanim out.dkanim [--to binary|text]
+#LAYOUT: header   : 8s magic "DKANIMB1", u32 version, u32 flags (0)
+#        records  : u8 kind, u8 parent, u8 weighted, u8 string count, u32 key count, strings (u16 size + utf-8 bytes),
+#                   then for anim records, aligned on 8 bytes : 2 float64 columns and 3 uint8 columns of key count items,
+#                   then aligned on 8 bytes : 2 float64 columns of fixed in tangent count and 2 of fixed out tangent count
+#                   (version 1 files : 6 float64 columns and 3 uint8 columns of key count items),
+#                   for animRef records (shared curves, see dkAnimParser) : u64 offset of the anim record they share
+#        trailer  : u32 tangent name count and names, scene name, u64 record count and u64 offset of each record
+#        footer   : u64 trailer offset, 8s magic "DKANIMBE"
+##############################################################################################################
+
+
+# Imports
+import argparse
+import array
+import mmap
+import os
+import struct
+import sys
+try:
+    import numpy
+except ImportError:
+    numpy = None
+try:
+    from . import dkAnimParser
+    from . import dkAnimWriter
+except ImportError:
+    import dkAnimParser
+    import dkAnimWriter
+
+# Global variables
+DK_BINARY_MAGIC = b"DKANIMB1"
+DK_BINARY_END_MAGIC = b"DKANIMBE"
+DK_BINARY_VERSION = 2
+DK_BINARY_HEADER = struct.Struct("<8sII")
+DK_BINARY_RECORD = struct.Struct("<BBBBI")
+DK_BINARY_FOOTER = struct.Struct("<Q8s")
+DK_BINARY_KINDS = {"sceneUnit": 1, "static": 2, "anim": 3, "animRef": 4}
+DK_BINARY_KIND_NAMES = dict((value, kind) for kind, value in DK_BINARY_KINDS.items())
+# Key flags
+DK_FLAG_TANLOCK = 1
+DK_FLAG_WEIGHTLOCK = 2
+DK_FLAG_BREAKDOWN = 4
+# Float columns of a curve, in file order, and their index in KEY_FIELDS
+DK_FLOAT_COLUMNS = (dkAnimParser.KEY_TIME, dkAnimParser.KEY_VALUE)
+# Float columns only stored for the fixed tangents : {tangent type field: (angle field, weight field)}
+DK_FIXED_COLUMNS = ((dkAnimParser.KEY_INTYPE, (dkAnimParser.KEY_INANGLE, dkAnimParser.KEY_INWEIGHT)),
+                    (dkAnimParser.KEY_OUTTYPE, (dkAnimParser.KEY_OUTANGLE, dkAnimParser.KEY_OUTWEIGHT)))
+# Float columns of version 1 files, all of key count items
+DK_FLOAT_COLUMNS_V1 = DK_FLOAT_COLUMNS + (dkAnimParser.KEY_INANGLE, dkAnimParser.KEY_INWEIGHT, dkAnimParser.KEY_OUTANGLE, dkAnimParser.KEY_OUTWEIGHT)
+
+
+def dk_isBinaryDkAnim(header):
+    # header : the first bytes of a file
+    return header[:len(DK_BINARY_MAGIC)] == DK_BINARY_MAGIC
+
+
+def _dk_packString(text):
+    data = str(text).encode("utf-8")
+    return struct.pack("<H", len(data)) + data
+
+
+def _dk_floatBytes(values):
+    # Little-endian float64 bytes of a sequence of numbers
+    column = array.array("d", values)
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column.tobytes()
+
+
+class DkAnimBinaryWriter(object):
+    # Same interface as dkAnimWriter.DkAnimTextWriter, writes the binary layout described in the header of this file
+
+    def __init__(self, stream, share=False):
+        self.stream = stream
+        self.offset = 0
+        self.scene_name = ""
+        self.record_offsets = []
+        self.tangent_names = []
+        self.tangent_indexes = {}
+        # {payload hash: offset of the first curve written with it}, see dkAnimWriter.dk_payloadHash
+        self.shared = {} if share else None
+        self.references = 0
+
+    def write(self, data):
+        offset = self.offset
+        self.stream.write(data)
+        self.offset += len(data)
+        return offset
+
+    def pad(self):
+        # Aligns the next write on 8 bytes, so that the float columns can be viewed without copy
+        if self.offset % 8:
+            self.write(b"\0" * (8 - self.offset % 8))
+
+    def writeHeader(self, scene_name):
+        self.scene_name = scene_name
+        return self.write(DK_BINARY_HEADER.pack(DK_BINARY_MAGIC, DK_BINARY_VERSION, 0))
+
+    def tangentIndex(self, name):
+        index = self.tangent_indexes.get(name)
+        if index is None:
+            if len(self.tangent_names) == 255:
+                raise ValueError("Too many tangent types in one binary .dkanim file")
+            index = self.tangent_indexes[name] = len(self.tangent_names)
+            self.tangent_names.append(name)
+        return index
+
+    def writeRecord(self, record):
+        self.pad()
+        offset = self.offset
+        self.record_offsets.append(offset)
+        if record.kind == "anim" and self.shared is not None:
+            payload = dkAnimWriter.dk_payloadHash(record)
+            source = self.shared.get(payload)
+            if source is not None:
+                strings = (record.attr, record.node)
+                self.write(DK_BINARY_RECORD.pack(DK_BINARY_KINDS["animRef"], int(record.parent), 0, len(strings), record.keyCount)
+                           + b"".join(_dk_packString(text) for text in strings) + struct.pack("<Q", source))
+                self.references += 1
+                return offset
+            self.shared[payload] = offset
+        if record.kind == "anim":
+            strings = (record.attr, record.node, record.preInfinity, record.postInfinity)
+            columns = record.columns()
+            count = record.keyCount if record.hasKeys() else 0
+            weighted = 1 if str(record.weighted) in ("True", "1", "true") else 0
+            data = [DK_BINARY_RECORD.pack(DK_BINARY_KINDS["anim"], int(record.parent), weighted, len(strings), count)]
+            data.extend(_dk_packString(text) for text in strings)
+            self.write(b"".join(data))
+            self.pad()
+            if count:
+                self.write(b"".join(_dk_floatBytes(columns[field]) for field in DK_FLOAT_COLUMNS))
+                in_types = bytes(self.tangentIndex(name) for name in columns[dkAnimParser.KEY_INTYPE])
+                out_types = bytes(self.tangentIndex(name) for name in columns[dkAnimParser.KEY_OUTTYPE])
+                flags = bytes((DK_FLAG_TANLOCK if tan_lock in (True, "True", 1) else 0) | (DK_FLAG_WEIGHTLOCK if weight_lock in (True, "True", 1) else 0) | (DK_FLAG_BREAKDOWN if breakdown else 0)
+                              for tan_lock, weight_lock, breakdown in zip(columns[dkAnimParser.KEY_TANLOCK], columns[dkAnimParser.KEY_WEIGHTLOCK], columns[dkAnimParser.KEY_BREAKDOWN]))
+                self.write(in_types + out_types + flags)
+                self.pad()
+                for type_field, fields in DK_FIXED_COLUMNS:
+                    fixed = [i for i, name in enumerate(columns[type_field]) if name == "fixed"]
+                    if fixed:
+                        self.write(b"".join(_dk_floatBytes([columns[field][i] for i in fixed]) for field in fields))
+        elif record.kind == "static":
+            strings = (record.attr, record.node, record.value)
+            self.write(DK_BINARY_RECORD.pack(DK_BINARY_KINDS["static"], int(record.parent), 0, len(strings), 0) + b"".join(_dk_packString(text) for text in strings))
+        else:
+            self.write(DK_BINARY_RECORD.pack(DK_BINARY_KINDS["sceneUnit"], 0, 0, 1, 0) + _dk_packString(record.unit))
+        return offset
+
+    def close(self, success=True):
+        # Writes the trailer and the footer, then closes the stream. success : see dkAnimWriter.DkAnimTextWriter.close
+        trailer_offset = self.offset
+        data = [struct.pack("<I", len(self.tangent_names))]
+        data.extend(_dk_packString(name) for name in self.tangent_names)
+        data.append(_dk_packString(self.scene_name))
+        data.append(struct.pack("<Q", len(self.record_offsets)))
+        data.append(struct.pack("<{}Q".format(len(self.record_offsets)), *self.record_offsets))
+        data.append(DK_BINARY_FOOTER.pack(trailer_offset, DK_BINARY_END_MAGIC))
+        self.write(b"".join(data))
+        self.stream.close()
+
+
+def _dk_floatColumn(buffer, offset, count):
+    # View on count little-endian float64 of buffer, without copy whenever possible
+    if numpy is not None:
+        return numpy.frombuffer(buffer, dtype="<f8", count=count, offset=offset)
+    if sys.byteorder == "little":
+        return memoryview(buffer)[offset:offset + 8 * count].cast("d")
+    column = array.array("d", buffer[offset:offset + 8 * count])
+    column.byteswap()
+    return column
+
+
+def _dk_fixedColumn(buffer, offset, fixed, count):
+    # Column of count floats, read from buffer for the keys of the fixed index list and 0.0 for the others
+    values = _dk_floatColumn(buffer, offset, len(fixed))
+    if numpy is not None:
+        column = numpy.zeros(count)
+        column[fixed] = values
+        return column
+    column = [0.0] * count
+    for i, value in zip(fixed, values):
+        column[i] = value
+    return column
+
+
+def _dk_readString(buffer, offset):
+    size = struct.unpack_from("<H", buffer, offset)[0]
+    offset += 2
+    return bytes(buffer[offset:offset + size]).decode("utf-8"), offset + size
+
+
+class DkAnimBinaryFile(object):
+    # Read access to a binary .dkanim file held in buffer (an mmap, or bytes for a compressed file)
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        magic, self.version, flags = DK_BINARY_HEADER.unpack_from(buffer, 0)
+        if magic != DK_BINARY_MAGIC:
+            raise ValueError("Not a binary .dkanim file")
+        trailer_offset, end_magic = DK_BINARY_FOOTER.unpack_from(buffer, len(buffer) - DK_BINARY_FOOTER.size)
+        if end_magic != DK_BINARY_END_MAGIC:
+            raise ValueError("Binary .dkanim file is truncated")
+        offset = trailer_offset
+        name_count = struct.unpack_from("<I", buffer, offset)[0]
+        offset += 4
+        self.tangent_names = []
+        for i in range(name_count):
+            name, offset = _dk_readString(buffer, offset)
+            self.tangent_names.append(name)
+        self.scene_name, offset = _dk_readString(buffer, offset)
+        record_count = struct.unpack_from("<Q", buffer, offset)[0]
+        self.record_offsets = struct.unpack_from("<{}Q".format(record_count), buffer, offset + 8)
+        self.trailer_offset = trailer_offset
+        # Curves referenced by animRef records, decoded once : {offset: DkAnimCurve}
+        self.shared = {}
+
+    def readRecord(self, offset, keys=True):
+        # Returns the record starting at offset
+        buffer = self.buffer
+        start = offset
+        kind, parent, weighted, string_count, count = DK_BINARY_RECORD.unpack_from(buffer, offset)
+        offset += DK_BINARY_RECORD.size
+        strings = []
+        for i in range(string_count):
+            text, offset = _dk_readString(buffer, offset)
+            strings.append(text)
+        kind = DK_BINARY_KIND_NAMES.get(kind)
+        if kind == "sceneUnit":
+            return dkAnimParser.DkSceneUnit(strings[0], start)
+        if kind == "static":
+            return dkAnimParser.DkStatic(strings[0], strings[1], parent, strings[2], start)
+        if kind == "animRef":
+            source = struct.unpack_from("<Q", buffer, offset)[0]
+            if not keys:
+                return dkAnimParser.DkAnimCurve(strings[0], strings[1], parent, keyCount=count, offset=start)
+            template = self.shared.get(source)
+            if template is None:
+                template = self.shared[source] = self.readRecord(source)
+            return dkAnimParser.DkAnimCurve(strings[0], strings[1], parent, template.weighted, template.preInfinity, template.postInfinity,
+                                            keyCount=count, offset=start, columns=template.columns())
+        curve = dkAnimParser.DkAnimCurve(strings[0], strings[1], parent, bool(weighted), strings[2], strings[3], keyCount=count, offset=start)
+        if keys:
+            offset += (8 - offset % 8) % 8
+            columns = [None] * len(dkAnimParser.KEY_FIELDS)
+            for field in (DK_FLOAT_COLUMNS_V1 if self.version == 1 else DK_FLOAT_COLUMNS):
+                columns[field] = _dk_floatColumn(buffer, offset, count)
+                offset += 8 * count
+            names = self.tangent_names
+            columns[dkAnimParser.KEY_INTYPE] = [names[index] for index in buffer[offset:offset + count]]
+            columns[dkAnimParser.KEY_OUTTYPE] = [names[index] for index in buffer[offset + count:offset + 2 * count]]
+            flags = buffer[offset + 2 * count:offset + 3 * count]
+            columns[dkAnimParser.KEY_TANLOCK] = [bool(flag & DK_FLAG_TANLOCK) for flag in flags]
+            columns[dkAnimParser.KEY_WEIGHTLOCK] = [bool(flag & DK_FLAG_WEIGHTLOCK) for flag in flags]
+            columns[dkAnimParser.KEY_BREAKDOWN] = [1 if flag & DK_FLAG_BREAKDOWN else 0 for flag in flags]
+            if self.version > 1:
+                offset += 3 * count
+                offset += (8 - offset % 8) % 8
+                for type_field, fields in DK_FIXED_COLUMNS:
+                    fixed = [i for i, name in enumerate(columns[type_field]) if name == "fixed"]
+                    for field in fields:
+                        columns[field] = _dk_fixedColumn(buffer, offset, fixed, count)
+                        offset += 8 * len(fixed)
+            curve._columns = tuple(columns)
+        return curve
+
+    def readIndex(self):
+        # Returns the dkAnimParser.DkIndexEntry list of the file, only the record headers are read
+        entries = []
+        ends = self.record_offsets[1:] + (self.trailer_offset,)
+        for offset, end in zip(self.record_offsets, ends):
+            record = self.readRecord(offset, keys=False)
+            if record.kind == "sceneUnit":
+                entries.append(dkAnimParser.DkIndexEntry(offset, end - offset, record.kind, 0, 0, "", record.unit))
+            else:
+                entries.append(dkAnimParser.DkIndexEntry(offset, end - offset, record.kind, getattr(record, "keyCount", 0), record.parent, record.attr, record.node))
+        return entries
+
+    def iterRecords(self, keys=True):
+        for offset in self.record_offsets:
+            yield self.readRecord(offset, keys)
+
+
+def dk_openBinaryFile(filename):
+    # Maps filename in memory and returns a DkAnimBinaryFile. The map is released with the last record read from it.
+    with open(filename, "rb") as stream:
+        buffer = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    return DkAnimBinaryFile(buffer)
+
+
+def dk_iterBinaryDkAnim(filename, keys=True):
+    # Generator of the records of a binary .dkanim file, same records as dkAnimParser.dk_iterDkAnim
+    for record in dk_openBinaryFile(filename).iterRecords(keys):
+        yield record
+
+
+def dk_convertDkAnim(source, destination, binary=None):
+    # Converts the .dkanim file source to destination. binary=None converts to the other form of source.
+    with open(source, "rb") as stream:
+        source_binary = dk_isBinaryDkAnim(stream.read(len(DK_BINARY_MAGIC)))
+    if binary is None:
+        binary = not source_binary
+    scene_name = dk_openBinaryFile(source).scene_name if source_binary else "{} (converted)".format(source)
+    writer = dkAnimWriter.dk_openDkAnimWriter(destination, scene_name, binary=binary)
+    count = 0
+    try:
+        for record in dkAnimParser.dk_iterDkAnim(source):
+            writer.writeRecord(record)
+            count += 1
+    finally:
+        writer.close()
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert .dkanim files between the text and binary forms.")
+    commands = parser.add_subparsers(dest="command")
+    convert_cmd = commands.add_parser("convert", help="Convert a .dkanim file")
+    convert_cmd.add_argument("source")
+    convert_cmd.add_argument("destination")
+    convert_cmd.add_argument("--to", choices=("binary", "text"), help="form of the destination, default : the other form of source")
+    args = parser.parse_args(argv)
+    if args.command != "convert":
+        parser.print_help()
+        return 1
+    binary = None if args.to is None else args.to == "binary"
+    count = dk_convertDkAnim(args.source, args.destination, binary)
+    print("dkAnim: {} records written to {} ({} bytes, {:.0%} of the source)".format(count, args.destination, os.path.getsize(args.destination),
+                                                                                   float(os.path.getsize(args.destination)) / max(os.path.getsize(args.source), 1)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,407 @@
+##############################################################################################################
+#NAME: dkAnimDiff
+#AUTHOR: David Saber, www.dreamcraftdigital.com, based on Dan Erwin and Daniel Kramer's code.
+#SCRIPTING LANGUAGE: Python (no Maya import, can be used from any Python 3 interpreter)
+#USAGE: Comparison and merge of .dkanim files outside of Maya :
+#           python dkAnimDiff.py diff a.dkanim b.dkanim [--tolerance 1e-6] [--json changes.jsonl] [--quiet]
+#           python dkAnimDiff.py merge a.dkanim b.dkanim out.dkanim [--base base.dkanim] [--prefer a|b] [--binary]
+#                                [--compression gzip|bz2|xz]
+#       Channels are matched by "node.attr". diff reports the channels added to b, removed from a, and changed : static
+#       values, curve infinity and weighting, and the key deltas of each curve (keys added, removed and changed, matched
+#       by time, and the largest change of value). --json writes one JSON object per change, then a summary line.
+#       The exit code of diff is 0 when the files match, 1 when they differ.
+#       merge writes the channels of both files to out.dkanim. A channel of both files is taken from --prefer (b by
+#       default). With --base (the file a and b were both edited from), a channel changed in only one of them is
+#       taken from that one, and a channel removed from one of them and unchanged in the other is removed : only the
+#       channels changed in both (conflicts) are taken from --prefer, and they are listed.
+#       Memory stays bounded whatever the size of the files : each file is read in the order of its channels
+#       (DkSortedChannels), and the files are walked together one channel at a time (dk_iterPairs). Files with an index,
+#       binary files and plain text files are read record by record at their offsets, sorted by channel. Compressed
+#       files can not be read at an offset : their records are sorted by runs of at most DKANIM_DIFF_MAX_BYTES
+#       (estimated as dkAnimPrefetch does, and at least DK_DIFF_MIN_RUN_BYTES), written to temporary files, and the
+#       runs are merged. At most DK_DIFF_MERGE_FAN_IN runs are open at once : when there are more, groups of runs are
+#       first merged into bigger runs, in as many passes as needed.
+##############################################################################################################
+
+
+# Imports
+import argparse
+import heapq
+import json
+import os
+import shutil
+import sys
+import tempfile
+try:
+    from . import dkAnimParser
+    from . import dkAnimPrefetch
+    from . import dkAnimReduce
+    from . import dkAnimWriter
+except ImportError:
+    import dkAnimParser
+    import dkAnimPrefetch
+    import dkAnimReduce
+    import dkAnimWriter
+
+# Largest run of records sorted in memory when a compressed file is sorted, in bytes
+DKANIM_DIFF_MAX_BYTES = 256 * 1024 * 1024
+# Smallest run, whatever the memory asked for : a run per record would leave too many temporary files to merge
+DK_DIFF_MIN_RUN_BYTES = 4 * 1024 * 1024
+# Largest number of runs merged (files open) at once
+DK_DIFF_MERGE_FAN_IN = 64
+# Default tolerance on the times, values, angles and weights of the keys, and on the static values
+DK_DIFF_TOLERANCE = 1e-6
+
+
+def dk_channelKey(record):
+    # Key the channels are sorted and matched by
+    return (record.node, record.attr)
+
+
+def dk_channelName(key):
+    return "{}.{}".format(key[0], key[1])
+
+
+class DkSortedChannels(object):
+    # The static and anim records of a .dkanim file, in the order of their channel key, see header. unit is the
+    # sceneUnit of the file, set once the first record was read (None when it has none).
+
+    def __init__(self, filename, max_bytes=None, directory=None):
+        self.filename = filename
+        self.max_bytes = DKANIM_DIFF_MAX_BYTES if max_bytes is None else max_bytes
+        self.directory = directory
+        self.unit = None
+        self.runs = 0
+        self.passes = 0
+
+    def __iter__(self):
+        if dkAnimParser.dk_compression(self.filename) is not None:
+            return self.iterRuns()
+        return self.iterIndexed()
+
+    def iterIndexed(self):
+        # Records read at their offsets : from the index, or from a scan of the file without its keys
+        entries = dkAnimParser.dk_readIndex(self.filename)
+        if entries is None:
+            entries = dkAnimParser.dk_iterDkAnim(self.filename, keys=False)
+        channels = []
+        for entry in entries:
+            if entry.kind == "sceneUnit":
+                if self.unit is None:
+                    self.unit = entry.unit if hasattr(entry, "unit") else entry.node
+            else:
+                channels.append((entry.node, entry.attr, entry.offset))
+        channels.sort(key=lambda channel: channel[:2])
+        for record in dkAnimParser.dk_iterDkAnimAt(self.filename, [channel[2] for channel in channels]):
+            yield record
+
+    def iterRuns(self):
+        # External sort : runs of records sorted in memory are written to temporary files, then merged
+        directory = tempfile.mkdtemp(prefix="dkAnimDiff_", dir=self.directory)
+        try:
+            runs = []
+            run = []
+            memory = 0
+            max_bytes = max(self.max_bytes, DK_DIFF_MIN_RUN_BYTES)
+            for record in dkAnimParser.dk_iterDkAnim(self.filename):
+                if record.kind == "sceneUnit":
+                    if self.unit is None:
+                        self.unit = record.unit
+                    continue
+                run.append(record)
+                memory += dkAnimPrefetch.DK_RECORD_BYTES + (dkAnimPrefetch.DK_KEY_BYTES * record.keyCount if record.kind == "anim" else 0)
+                if memory > max_bytes:
+                    runs.append(self.writeRun(run, directory, len(runs)))
+                    run = []
+                    memory = 0
+            run.sort(key=dk_channelKey)
+            self.runs = len(runs) + (1 if run else 0)
+            if not runs:
+                for record in run:
+                    yield record
+                return
+            if run:
+                runs.append(self.writeRun(run, directory, len(runs)))
+            run = None
+            number = len(runs)
+            # Groups of consecutive runs are merged in order, so that the runs stay in file order
+            while len(runs) > DK_DIFF_MERGE_FAN_IN:
+                self.passes += 1
+                merged = []
+                for first in range(0, len(runs), DK_DIFF_MERGE_FAN_IN):
+                    group = runs[first:first + DK_DIFF_MERGE_FAN_IN]
+                    merged.append(self.writeRun(dk_mergeRuns(group), directory, number, sort=False))
+                    number += 1
+                    for name in group:
+                        os.remove(name)
+                runs = merged
+            for record in dk_mergeRuns(runs):
+                yield record
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def writeRun(self, run, directory, number, sort=True):
+        # Writes the records of run, sorted unless sort is False (run is then an iterable of sorted records), to a plain
+        # text file of directory and returns its name
+        if sort:
+            run.sort(key=dk_channelKey)
+        name = os.path.join(directory, "run{}.dkanim".format(number))
+        writer = dkAnimWriter.dk_openDkAnimWriter(name, "dkAnimDiff run {} of {}".format(number, self.filename))
+        try:
+            for record in run:
+                writer.writeRecord(record)
+        finally:
+            writer.close()
+        return name
+
+
+def dk_mergeRuns(names):
+    # Records of the sorted run files names, merged in the order of their channel key. heapq.merge keeps the order of
+    # the runs for equal keys : channels written twice stay in file order.
+    return heapq.merge(*[dkAnimParser.dk_iterDkAnim(name) for name in names], key=dk_channelKey)
+
+
+def dk_iterPairs(streams):
+    # Walks sorted record streams together : yields (channel key, records), records has the record of each stream for
+    # that key, or None. A key found n times in a stream is yielded n times.
+    iterators = [iter(stream) for stream in streams]
+    heads = [next(iterator, None) for iterator in iterators]
+    while True:
+        keys = [dk_channelKey(head) for head in heads if head is not None]
+        if not keys:
+            return
+        key = min(keys)
+        records = []
+        for i, head in enumerate(heads):
+            if head is not None and dk_channelKey(head) == key:
+                records.append(head)
+                heads[i] = next(iterators[i], None)
+            else:
+                records.append(None)
+        yield key, records
+
+
+def dk_sameField(a, b, tolerance):
+    # Numbers (bools included, binary files read the locks as bools) are compared with tolerance, others as text
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return abs(a - b) <= tolerance
+    return str(a) == str(b)
+
+
+def dk_staticDelta(a, b, tolerance):
+    # Returns None when the static values match, else {"values": [a, b]}
+    try:
+        same = abs(float(a.value) - float(b.value)) <= tolerance
+    except ValueError:
+        same = a.value == b.value
+    return None if same else {"values": [a.value, b.value]}
+
+
+def dk_curveDelta(a, b, tolerance):
+    # Returns None when the curves match, else their differences : key counts, keys added, removed and changed (matched
+    # by time), largest change of value, and weighting or infinity when they differ
+    delta = {}
+    if dkAnimReduce.dk_isWeighted(a) != dkAnimReduce.dk_isWeighted(b):
+        delta["weighted"] = [dkAnimReduce.dk_isWeighted(a), dkAnimReduce.dk_isWeighted(b)]
+    for name in ("preInfinity", "postInfinity"):
+        infinities = [dkAnimParser.dk_infinityName(getattr(a, name)), dkAnimParser.dk_infinityName(getattr(b, name))]
+        if infinities[0] != infinities[1]:
+            delta[name] = infinities
+    keys_a = a.keys or []
+    keys_b = b.keys or []
+    added = removed = changed = 0
+    largest = 0.0
+    i = j = 0
+    while i < len(keys_a) or j < len(keys_b):
+        if j == len(keys_b) or (i < len(keys_a) and keys_a[i][dkAnimParser.KEY_TIME] < keys_b[j][dkAnimParser.KEY_TIME] - tolerance):
+            removed += 1
+            i += 1
+        elif i == len(keys_a) or keys_b[j][dkAnimParser.KEY_TIME] < keys_a[i][dkAnimParser.KEY_TIME] - tolerance:
+            added += 1
+            j += 1
+        else:
+            key_a = keys_a[i]
+            key_b = keys_b[j]
+            if not all(dk_sameField(field_a, field_b, tolerance) for field_a, field_b in zip(key_a, key_b)):
+                changed += 1
+                largest = max(largest, abs(float(key_a[dkAnimParser.KEY_VALUE]) - float(key_b[dkAnimParser.KEY_VALUE])))
+            i += 1
+            j += 1
+    if not delta and not (added or removed or changed):
+        return None
+    delta.update({"keys": [len(keys_a), len(keys_b)], "keysAdded": added, "keysRemoved": removed, "keysChanged": changed,
+                  "maxValueDelta": largest})
+    return delta
+
+
+def dk_recordDelta(a, b, tolerance):
+    # Returns None when the records a and b of a channel match, else their differences
+    if a.kind != b.kind:
+        return {"kinds": [a.kind, b.kind]}
+    if a.kind == "static":
+        return dk_staticDelta(a, b, tolerance)
+    return dk_curveDelta(a, b, tolerance)
+
+
+def dk_sameRecord(a, b, tolerance):
+    # True when a and b, records of a channel or None when the channel is missing, match
+    if a is None or b is None:
+        return a is None and b is None
+    return dk_recordDelta(a, b, tolerance) is None
+
+
+def dk_diffFiles(file_a, file_b, tolerance=DK_DIFF_TOLERANCE, max_bytes=None, directory=None):
+    # Generator of the changes from file_a to file_b, see header. Each change is a dictionary :
+    #   {"change": "added" | "removed" | "changed", "channel": "node.attr", "kind": "anim" | "static" | "sceneUnit", ...}
+    # added and removed curves give their key count ("keys"), changed channels their differences (dk_recordDelta).
+    sorted_a = DkSortedChannels(file_a, max_bytes, directory)
+    sorted_b = DkSortedChannels(file_b, max_bytes, directory)
+    for key, (a, b) in dk_iterPairs((sorted_a, sorted_b)):
+        if b is None:
+            change = {"change": "removed", "channel": dk_channelName(key), "kind": a.kind}
+            if a.kind == "anim":
+                change["keys"] = a.keyCount
+        elif a is None:
+            change = {"change": "added", "channel": dk_channelName(key), "kind": b.kind}
+            if b.kind == "anim":
+                change["keys"] = b.keyCount
+        else:
+            delta = dk_recordDelta(a, b, tolerance)
+            if delta is None:
+                continue
+            change = {"change": "changed", "channel": dk_channelName(key), "kind": b.kind}
+            change.update(delta)
+        yield change
+    if sorted_a.unit != sorted_b.unit:
+        yield {"change": "changed", "channel": "sceneUnit", "kind": "sceneUnit", "values": [sorted_a.unit, sorted_b.unit]}
+
+
+def dk_formatChange(change):
+    # One line of the console report of diff
+    if change["kind"] == "sceneUnit":
+        return "~ sceneUnit {} -> {}".format(*change["values"])
+    if change["change"] != "changed":
+        sign = "+" if change["change"] == "added" else "-"
+        return "{} {} {}{}".format(sign, change["kind"], change["channel"], " ({} keys)".format(change["keys"]) if "keys" in change else "")
+    details = []
+    if "kinds" in change:
+        details.append("{} -> {}".format(*change["kinds"]))
+    if "values" in change:
+        details.append("{} -> {}".format(*change["values"]))
+    for name in ("weighted", "preInfinity", "postInfinity"):
+        if name in change:
+            details.append("{} {} -> {}".format(name, *change[name]))
+    if "keys" in change:
+        details.append("keys {} -> {} : +{} -{} ~{}, max value delta {:g}".format(change["keys"][0], change["keys"][1], change["keysAdded"],
+                                                                              change["keysRemoved"], change["keysChanged"], change["maxValueDelta"]))
+    return "~ {} {} {}".format(change["kind"], change["channel"], ", ".join(details))
+
+
+def dk_mergeFiles(file_a, file_b, output, base=None, prefer="b", tolerance=DK_DIFF_TOLERANCE, binary=False, compression=None,
+                  max_bytes=None, directory=None):
+    # Writes the merge of file_a and file_b to output, see header. Returns the counts of the merge :
+    #   {"channels": written, "a": taken from file_a, "b": taken from file_b, "removed": channels of base removed,
+    #    "conflicts": [channels changed in both], "units": [sceneUnit of file_a, file_b], "unit": sceneUnit written}
+    if prefer not in ("a", "b"):
+        raise ValueError("prefer must be 'a' or 'b', not {!r}".format(prefer))
+    streams = [DkSortedChannels(file_a, max_bytes, directory), DkSortedChannels(file_b, max_bytes, directory)]
+    if base is not None:
+        streams.append(DkSortedChannels(base, max_bytes, directory))
+    result = {"channels": 0, "a": 0, "b": 0, "removed": 0, "conflicts": []}
+    pairs = dk_iterPairs(streams)
+    # The sceneUnit of the files is known once their first channel was read, it is written first
+    first = next(pairs, None)
+    unit = streams[1].unit if prefer == "b" else streams[0].unit
+    unit = unit or streams[0].unit or streams[1].unit
+    result["units"] = [streams[0].unit, streams[1].unit]
+    result["unit"] = unit
+    writer = dkAnimWriter.dk_openDkAnimWriter(output, "dkAnimDiff merge of {} and {}".format(file_a, file_b), binary=binary, compression=compression)
+    try:
+        if unit is not None:
+            writer.writeRecord(dkAnimParser.DkSceneUnit(unit))
+        while first is not None:
+            key, records = first
+            a, b = records[:2]
+            if base is None:
+                source = prefer if a is not None and b is not None else ("a" if b is None else "b")
+            else:
+                original = records[2]
+                if dk_sameRecord(b, original, tolerance):
+                    source = "a"
+                elif dk_sameRecord(a, original, tolerance) or dk_sameRecord(a, b, tolerance):
+                    source = "b"
+                else:
+                    source = prefer
+                    result["conflicts"].append(dk_channelName(key))
+            record = a if source == "a" else b
+            if record is None:
+                result["removed"] += 1
+            else:
+                writer.writeRecord(record)
+                result[source] += 1
+                result["channels"] += 1
+            first = next(pairs, None)
+    finally:
+        writer.close()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare and merge .dkanim files outside of Maya.")
+    # Options of both commands
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--memory", type=int, help="megabytes of records sorted in memory for a compressed file, see DKANIM_DIFF_MAX_BYTES and DK_DIFF_MIN_RUN_BYTES")
+    common.add_argument("--temp", help="folder of the sorted runs of the compressed files, the temporary folder by default")
+    common.add_argument("--tolerance", type=float, default=DK_DIFF_TOLERANCE, help="tolerance on the times, values, angles and weights")
+    commands = parser.add_subparsers(dest="command")
+    diff_cmd = commands.add_parser("diff", help="Report the channels added, removed and changed from a to b", parents=[common])
+    diff_cmd.add_argument("a")
+    diff_cmd.add_argument("b")
+    diff_cmd.add_argument("--json", help="JSON lines file receiving the changes and a summary")
+    diff_cmd.add_argument("--quiet", action="store_true", help="only print the summary")
+    merge_cmd = commands.add_parser("merge", help="Write the channels of a and b to one file", parents=[common])
+    merge_cmd.add_argument("a")
+    merge_cmd.add_argument("b")
+    merge_cmd.add_argument("output")
+    merge_cmd.add_argument("--base", help="file a and b were both edited from, for a three-way merge")
+    merge_cmd.add_argument("--prefer", choices=("a", "b"), default="b", help="file the channels of both files (conflicts with --base) are taken from")
+    merge_cmd.add_argument("--binary", action="store_true", help="write a binary .dkanim file, see dkAnimBinary")
+    merge_cmd.add_argument("--compression", choices=sorted(dkAnimParser.DK_COMPRESSIONS), help="write a compressed text file")
+    args = parser.parse_args(argv)
+    if args.command not in ("diff", "merge"):
+        parser.print_help()
+        return 2
+    max_bytes = None if args.memory is None else args.memory * 1024 * 1024
+    try:
+        if args.command == "diff":
+            counts = {"added": 0, "removed": 0, "changed": 0}
+            stream = open(args.json, "w") if args.json else None
+            try:
+                for change in dk_diffFiles(args.a, args.b, args.tolerance, max_bytes, args.temp):
+                    counts[change["change"]] += 1
+                    if not args.quiet:
+                        print(dk_formatChange(change))
+                    if stream is not None:
+                        stream.write(json.dumps(change) + "\n")
+                if stream is not None:
+                    stream.write(json.dumps({"summary": counts, "a": args.a, "b": args.b}) + "\n")
+            finally:
+                if stream is not None:
+                    stream.close()
+            print("dkAnimDiff: {added} added, {removed} removed, {changed} changed".format(**counts))
+            return 1 if any(counts.values()) else 0
+        result = dk_mergeFiles(args.a, args.b, args.output, args.base, args.prefer, args.tolerance, args.binary, args.compression, max_bytes, args.temp)
+    except (OSError, ValueError) as e:
+        print("dkAnimDiff: {}".format(e))
+        return 2
+    if result["units"][0] != result["units"][1]:
+        print("dkAnimDiff: WARNING the files have different scene units {} and {}, the merge uses {}".format(*(result["units"] + [result["unit"]])))
+    for channel in result["conflicts"]:
+        print("dkAnimDiff: conflict {}, taken from {}".format(channel, args.prefer))
+    print("dkAnimDiff: {} channels written to [{}] ({} from a, {} from b, {} removed, {} conflicts)".format(
+        result["channels"], args.output, result["a"], result["b"], result["removed"], len(result["conflicts"])))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
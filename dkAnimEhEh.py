@@ -23,11 +23,51 @@ from functools import partial
 # Import Regular expressions
 import re
 import datetime
+import collections
+import itertools
+import sys
+import time
+# Import the Maya-free .dkanim reader and writer, and the import and export engines, next to this file
+try:
+    from . import dkAnimParser
+    from . import dkAnimImport
+    from . import dkAnimWriter
+    from . import dkAnimExport
+except ImportError:
+    import dkAnimParser
+    import dkAnimImport
+    import dkAnimWriter
+    import dkAnimExport
+try:
+    from . import dkAnimProgress
+    from . import dkAnimRemap
+    from . import dkAnimScene
+    from . import dkAnimReduce
+    from . import dkAnimProfile
+    from . import dkAnimPrefetch
+except ImportError:
+    import dkAnimProgress
+    import dkAnimRemap
+    import dkAnimScene
+    import dkAnimReduce
+    import dkAnimProfile
+    import dkAnimPrefetch
 
 # Global variables
 DKANIM_REFRESH = 1 #in Channels Window, 1 indicates that the channels list is NOT refreshed, MUST be refreshed
 DKANIM_REFRESH_KEEP = 1 #in Channels Window, 1 indicates that the current selected channels must stay selected
-progressBar_Maya = maya.mel.eval('$tmp = $gMainProgressBar')
+DKANIM_REMAPPER = None #(options, key, dkAnimRemap.DkRemapper) of the last read options, see dk_remapper
+DKANIM_PLAN_CHUNK = 500 #records read ahead by dk_animRead, the channels of these records are resolved in the scene in one batch, see dk_planRecords
+DKANIM_SHARE_CURVES = False #True : dk_animWrite writes identical curves once, the other channels reference them, see dkAnimWriter. Off by default : older versions of dkAnim skip the channels referencing a curve.
+DKANIM_SUMMARY_NAMES = 20 #names listed by the summary of the missing and locked channels at the end of dk_animRead
+DKANIM_CHANNELS = [] #"node.attr" names of dk_chanList, in its order, built by dk_loadChannels : dk_matchChannels matches them without querying the list
+DKANIM_PREFETCHER = dkAnimPrefetch.DkPrefetcher() #parses the file to import in the background as soon as its path is set, see dk_inputChanged. The parsed files are kept in dkAnimPrefetch.DKANIM_CACHE.
+DKANIM_PROFILE = False #True to time the phases and the maya.cmds commands of dk_animRead, dk_animWrite and dk_loadChannels, see dkAnimProfile
+try:
+    progressBar_Maya = maya.mel.eval('$tmp = $gMainProgressBar')
+except RuntimeError:
+    # mayapy and batch mode have no main progress bar, see dkAnimBatch
+    progressBar_Maya = ""
 progressWin_DK = "dre_dkAnimLoadProgress_window"
 progressBar_DK = "dre_dkAnimLoadProgWin_progressBar"
 
@@ -43,32 +83,53 @@ def dkAnimEhEh():
     dkver = "2.05"
     windowstits = "dkAnimEhEh Export-Import " + dkver
     # Create Window
-    cmds.window('dkAnim', s=False, ip=True, w=600, h=450, title=windowstits)
+    cmds.window('dkAnim', s=False, ip=True, w=600, h=570, title=windowstits)
     cmds.columnLayout("cl_global", co=('left',10), rs=20, bgc=(0.2, 0.15, 0.45))
     # Header Frame
     cmds.rowColumnLayout(parent="cl_global", nc=1, cw=[(1, 550)], cs=[(1, 0)], height=1)
     # Write Options Frame
-    cmds.frameLayout(parent="cl_global", borderVisible=True, labelVisible=True, li=10, h=120, w=575, label="WriteOptions", marginWidth=5, marginHeight=5, bgc=(0.45, 0.27, 0.15))
+    cmds.frameLayout(parent="cl_global", borderVisible=True, labelVisible=True, li=10, h=150, w=575, label="WriteOptions", marginWidth=5, marginHeight=5, bgc=(0.45, 0.27, 0.15))
     cmds.columnLayout("cl_WO", rs=5, bgc=(0.28, 0.27, 0.05))
     cmds.rowColumnLayout(parent="cl_WO", nc=1, cw=[(1, 550)], cs=[(2, 5)])
     cmds.rowColumnLayout(parent="cl_WO", nc=2, cw=[(1, 500), (2, 50)], cs=[(2, 5)])
     cmds.textField("dk_outname", text="out.dkanim", ed=1)
     cmds.button(label="Browse", bgc=(0.45, 0.27, 0.15), command=partial(dk_browse_output, 'w'))
-    cmds.rowColumnLayout(parent="cl_WO", nc=2, cw=[(1, 100), (2, 450)], cs=[(2, 5)])
+    cmds.rowColumnLayout(parent="cl_WO", nc=6, cw=[(1, 100), (2, 75), (3, 95), (4, 85), (5, 85), (6, 85)], cs=[(2, 5), (3, 5), (4, 5), (5, 5), (6, 5)])
     cmds.checkBox('dk_hierarchy', v=1, label=" Save Hierarchy")
-    cmds.button(label="Write Anim", w=400, bgc=(0.45, 0.27, 0.15), command=partial(dk_animWrite_progress, "dk_outname", "dk_hierarchy"))
+    # Binary files are smaller and faster to read, but can not be read with a text editor, see dkAnimBinary
+    cmds.checkBox('dk_binary', v=0, label=" Binary File")
+    # Compressed text files are several times smaller, for files read over the network
+    cmds.checkBox('dk_compress', v=0, label=" Compress (gzip)")
+    # Key reduction drops the keys the curve rebuilds within dkAnimReduce.DK_REDUCE_TOLERANCES
+    cmds.checkBox('dk_reduce', v=0, label=" Reduce Keys")
+    # Incremental export only formats the curves that changed since the last export to the same file, see dkAnimWriter
+    cmds.checkBox('dk_incremental', v=0, label=" Incremental")
+    cmds.button(label="Write Anim", w=85, bgc=(0.45, 0.27, 0.15), command=partial(dk_animWrite_progress, "dk_outname", "dk_hierarchy"))
+    # Shared curves make smaller files, but older versions of dkAnim skip the channels referencing a curve, see dkAnimWriter
+    cmds.rowColumnLayout(parent="cl_WO", nc=1, cs=[(1, 5)], cw=[(1, 550)])
+    cmds.checkBox('dk_share', v=0, label=" Share Identical Curves (older dkAnim versions skip the shared channels)")
+    # Only the keys of this time range are written, see dk_timeRangeFromUI
+    dk_timeRangeRow("cl_WO", "dk_w")
     # Read Options Frame
-    cmds.frameLayout(parent="cl_global", borderVisible=True, labelVisible=True, li=10, h=265, w=575, label="ReadOptions", marginWidth=5, marginHeight=5, bgc=(0.08, 0.32, 0.16))
+    cmds.frameLayout(parent="cl_global", borderVisible=True, labelVisible=True, li=10, h=355, w=575, label="ReadOptions", marginWidth=5, marginHeight=5, bgc=(0.08, 0.32, 0.16))
     cmds.columnLayout("cl_RO", rs=5, bgc=(0.14, 0.43, 0.13))
     cmds.rowColumnLayout(parent="cl_RO", nc=2, cw=[(1, 500), (2, 50)], cs=[(1, 5),(2, 5)])
-    cmds.textField("dk_inname", text="in.dkanim",  ed=1, changeCommand=partial(dk_setRefresh, 0))
+    cmds.textField("dk_inname", text="in.dkanim",  ed=1, changeCommand=partial(dk_inputChanged))
     cmds.button(label="Browse", bgc=(0.08, 0.32, 0.16), command=partial(dk_browse_output, 'r'))
+    # Only the keys of this time range are read, see dk_timeRangeFromUI
+    dk_timeRangeRow("cl_RO", "dk_r")
     cmds.separator(height=10, w=550, style="out")
-    cmds.rowColumnLayout(parent="cl_RO", nc=1, cs=[(1, 5)], cw=[(1, 550)])
+    cmds.rowColumnLayout(parent="cl_RO", nc=2, cs=[(1, 5),(2, 5)], cw=[(1, 300), (2, 250)])
     dk_doReplace = cmds.checkBox("dk_doReplace", al="left", v=0, label="Use Search and Replace", changeCommand=partial(dk_setRefresh, 1))
+    dk_regex = cmds.checkBox("dk_regex", v=0, label="Search is a Regular Expression", changeCommand=partial(dk_setRefresh, 1))
     cmds.rowColumnLayout(parent="cl_RO", nc=2, cs=[(1, 5),(2, 5)], cw=[(1, 275), (2, 275)])
     dk_search = cmds.textFieldGrp("dk_search", cal=[(1,'left'),(2,'left')], cw=[(1, 100), (2, 170)], label="  Search For:", changeCommand=partial(dk_setRefresh, 1))
     dk_replace = cmds.textFieldGrp("dk_replace", cw=[(1, 100), (2, 165)], label="Replace With:", changeCommand=partial(dk_setRefresh, 1))
+    # Mapping table : "source target" node names, applied before the rules above, see dkAnimRemap
+    cmds.rowColumnLayout(parent="cl_RO", nc=3, cs=[(1, 5),(2, 5),(3, 5)], cw=[(1, 100), (2, 390), (3, 50)])
+    cmds.text(label="  Mapping Table:", al="left")
+    cmds.textField("dk_mapFile", text="", ed=1, changeCommand=partial(dk_setRefresh, 1))
+    cmds.button(label="Browse", bgc=(0.08, 0.32, 0.16), command=partial(dk_browse_output, 'm'))
     cmds.separator(height=5, w=550, style="out")
     cmds.rowColumnLayout(parent="cl_RO", nc=2, cs=[(1, 5),(2, 5)], cw=[(1, 300), (2, 250)])
     dk_prefix = cmds.textFieldGrp("dk_prefix", cal=[(1,'left'),(2,'left')], cw=[(1, 100), (2, 174)], label="  Add Prefix:", changeCommand=partial(dk_setRefresh, 1))
@@ -77,6 +138,11 @@ def dkAnimEhEh():
     cmds.rowColumnLayout(parent="cl_RO", nc=2, cs=[(1, 5),(2, 5)], cw=[(1, 300), (2, 250)])
     dk_paths = cmds.checkBox("dk_paths", al="left", v=1, label="Load Explicit Node Paths", changeCommand=partial(dk_setRefresh, 1))
     dk_unKeyed = cmds.checkBox("dk_unKeyed", v=0, label="Load Un-Keyed Attributes", changeCommand=partial(dk_setRefresh, 0))
+    # Fast import : one undo step, no viewport refresh and no evaluation until the end, see dkAnimScene.DkFastImport
+    cmds.rowColumnLayout(parent="cl_RO", nc=1, cs=[(1, 5)], cw=[(1, 550)])
+    cmds.checkBox("dk_fastImport", al="left", v=0, label="Fast Import (one undo step, viewport refreshed at the end)")
+    # OpenMaya import : new curves are keyed in bulk by OpenMaya, outside of the undo queue, see dkAnimImport
+    cmds.checkBox("dk_apiImport", al="left", v=0, label="OpenMaya Import (faster for new curves, CAN NOT BE UNDONE)")
     cmds.separator(height=5, w=550, style="out")
     cmds.rowColumnLayout(parent="cl_RO", nc=2, cs=[(1, 5),(2, 5)], cw=[(1, 300), (2, 245)])
     dk_useChannels = cmds.checkBox("dk_useChannels", label="Limit Channels to Scope", al="left")
@@ -86,6 +152,28 @@ def dkAnimEhEh():
     cmds.button(label="Read Anim", w=549, bgc=(0.08, 0.32, 0.16), command=partial(dk_animRead_progress, "dk_inname", "dk_paths"))
     cmds.showWindow('dkAnim')
     
+def dk_timeRangeRow(parent, prefix):
+    # Start, end and new start time fields of the Write and Read frames, empty for no limit
+    cmds.rowColumnLayout(parent=parent, nc=6, cs=[(1, 5), (2, 5), (3, 5), (4, 5), (5, 5), (6, 5)], cw=[(1, 75), (2, 70), (3, 65), (4, 70), (5, 100), (6, 70)])
+    cmds.text(label="Start Time:", al="left")
+    cmds.textField(prefix + "Start", text="")
+    cmds.text(label="End Time:", al="right")
+    cmds.textField(prefix + "End", text="")
+    cmds.text(label="Move Start To:", al="right")
+    cmds.textField(prefix + "MoveTo", text="")
+
+def dk_timeRangeFromUI(prefix):
+    # dkAnimParser.DkTimeRange of the time range fields of dk_timeRangeRow, None when they are empty
+    times = []
+    try:
+        for field in ("Start", "End", "MoveTo"):
+            text = cmds.textField(prefix + field, q=True, text=True).strip()
+            times.append(float(text) if text else None)
+        return dkAnimParser.dk_timeRange(*times)
+    except ValueError as e:
+        cmds.confirmDialog(title="Invalid time range", message=str(e), icon="critical", button="OK", defaultButton="OK", cancelButton="OK", dismissString="OK")
+        raise RuntimeError(str(e))
+
 # def testor(inputarg, *args):
     # print("DKDEBUG: Value of: inputarg : " + str(inputarg))
 
@@ -99,6 +187,11 @@ def dk_setRefresh(keep_selection, *args):
     if cmds.window('dkAnim_channels', exists=True):
         dk_updateChanLabel()
 
+def dk_inputChanged(*args):
+    # The file to import changed : the channels window must be refreshed, and the file is parsed in the background
+    dk_setRefresh(0)
+    DKANIM_PREFETCHER.request(cmds.textField("dk_inname", q=True, text=True))
+
 #def dk_channels(filepathandname, *args):
 def dk_channels(InTextFieldName, *args):
     #global DKANIM_REFRESH commented out as it is is defined globaly and is not re-assigned in this function.
@@ -153,95 +246,69 @@ def dk_resize_chanList():
         cmds.textScrollList("dk_chanList", e=True, w=(cmds.scrollLayout("dk_scroll_layout", q=True, w=True) - 25), h=(cmds.scrollLayout("dk_scroll_layout", q=True, h=True) - 78))
 
 def dk_loadChannels(*args):
-    # In this function: selected channels are badly managed, need to rewrite and clean
-    #print("dk_loadChannels : " + "start")
+    # The names of the channels are built in memory (dk_channelNames), then pushed to dk_chanList in one edit, and the selection is
+    # set back (or set to all the channels) in one more edit : the list is edited a fixed number of times, whatever its length.
     global DKANIM_REFRESH
     global DKANIM_REFRESH_KEEP
+    global DKANIM_CHANNELS
     lisSelectedChans = []
-    size = 0
-    buffer = []
-    chan = ""
-    node = ""
-    path = ""
-    i = 0
     filename = cmds.textField("dk_inname", q=True, text=True)
+    profiler = dk_profiler("dk_loadChannels", filename)
     #Old code : test = cmds.filetest("-r", filename) 
     test = os.path.isfile(filename)
-    #print("DKDEBUG: LC: Value of: test : " + str(test))
-    #print("DKDEBUG: LC: Value of: cmds.textScrollList 1 dk_chanList q=True ai=True : " + str(cmds.textScrollList("dk_chanList", q=True, ai=True)))
-    # The following line gets an already existing channels selection 
-    #print("DKDEBUG: LC: Value of: dkAnim_channels visib true : " + str(cmds.window('dkAnim_channels', q=True, visible=True)))
-    #print("DKDEBUG: LC: Value of: dkAnim_channels exists true : " + str(cmds.window('dkAnim_channels', q=True, exists=True)))
     #Following line should be at the top of this function?
     if cmds.window('dkAnim_channels', q=True, exists=True):
-        lisSelectedChans = cmds.textScrollList("dk_chanList", q=True, sii=True) or [] #selectIndexedItem(sii) Select the indexed item. Indices are 1-based.
-        if lisSelectedChans == []:
-            DKANIM_REFRESH_KEEP = 0
-        #print("DKDEBUG: LC: Value of: lisSelectedChans : " + str(lisSelectedChans))
-        cmds.textScrollList("dk_chanList", e=True, w=10, h=10, vis=0, m=0)
-        print("dkAnim: Loading Channel List...")
-        if not test:
-            cmds.textScrollList("dk_chanList", e=True, w=10, h=10, vis=0, m=0, ra=True)
-            # confirm = cmds.confirmDialog(title="Warning", message="File Doesn't Exist", button="Ok", defaultButton="Ok", cancelButton="Ok", dismissString="Ok")
-        else:
-            cmds.textScrollList("dk_chanList", e=True, w=10, h=10, vis=0, m=0, ra=True)
-            fileID = open(filename, "r+") # Open for reading and writing.  The stream is positioned at the beginning of the file.
-            while True: # means loop forever
-                line = fileID.readline()
-                if not line:
-                    break # means exit loop at last line
-                buffer = line.split()
-                size = len(buffer)
-                if size > 0:
-                    if line[:5] == "anim " or line[:7] == "static ":
-                        if size == 6 or size == 7:
-                            if line[:5] == "anim " or (line[:7] == "static " and cmds.checkBox("dk_unKeyed", q=True, v=True)):
-                                filtered_names = dk_filter_nodes(line, cmds.checkBox("dk_paths", q=True, v=True))
-                                node = filtered_names[2]
-                                chan = filtered_names[3]
-                                # This will populate dk_chanList
-                                cmds.textScrollList("dk_chanList", e=True, a=(node + "." + chan), w=10, h=10, vis=0, m=0)
-                                #print("DKDEBUG: LC: Value of: cmds.textScrollList 3 dk_chanList q=True, ai=True : " + str(cmds.textScrollList("dk_chanList", q=True, ai=True)))
-            arrayAllItems = cmds.textScrollList("dk_chanList", q=True, ai=True)
-            fileID.close()
-        DKANIM_REFRESH = 0
-        #print("DKDEBUG: LC: Value of: lisSelectedChans : " + str(lisSelectedChans))
-        #print("DKDEBUG: LC: Value of: cmds.textScrollList dk_chanList q=True ai=True : " + str(cmds.textScrollList("dk_chanList", q=True, ai=True)))
-        #print("DKDEBUG: LC: Value of: cmds.textScrollList dk_chanList q=True, sii=True : " + str(cmds.textScrollList("dk_chanList", q=True, sii=True)))
-        #print("DKDEBUG: LC: Value of: DKANIM_REFRESH_KEEP : " + str(DKANIM_REFRESH_KEEP))
-        # Next line : if channels selection does not already exist, create a new one based on the list of all items
-        if DKANIM_REFRESH_KEEP == 1:
-            for item in lisSelectedChans:
-                cmds.textScrollList("dk_chanList", e=True, sii=item)
-                #print("DKDEBUG: LC: Value of: cmds.textScrollList dk_chanList q=True sii=item : " + str(cmds.textScrollList("dk_chanList", q=True, sii=item)))
-        else:
-            i = 1
-            #print("DKDEBUG: LC: Value of: arrayAllItems : " + str(arrayAllItems))
-            #print("DKDEBUG: LC: LENGTH of: arrayAllItems : " + str(len(arrayAllItems)))
-            #if i <= len(arrayAllItems):
-                #print("DKDEBUG: LC: i less than arrayAllItems : " + "true")
-            while i <= len(arrayAllItems):
-                #print("DKDEBUG: LC: i less than arrayAllItems : " + str(i))
-                cmds.textScrollList("dk_chanList", edit=True, sii=i)
-                i += 1
-        arraySelIndexes = cmds.textScrollList("dk_chanList", q=True, sii=True)
-        #print("DKDEBUG: LC: Value of: sii : " + str(cmds.textScrollList("dk_chanList", q=True, sii=True)))
-        #print("DKDEBUG: LC: LENGTH of: ssi : " + str(len(cmds.textScrollList("dk_chanList", q=True, sii=True))))
-        #print("DKDEBUG: LC: values of: arraySelIndexes : " + str(arraySelIndexes))
-        #print("DKDEBUG: LC: length of: arraySelIndexes : " + str(len(arraySelIndexes)))
-        i=0
-        while i <= len(arraySelIndexes)-1:
-            #print("DKDEBUG: LC: selected item name " + str(i) + " : " + str(arrayAllItems[i]))
-            i += 1
-        lisSelectedChans = arraySelIndexes
-        #print("DKDEBUG: LC: Value of: lisSelectedChans : " + str(lisSelectedChans))
-        cmds.textScrollList("dk_chanList", e=True, w=10, h=10, vis=1, m=1)
-        #print("DKDEBUG: LC: Value of: cmds.textScrollList 5 dk_chanList q=True, ai=True : " + str(cmds.textScrollList("dk_chanList", q=True, ai=True)))
-        DKANIM_REFRESH_KEEP = 1
-        dk_updateChanLabel()
-        dk_resize_chanList()
+        profiler.instrument(dk_profiledModules())
+        try:
+            # The following line gets an already existing channels selection 
+            lisSelectedChans = cmds.textScrollList("dk_chanList", q=True, sii=True) or [] #selectIndexedItem(sii) Select the indexed item. Indices are 1-based.
+            if lisSelectedChans == []:
+                DKANIM_REFRESH_KEEP = 0
+            print("dkAnim: Loading Channel List...")
+            DKANIM_CHANNELS = []
+            if test:
+                # The names of the list are not limited to the scope, they define it
+                options = dk_readOptionsFromUI(cmds.checkBox("dk_paths", q=True, v=True), use_scope=False)
+                DKANIM_CHANNELS = dk_channelNames(filename, options, profiler)
+            with profiler.phase("ui"):
+                cmds.textScrollList("dk_chanList", e=True, w=10, h=10, vis=0, m=0, ra=True)
+                if DKANIM_CHANNELS:
+                    # This will populate dk_chanList
+                    cmds.textScrollList("dk_chanList", e=True, a=DKANIM_CHANNELS)
+                DKANIM_REFRESH = 0
+                # Next line : if channels selection does not already exist, create a new one based on the list of all items
+                if DKANIM_REFRESH_KEEP == 1:
+                    selection = [item for item in lisSelectedChans if item <= len(DKANIM_CHANNELS)]
+                else:
+                    selection = list(range(1, len(DKANIM_CHANNELS) + 1))
+                if selection:
+                    cmds.textScrollList("dk_chanList", e=True, sii=selection)
+                cmds.textScrollList("dk_chanList", e=True, w=10, h=10, vis=1, m=1)
+            profiler.count("channels", len(DKANIM_CHANNELS))
+            DKANIM_REFRESH_KEEP = 1
+            dk_updateChanLabel()
+            dk_resize_chanList()
+        finally:
+            # maya.cmds is given back to the modules even when the scan or the UI fails
+            profiler.restore()
+        dk_endProfile(profiler)
         print("dkAnim: Done Loading Channel List")
 
+def dk_channelNames(filename, options, profiler=None):
+    # Returns the "node.attr" names of the channels of filename, renamed by options (a DkReadOptions), as dk_chanList lists them
+    profiler = profiler or dkAnimProfile.DkProfiler("dk_channelNames")
+    names = []
+    # Keys are not needed to list the channels : they come from the file parsed in the background or by a previous import (see
+    # dkAnimPrefetch), from the index of the file, or from a scan without the keys
+    parsed = DKANIM_PREFETCHER.get(filename)
+    records = parsed.records if parsed is not None else dkAnimParser.dk_iterChannels(filename)
+    for record in profiler.iterate("parse", records):
+        if record.kind == "anim" or (record.kind == "static" and options.unKeyed):
+            with profiler.phase("filter"):
+                filtered_names = dk_filter_nodes(record, options)
+            names.append(filtered_names[2] + "." + filtered_names[3])
+    return names
+
 def dk_updateChanLabel(*args):
     #global DKANIM_REFRESH  commented out as it is is defined globaly and is not re-assigned in this function.
     #global DKANIM_REFRESH_KEEP  commented out as it is is defined globaly and is not re-assigned in this function.
@@ -257,29 +324,21 @@ def dk_updateChanLabel(*args):
     cmds.text("dk_chanLabel", e=True, label="{} Channel{} Scoped ({})".format(num, s, state))
 
 def dk_matchChannels(mode, *args):
-    loop = 1
+    # Selects (mode 1) or deselects (mode 0) the channels matching the wildcard, in one edit of dk_chanList
     total = cmds.textScrollList("dk_chanList", q=True, ni=True)
-    #print("DKDEBUG: Value of: total : " + str(total))
-    all_items = cmds.textScrollList("dk_chanList", q=True, ai=True)
-    #print("DKDEBUG: Value of: all_items : " + str(all_items))
+    # The names built by dk_loadChannels, unless the list was edited since
+    all_items = DKANIM_CHANNELS
+    if len(all_items) != total:
+        all_items = cmds.textScrollList("dk_chanList", q=True, ai=True) or []
     strTextWildCard = cmds.textField("dk_wildCard", q=True, tx=True)
-    strTextRegex = wildcard_to_regex(strTextWildCard)
-    #print("DKDEBUG: Value of: strTextWildCard : " + strTextWildCard)
-    #print("DKDEBUG: Value of: strTextRegex : " + strTextRegex)
-    while loop <= total:
-        #print("DKDEBUG: Value of: all_items[loop - 1] " + all_items[loop - 1])
-        text_found = re.search(strTextRegex, all_items[loop - 1], re.IGNORECASE)
-        #old code : if strTextRegex in all_items[loop - 1]:
-        if text_found :
-            #print("DKDEBUG: Value of: text_found.group(0) " + text_found.group(0))
-            #print("DKDEBUG: Value of: strTextRegex : FOUND in " + all_items[loop - 1])
-            if mode:
-                cmds.textScrollList("dk_chanList", e=True, sii=loop)
-            else:
-                cmds.textScrollList("dk_chanList", e=True, dii=loop)
-        #else:
-        #    print("DKDEBUG: Value of: strTextRegex : NOT FOUND in " + all_items[loop - 1])
-        loop += 1
+    # Compiled once for all the channels
+    pattern = re.compile(wildcard_to_regex(strTextWildCard), re.IGNORECASE)
+    indices = [i for i, item in enumerate(all_items, 1) if pattern.search(item)]
+    if indices:
+        if mode:
+            cmds.textScrollList("dk_chanList", e=True, sii=indices)
+        else:
+            cmds.textScrollList("dk_chanList", e=True, dii=indices)
     dk_updateChanLabel()
     
 def wildcard_to_regex(wildcard_pattern):
@@ -333,6 +392,13 @@ def dk_browse_output(field, *args):
             file_path = dre_dkAnimPath(fileName[0])
             print("dkAnim: File path : [{}]".format(file_path))
             cmds.textField("dk_inname", e=True, tx=file_path)
+            # Editing the field does not run its changeCommand
+            dk_inputChanged()
+    elif field == 'm':
+        fileName = cmds.fileDialog2(fm=1, cap="Mapping Table", okc="Open", startingDirectory=workSpaceDir)
+        if fileName and len(fileName):
+            cmds.textField("dk_mapFile", e=True, tx=fileName[0])
+            dk_setRefresh(1)
 
 def dre_dkAnimPath(file_path):
     #ctypes.windll.user32.MessageBoxW(0, file_path, "Value of: file_path", 1) #TEST
@@ -356,11 +422,26 @@ def dk_edit_output(file_name, file_type):
 def dk_animWrite_progress(OutTextFieldName, hiCheckBoxName, *args):
     strFilename = cmds.textField(OutTextFieldName, q=True, text=True)
     booSaveHierarchy = cmds.checkBox(hiCheckBoxName, q=True, value=True)
+    booBinary = cmds.checkBox("dk_binary", q=True, value=True)
+    strCompression = "gzip" if cmds.checkBox("dk_compress", q=True, value=True) else None
+    if booBinary and strCompression:
+        cmds.warning("dkAnim: Binary files can not be compressed, the file will be written uncompressed")
+        strCompression = None
+    booReduce = cmds.checkBox("dk_reduce", q=True, value=True)
+    booIncremental = cmds.checkBox("dk_incremental", q=True, value=True)
+    if booIncremental and (booBinary or strCompression):
+        cmds.warning("dkAnim: Incremental export only writes plain text files, the whole file will be written")
+        booIncremental = False
+    booShare = cmds.checkBox("dk_share", q=True, value=True)
+    if booShare and strCompression:
+        cmds.warning("dkAnim: Shared curves are read by seeking back to them, compressed files do not share curves")
+        booShare = False
+    timeRange = dk_timeRangeFromUI("dk_w")
     # print("DKDEBUG: Value of: strFilename : " + str(strFilename))
     # print("DKDEBUG: Value of: booSaveHierarchy : " + str(booSaveHierarchy))
     # print("DKDEBUG: Value of: txtfield : " + cmds.textField('dk_outname', q=True, text=True))
     #global progressBar_Maya  : This is defined on maya startup, old name : gMainProgressBar, commented out as it is is defined globaly and is not reset in this function.
-    global progressBar_DK # will be a string that will be defined inside this function, by calling another function
+    #global progressBar_DK : now defined by DkMayaProgressReporter.begin
     #global progressWin_DK # A string variable that will be defined in the dre_dkAnim_progressWin_proc function, commented out in 2024-01-06 because it is defined globally, is not reassigned here, is just accessed here.
     #Moved to global variables section : progressBar_Maya = maya.mel.eval('$tmp = $gMainProgressBar')
     # Next line: if hierarchy check box is checked, select already selected objects with their hierarchy
@@ -401,260 +482,283 @@ def dk_animWrite_progress(OutTextFieldName, hiCheckBoxName, *args):
     confirm = cmds.confirmDialog(title=("Write Anim for {}?".format(objs_count)), message=("Are you sure you want to write animation for {} selected objects\ninto the file : {}".format(objs_count, file_short_name.group(0))), button=["Yes", "Cancel"], defaultButton="Yes", cancelButton="Cancel", dismissString="Cancel")
     if confirm == "Cancel":
         return
-    # Progress Bar DK, old name : dkAnimErwin_progressBar
-    progressBar_DK = dre_dkAnim_progressWin_proc("Exporting Animation", objs_count)
-    # Do writing to file
-    #try: uncomment when all is working well
-    dk_animWrite(strFilename, booSaveHierarchy)
-    #except Exception as e:
-    #    raise RuntimeError("Error writing animation to file: {}".format(str(e)))
-    # Close progress bar DK 
-    cmds.progressBar(progressBar_DK, edit=True, endProgress=True)
+    # Progress Bar DK, old name : dkAnimErwin_progressBar, and progress bar Maya, see DkMayaProgressReporter
+    reporter = DkMayaProgressReporter()
+    reporter.begin("Exporting Animation", objs_count)
+    # Do writing to file, the progress bars are closed even if it fails
     try:
-        cmds.deleteUI(progressWin_DK)
-    except Exception:
-        pass
-    # Reset progress bar Maya 
-    cmds.progressBar(progressBar_Maya, edit=True, endProgress=True)
+        dk_animWrite(strFilename, booSaveHierarchy, booBinary, compression=strCompression, reporter=reporter, reduce=booReduce, time_range=timeRange, incremental=booIncremental, share=booShare)
+    finally:
+        reporter.end()
 
-def dk_animWrite(filename, hi):
-    parent = 0
+def dk_animWrite(filename, hi, binary=False, compression=None, reporter=None, reduce=None, time_range=None, incremental=False, share=None, profile=None):
+    # binary : write the binary form of the file, see dkAnimBinary
+    # compression : None, "gzip", "bz2" or "xz" to write a compressed text file, see dkAnimWriter.dk_openDkAnimWriter
+    # reporter : a dkAnimProgress reporter, given the number of objects written (DkMayaProgressReporter from the UI), none by default
+    # reduce : True to drop the keys the curves rebuild within dkAnimReduce.DK_REDUCE_TOLERANCES, or a {attribute type: tolerance}
+    #          dictionary overriding some of them, see dkAnimReduce
+    # time_range : a dkAnimParser.DkTimeRange, only the keys of the range are queried and written, moved by its offset. The curves
+    #              without key in the range are written as a static value, their value at the start of the range.
+    # incremental : the curves that did not change since the last incremental export to filename are copied from it, see
+    #               dkAnimWriter.DkIncrementalTextWriter
+    # share : identical curves are written once, the other channels reference them. DKANIM_SHARE_CURVES when None, except for
+    #         compressed files, see dkAnimWriter.dk_openDkAnimWriter
+    # profile : time the phases and commands of the export, see dkAnimProfile. DKANIM_PROFILE when None.
+    # Returns the number of objects, curves and static values written, and the keys dropped by the key reduction per channel
+    profiler = dk_profiler("dk_animWrite", filename, profile)
+    # The hierarchy is selected before the objects are listed : the batch calls dk_animWrite with the roots selected
+    if hi:
+        cmds.select(hi=True)
     objects = cmds.ls(sl=True, l=True)
+    reporter = reporter or dkAnimProgress.DkProgressReporter()
     print("dkAnim: Writing Animation Curves...")
-    start_time = cmds.date(time=True)
-    start_timer = cmds.timerX()
-    print("dk_animWrite: Writing Animation started at [{}]".format(start_time))
-    with open(filename, 'w') as file_id:
-        file_id.write("#Generated by dkAnim script\n#\n#dkAnim written by Daniel Kramer danl_kramer@yahoo.com\n")
-        file_id.write("#dkAnimErwin is a version of dkAnim by Dan Erwin - danimations@gmail.com\n")
-        file_id.write("#dkAnimEhEh is a version of dkAnimErwin by David Saber - dreamcraftdigital.com\n")
-        file_id.write("#Written out of {}\n#\n\n".format(cmds.file(q=True, sn=True)))
+    # Long name and parent flag of each animated node, resolved once per node
+    node_infos = {}
+    # Key reduction settings, the angles and time units of the keys are the UI units
+    if reduce:
+        tolerances = dict(dkAnimReduce.DK_REDUCE_TOLERANCES)
+        if isinstance(reduce, dict):
+            tolerances.update(reduce)
+        fps = dkAnimReduce.dk_timeUnitFps(cmds.currentUnit(q=True, time=True))
+        degrees = cmds.currentUnit(q=True, angle=True) == "deg"
+    key_count = 0
+    dropped_keys = {}
+    if share is None:
+        share = DKANIM_SHARE_CURVES and not compression
+    writer = dkAnimWriter.dk_openDkAnimWriter(filename, cmds.file(q=True, sn=True), binary, compression, incremental, share)
+    # The incremental export only replaces the previous file when the export is complete, see dkAnimWriter.DkIncrementalTextWriter
+    completed = False
+    cancelled = False
+    profiler.instrument(dk_profiledModules())
+    try:
         # define scene space units
-        file_id.write("sceneUnit {}\n\n".format(cmds.currentUnit(q=True, linear=True)))
-        if hi:
-            cmds.select(hi=True)
+        writer.writeRecord(dkAnimParser.DkSceneUnit(cmds.currentUnit(q=True, linear=True)))
         count = 0
+        curve_count = 0
+        static_count = 0
         objs_count = len(objects)
         #print("DKDEBUG: Value of: objs_count : " + str(objs_count))
         for item in objects:
             #print("DKDEBUG: Value of: item : " + item)
-            #short items: what is it for? It's never used elsewhere in the code. Commented out. Original mel code : $shortItem = `ls -sl $item`;. ChatGPT translated code: short_item = cmds.ls(sl=item)[0] . Code to attempt to fix 1st: short_item = cmds.ls(sl=True)[0]. Code to attempt to fix 2nd: short_item = cmds.ls(sn=True)[0]
-            #cmds.confirmDialog(title="Value of: short_item", message=short_item, icon="information", button="OK", defaultButton="OK", cancelButton="OK", dismissString="OK") #TEST
             channels = cmds.listConnections(item, type='animCurve')
             #begin Detecting if selected object has animations
-            #print("DKDEBUG: Value of: channels type : " + str(type(channels)))
             if channels:
-                #print("Channel has content!")
                 for chan in channels:
                     #print("DKDEBUG: Value of: chan : " + chan + " . Type of: chan : " + str(type(chan)))
                     connects = cmds.listConnections(chan, p=True)
                     cur_attr = connects[0]
-                    num = len(cur_attr.split("."))
-                    node = ".".join(cur_attr.split(".")[:-1])
-                    node_temp = cmds.ls(node, l=True) #The ls command returns the names (and optionally the type names) of objects in the scene.
+                    node, parent = dkAnimExport.dk_nodeInfo(".".join(cur_attr.split(".")[:-1]), node_infos)
                     attr = cur_attr.split(".")[-1]
-                    node = node_temp[0]
-                    node_temp = cmds.listRelatives(node, p=True)
-                    if node_temp:
-                        parent = 1
-                    else:
-                        parent = 0
-                    testit = cmds.listAnimatable(cur_attr)
-                    testit2 = cmds.keyframe(chan, q=True)
-                    if testit and testit2:
-                        pre_in = cmds.getAttr("{}.preInfinity".format(chan))
-                        post_in = cmds.getAttr("{}.postInfinity".format(chan))
-                        weighted = cmds.getAttr("{}.weightedTangents".format(chan))
-                        file_id.write("anim {} {} {} {} 0 0;\n".format(attr, attr, node, parent))
-                        file_id.write("animData {\n")
-                        file_id.write("  weighted {};\n".format(weighted))
-                        file_id.write("  preInfinity {};\n".format(pre_in))
-                        file_id.write("  postInfinity {};\n".format(post_in))
-                        file_id.write("  keys {\n")
-                        keys = cmds.keyframe(chan, q=True)
-                        values = cmds.keyframe(chan, q=True, vc=True)
-                        in_tan = cmds.keyTangent(chan, q=True, itt=True) #outTangentType inTangentType. "Fixed tangents" means retaining the tangent’s angle
-                        out_tan = cmds.keyTangent(chan, q=True, ott=True)
-                        tan_lock = cmds.keyTangent(chan, q=True, lock=True) #Lock a tangent so in and out tangents move together. Returns an int[] when queried.
-                        weight_lock = cmds.keyTangent(chan, q=True, weightLock=True) #Lock the weight of a tangent so it is fixed. -weightLock off means tangent has free length, and on means locked length
-                        #print("DKDEBUG: Value of: weight_lock : " + str(item) + " : " + str(weight_lock)) most of the time, all of these are false
-                        breakdown = cmds.keyframe(chan, q=True, breakdown=True)
-                        in_angle = cmds.keyTangent(chan, q=True, inAngle=True) #the following 4 lines are float values for tangents angles and length
-                        out_angle = cmds.keyTangent(chan, q=True, outAngle=True)
-                        in_weight = cmds.keyTangent(chan, q=True, inWeight=True)
-                        out_weight = cmds.keyTangent(chan, q=True, outWeight=True)
-                        for i in range(len(keys)):
-                            bd = 0
-                            if breakdown:
-                                for bd_item in breakdown:
-                                    if bd_item == keys[i]:
-                                        bd = 1
-                            file_id.write("    {} {} {} {} {} {} {}".format(keys[i], values[i], in_tan[i], out_tan[i], tan_lock[i], weight_lock[i], bd))
-                            if in_tan[i] == "fixed":
-                                file_id.write(" {} {}".format(in_angle[i], in_weight[i]))
-                            if out_tan[i] == "fixed":
-                                file_id.write(" {} {}".format(out_angle[i], out_weight[i]))
-                            file_id.write(";\n")
-                        file_id.write("  }\n}\n")
-            #else:
-                #cmds.confirmDialog(title="Value of: channels", message="NOTHING?", icon="information", button="OK", defaultButton="OK", cancelButton="OK", dismissString="OK")
+                    if cmds.listAnimatable(cur_attr):
+                        # All the keys of the curve are read at once, see dkAnimExport
+                        with profiler.phase("query"):
+                            curve = dkAnimExport.dk_queryCurve(chan, attr, node, parent, time_range=time_range)
+                        if curve is None and time_range is not None and time_range.start is not None and cmds.keyframe(chan, q=True, keyframeCount=True):
+                            writer.writeRecord(dkAnimParser.DkStatic(attr, node, parent, cmds.getAttr(cur_attr, time=time_range.start)))
+                            static_count += 1
+                        if curve is not None:
+                            if reduce:
+                                key_count += curve.keyCount
+                                with profiler.phase("reduce"):
+                                    curve, dropped = dkAnimReduce.dk_reduceCurve(curve, tolerances, fps, degrees)
+                                if dropped:
+                                    dropped_keys["{}.{}".format(node, attr)] = dropped
+                            with profiler.phase("write"):
+                                writer.writeRecord(curve)
+                            curve_count += 1
+                            profiler.count("keys", curve.keyCount)
             #end Detecting if selected object has animations
             #Below, dkAnim will store static , non animated values inside the text file
-            static_chans = cmds.listAnimatable(item)
-            if static_chans:
-                for static_chan in static_chans:
-                    cur_attr = static_chan
-                    num = len(cur_attr.split("."))
-                    node = ".".join(cur_attr.split(".")[:-1])
-                    node_temp = cmds.ls(node, l=True)
-                    attr = cur_attr.split(".")[-1]
-                    node = node_temp[0]
-                    node_temp = cmds.listRelatives(node, p=True)
-                    if node_temp:
-                        parent = 1
-                    else:
-                        parent = 0
-                    static_chan = "{}.{}".format(node, attr)
-                    testit = cmds.keyframe(static_chan, q=True)
-                    connected = cmds.listConnections(static_chan, d=False)
-                    if not testit and not connected:
-                        file_id.write("static {} {} {} {} {}\n".format(attr, attr, node, parent, cmds.getAttr(static_chan)))
-            # progress progressBar one step further 
-            cmds.progressBar(progressBar_DK, edit=True, step=1, max=objs_count)
-            cmds.progressBar(progressBar_Maya, edit=True, step=1, max=objs_count)
+            # Queried per node, see dkAnimExport.dk_queryStatics
+            with profiler.phase("query"):
+                statics = dkAnimExport.dk_queryStatics(item, node_infos)
+            with profiler.phase("write"):
+                for record in statics:
+                    writer.writeRecord(record)
+            static_count += len(statics)
             count += 1
+            # progress progressBar one step further, the reporter limits how often the bars are edited and the cancel button is queried
+            with profiler.phase("ui"):
+                reporter.update(count, objs_count)
+                cancelled = reporter.cancelled()
             #cmds.confirmDialog(title="Value of: count", message=count, icon="information", button="OK", defaultButton="OK", cancelButton="OK", dismissString="OK")
-            if objs_count == count or cmds.progressBar(progressBar_DK, query=True, isCancelled=True):
-                if cmds.progressBar(progressBar_DK, query=True, isCancelled=True):
+            if objs_count == count or cancelled:
+                if cancelled:
                     print("dkAnim: User canceled exporting animation file...")
                 break
-    endTime = cmds.date(time=True)
-    print("dk_animWrite: Finished Writing Animation at [" + str(endTime) + "]")
+        completed = not cancelled
+    finally:
+        with profiler.phase("write"):
+            writer.close(completed)
+        profiler.restore()
+    profiler.count("objects", count)
+    profiler.count("curves", curve_count)
+    profiler.count("statics", static_count)
+    if reduce:
+        dropped_total = sum(dropped_keys.values())
+        print("dkAnim: Key reduction dropped {} of {} keys, on {} of {} curves".format(dropped_total, key_count, len(dropped_keys), curve_count))
+        if dropped_keys:
+            dk_printSummary("Keys dropped on {} channels", ["{} ({})".format(channel, dropped) for channel, dropped in dropped_keys.items()])
+    copied_count = writer.copied if incremental else 0
+    if writer.references:
+        print("dkAnim: {} of {} curves are identical to a curve written before them, they were written as references".format(writer.references, curve_count))
+    if incremental:
+        print("dkAnim: Incremental export : {} curves copied from the previous file, {} written".format(writer.copied, writer.formatted))
+    report = dk_endProfile(profiler)
     print("dkAnim: script completed")
+    return {"objects": count, "curves": curve_count, "statics": static_count, "droppedKeys": dropped_keys, "copiedCurves": copied_count,
+            "sharedCurves": writer.references, "seconds": profiler.seconds, "profile": report}
 
-def dk_filter_nodes(line, paths):
-    #print("DKDEBUG: DFN: Value of line : " + line)
-    global DKANIM_REFRESH # this is a global variable
-    DKANIM_REFRESH = 0  
-    buffer = line.split()
-    return_val = []
-    # use search and replace
-    strSearch = cmds.textFieldGrp("dk_search", q=True, text=True)
-    strReplace = cmds.textFieldGrp("dk_replace", q=True, text=True)
-    boodo_replace = cmds.checkBox("dk_doReplace", q=True, v=True)
-    if boodo_replace and strSearch:
-        #print("DKDEBUG: DFN : Value of: strSearch strReplace boodo_replace : " + strSearch + " " + strReplace + " " + str(boodo_replace))
-        #match = "*" + strSearch + "*"
-        buffer[3] = buffer[3].replace(strSearch, strReplace)
-    #print("DKDEBUG: DFN : Value of: buffer[3] : " + buffer[3]) 
-    # Add Prefix:
-    prefix = cmds.textFieldGrp("dk_prefix", q=True, text=True)
-    # David Saber says in 2024-02: I added the following if statement as I beleive it was missing...
-    if prefix != "":
-        new_path = ""
-        #print("DKDEBUG: DFN : Value of: checkBox dk_topNodes : " + str(cmds.checkBox("dk_topNodes", q=True, v=True)))
-        #print("DKDEBUG: DFN : Value of: checkBox buffer[4] : " + str(buffer[4]))
-        #buffer[4] is the parental status: 0 means no parent and 1 means "has a parent", so next line means : if check box is unchecked, or if it is checked but object has no parent
-        if (cmds.checkBox("dk_topNodes", q=True, v=True) and buffer[4] == "0") or not cmds.checkBox("dk_topNodes", q=True, v=True):
-            if "|" in buffer[3]:
-                buffer2 = buffer[3].split("|")
-                #print("DKDEBUG: DFN : Value of: buffer2 : " + str(buffer2))
-                for item in buffer2:
-                    if item != "" :
-                        new_path += "|" + prefix + item
-                        #print("DKDEBUG: DFN : Value of: new_path : " + new_path)
-                buffer[3] = new_path
-            else:
-                buffer[3] = prefix + buffer[3]
-        # Add to top nodes only
-        if cmds.checkBox("dk_topNodes", q=True, v=True) and buffer[4] == "1":
-            if "|" in buffer[3]:
-                buffer2 = buffer[3].split("|")
-                for i in range(len(buffer2)):
-                    if i == 0:
-                        new_path = "|" + prefix + buffer2[i]
-                    else:
-                        new_path += "|" + buffer2[i]
-                buffer[3] = new_path
-    # Load explicit node path: if this checkbox is unchecked :
-    #print("DKDEBUG: DFN : before LENP: Value of: buffer[3] : " + buffer[3])
-    if paths == 0:
-        buffer3 = buffer[3].split("|")
-        buffer[3] = buffer3[-1]
-    #print("DKDEBUG: DFN : after Load explicit node path: Value of: buffer[3] : " + buffer[3])
-    # Use selected channels in channels window
-    #print("DKDEBUG: DFN : Value of: cmds.window dkAnim_channels visible=True : " + str(cmds.window("dkAnim_channels", q=True, visible=True)))
-    if cmds.checkBox("dk_useChannels", q=True, v=True) and cmds.window("dkAnim_channels", q=True, ex=True):
+# Read options of the UI, snapshotted once by dk_readOptionsFromUI before reading a file, see dk_filter_nodes.
+# scope is a frozenset of the "node.attr" names selected in the channels window, or None when channels are not limited to the scope.
+# regexRules is a tuple of (pattern, replacement) pairs and mappingFile a mapping table file name, see dkAnimRemap.
+# timeRange is a dkAnimParser.DkTimeRange, or None to read all the keys.
+# engine is the dkAnimImport engine keying the curves, dkAnimImport.DKANIM_APPLY_ENGINE when None.
+DkReadOptions = collections.namedtuple("DkReadOptions", ["doReplace", "search", "replace", "prefix", "topNodes", "paths", "unKeyed", "scope", "regexRules", "mappingFile", "fast", "timeRange", "engine"], defaults=((), "", False, None, None))
+
+
+def dk_readOptionsFromUI(paths, use_scope=True):
+    # Returns the DkReadOptions of the ReadOptions frame. paths is the value of the "Load Explicit Node Paths" checkbox.
+    # The channels window is queried here only, never while the file is read.
+    scope = None
+    if use_scope and cmds.checkBox("dk_useChannels", q=True, v=True) and cmds.window("dkAnim_channels", q=True, ex=True):
         if cmds.window("dkAnim_channels", q=True, visible=True):
-            pass_val = 0
-            loop = 0
-            total = cmds.textScrollList("dk_chanList", q=True, ni=True)
-            all_items = cmds.textScrollList("dk_chanList", q=True, ai=True)
-            #print("DKDEBUG: DFN: value of all_items : " + str(all_items))
+            all_items = cmds.textScrollList("dk_chanList", q=True, ai=True) or []
             selected = cmds.textScrollList("dk_chanList", q=True, sii=True) #selectIndexedItem(sii)	: Select the indexed item. Indices are 1-based.
             # if there's no selection, create one based on all items
             if not selected:
-                i = 1
-                while i <= total:
-                    #print("DKDEBUG: DFN: i less than arrayAllItems : " + str(i))
-                    cmds.textScrollList("dk_chanList", edit=True, sii=i)
-                    i += 1
-            #print("DKDEBUG: DFN : Value of: selected : " + str(selected))
-            #print("DKDEBUG: DFN : Value of: selected.len : " + str(len(selected)))
-            text = "{}.{}".format(buffer[3], buffer[2])
-            #print("DKDEBUG: DFN : Value of: total : " + str(total))
-            #print("DKDEBUG: DFN : Value of: text : " + text)
-            #print("DKDEBUG: DFN : Value of: selected : " + str(selected))
-            #while loop <= total:
-            strToFind = ""
-            while loop < len(selected):
-                strToFind = all_items[selected[loop] - 1]
-                #strToFind = "caca"
-                #strFoundMatch = re.search(strToFind, text, re.IGNORECASE)
-                #strFoundMatch = re.search("(?:" + strToFind + ")*", text, re.IGNORECASE)
-                #print("DKDEBUG: DFN : Value of: loop : " + str(loop))
-                #print("DKDEBUG: DFN : Value of: loop - 1 : " + str(loop - 1))
-                #print("DKDEBUG: DFN : Value of: selected [loop] : " + str(selected[loop]))
-                #print("DKDEBUG: DFN : Value of strToFind : " + strToFind)
-                if strToFind == text :
-                    #print("DKDEBUG: DFN : Value of: strToFind : " + "MATCH FOUND")
-                # if strFoundMatch :
-                    # print("DKDEBUG: DFN : Value of: strFoundMatch : " + str(strFoundMatch.group(0)))
-                # else:
-                    # print("DKDEBUG: DFN : Value of: strFoundMatch : " + "is null")
-                # #if cmds.match(all_items[selected[loop - 1] - 1], text):
-                # if re.search(all_items[selected[loop - 1] - 1], text, re.IGNORECASE):
-                    pass_val = 1
-                loop += 1
-            if pass_val == 0:
-                # The following may give error message "object dk skip does not exist"
-                return_val = ["dk_skip", "dk_skip", buffer[3], buffer[2]]
-                return return_val
-    return_val = [buffer[3], buffer[2], buffer[3], buffer[2]]
-    return return_val
+                selected = range(1, len(all_items) + 1)
+                if all_items:
+                    cmds.textScrollList("dk_chanList", edit=True, sii=list(selected))
+            scope = frozenset(all_items[i - 1] for i in selected)
+    doReplace = cmds.checkBox("dk_doReplace", q=True, v=True)
+    search = cmds.textFieldGrp("dk_search", q=True, text=True)
+    replace = cmds.textFieldGrp("dk_replace", q=True, text=True)
+    regexRules = ()
+    # A regular expression search is a regex rule instead of the literal search and replace
+    if doReplace and search and cmds.checkBox("dk_regex", q=True, v=True):
+        regexRules = ((search, replace),)
+        doReplace = False
+    return DkReadOptions(doReplace=doReplace,
+                         search=search,
+                         replace=replace,
+                         prefix=cmds.textFieldGrp("dk_prefix", q=True, text=True),
+                         topNodes=cmds.checkBox("dk_topNodes", q=True, v=True),
+                         paths=paths,
+                         unKeyed=cmds.checkBox("dk_unKeyed", q=True, v=True),
+                         scope=scope,
+                         regexRules=regexRules,
+                         mappingFile=cmds.textField("dk_mapFile", q=True, text=True),
+                         fast=cmds.checkBox("dk_fastImport", q=True, v=True),
+                         timeRange=dk_timeRangeFromUI("dk_r"),
+                         engine="api" if cmds.checkBox("dk_apiImport", q=True, v=True) else None)
+
+
+def dk_remapper(options):
+    # Returns the dkAnimRemap.DkRemapper of options. It is compiled once, and kept while the options and the mapping table file
+    # do not change, so the target name of each node is computed once for all the channels of the node and for the next imports.
+    global DKANIM_REMAPPER
+    # Same options object as the previous call : the remapper of the import in progress
+    if DKANIM_REMAPPER is not None and DKANIM_REMAPPER[0] is options:
+        return DKANIM_REMAPPER[2]
+    key = (options.doReplace, options.search, options.replace, options.regexRules, options.prefix, options.topNodes, bool(options.paths), options.mappingFile)
+    if options.mappingFile:
+        key += (os.path.getmtime(options.mappingFile),)
+    if DKANIM_REMAPPER is None or DKANIM_REMAPPER[1] != key:
+        mapping = dkAnimRemap.dk_loadMappingTable(options.mappingFile) if options.mappingFile else None
+        remapper = dkAnimRemap.DkRemapper(search=options.search if options.doReplace else "", replace=options.replace, regex_rules=options.regexRules,
+                                          prefix=options.prefix, topNodes=options.topNodes, paths=options.paths, mapping=mapping)
+    else:
+        remapper = DKANIM_REMAPPER[2]
+    DKANIM_REMAPPER = (options, key, remapper)
+    return remapper
+
+
+def dk_filter_nodes(record, options):
+    # record is a DkStatic or DkAnimCurve from dkAnimParser (or a DkIndexEntry), options a DkReadOptions : no UI query here
+    #print("DKDEBUG: DFN: Value of record : " + str(record))
+    global DKANIM_REFRESH # this is a global variable
+    DKANIM_REFRESH = 0  
+    # Search and replace, regex rules, mapping table, prefix and explicit node paths, see dkAnimRemap
+    node, attr = dk_remapper(options).remap(record.node, record.attr, record.parent)
+    # Use selected channels in channels window : a set lookup of the names snapshotted by dk_readOptionsFromUI
+    if options.scope is not None and "{}.{}".format(node, attr) not in options.scope:
+        # The following may give error message "object dk skip does not exist"
+        return ["dk_skip", "dk_skip", node, attr]
+    return [node, attr, node, attr]
+
+def dk_planRecords(records, options, resolver, profiler=None):
+    # Yields (record, node, attr, state) for each record. The records are read by chunks of DKANIM_PLAN_CHUNK, and the target channels of
+    # a chunk are resolved by resolver, a dkAnimScene.DkSceneResolver, in one batch before its records are yielded : no scene query per channel.
+    # node and attr are "dk_skip" for the channels out of the scope and for the statics when unKeyed is off, state is None for them
+    # and for the sceneUnit records.
+    # profiler : a dkAnimProfile.DkProfiler, timing the "parse", "filter" and "resolve" phases
+    profiler = profiler or dkAnimProfile.DkProfiler("dk_planRecords")
+    records = iter(records)
+    while True:
+        with profiler.phase("parse"):
+            chunk = list(itertools.islice(records, DKANIM_PLAN_CHUNK))
+        if not chunk:
+            return
+        targets = []
+        with profiler.phase("filter"):
+            for record in chunk:
+                if record.kind == "sceneUnit" or (record.kind == "static" and not options.unKeyed):
+                    targets.append(None)
+                else:
+                    targets.append(tuple(dk_filter_nodes(record, options)[:2]))
+        with profiler.phase("resolve"):
+            resolver.resolve([target for target in targets if target is not None and target[0] != "dk_skip"])
+        for record, target in zip(chunk, targets):
+            if target is None or target[0] == "dk_skip":
+                yield record, "dk_skip", "dk_skip", None
+            else:
+                yield record, target[0], target[1], resolver.state(target[0], target[1])
+
+def dk_profiler(name, filename, profile=None):
+    # dkAnimProfile.DkProfiler of a run, enabled when profile is True, or DKANIM_PROFILE when profile is None
+    return dkAnimProfile.DkProfiler(name, filename, DKANIM_PROFILE if profile is None else bool(profile))
+
+def dk_profiledModules():
+    # Modules whose maya.cmds commands are timed by an enabled profiler
+    return (sys.modules[__name__], dkAnimImport, dkAnimExport, dkAnimScene)
+
+def dk_endProfile(profiler):
+    # Prints the summary of a run in place of the start and end times, and writes its JSON report when the profiler is enabled.
+    # Returns the name of the report, or None.
+    profiler.end()
+    for line in profiler.summary():
+        print("dkAnim: " + line)
+    if not profiler.enabled:
+        return None
+    try:
+        report = dkAnimProfile.dk_writeReport(profiler)
+    except (IOError, OSError) as e:
+        print("dkAnim: Could not write the profile report ({})".format(e))
+        return None
+    print("dkAnim: Profile report written to [{}]".format(report))
+    return report
+
+def dk_printSummary(message, names):
+    # Prints message, formatted with the number of names, and the first DKANIM_SUMMARY_NAMES names
+    names = sorted(set(names))
+    listed = ", ".join(names[:DKANIM_SUMMARY_NAMES])
+    if len(names) > DKANIM_SUMMARY_NAMES:
+        listed += " ... and " + str(len(names) - DKANIM_SUMMARY_NAMES) + " more"
+    print("dkAnim: " + message.format(len(names)) + " : " + listed)
 
 def dre_fileLineCount(file):
-    # This function will count the number of lines inside the text file which extension is *.dkanim.
-    # For each line : First it filters out lines that are null, the others will be counted as real lines. Then it filters out lines that have a blank space. Then it keeps lines starting by anim or static, these will be counted as objects.
-    # old code : file_id = cmds.fopen(file, "r")
-    #file_id = os.open(file, os.O_RDONLY)
-    # old code : next_line = cmds.fgetline(file_id), translated code : next_line = cmds.file(file_id, q=True)
-    count = 1
-    obj_count = 0
-    # new code? fgetline is a MEL command that is not available in Python. However, you can use the open function to read a file line by line in Python. Here’s an example:
-    with open(file, 'r') as file_id:
-        for next_line in file_id:
-            if len(next_line) > 0:
-                if next_line[0] != " ":
-                    if next_line[:5] == "anim " or next_line[:7] == "static ": #next line from char 0 to 5
-                        obj_count += 1
-                # #next_line = cmds.fgetline(file_id)
-                count += 1
-                #print("DKDEBUG: Value of: next_line : " + next_line + " . Value of: count : " + str(count) +  " . Value of: obj_count : " + str(obj_count))
-    #file_id.close commented out because The "with" block ensures that the file will be closed when control leaves the block
-    file_data = [count, obj_count]
-    #print("DKDEBUG: Value of: file_data : " + str(file_data))
-    return file_data
+    # Returns [record count + 1, channel count] of the *.dkanim file, or None when they can not be known without reading the whole file.
+    # The counts come from the index of the file, or from a previous read of the same version of the file (see dkAnimParser.dk_countRecords) :
+    # the file is no longer read once just to count its lines before dk_animRead reads it again, dk_animRead reports progress in bytes instead.
+    counts = dkAnimParser.dk_countRecords(file)
+    if counts is None:
+        # The file parsed in the background or by a previous import, when it was
+        parsed = DKANIM_PREFETCHER.get(file)
+        if parsed is None:
+            return None
+        counts = (parsed.recordCount, parsed.channelCount)
+    return [counts[0] + 1, counts[1]]
 
 def dre_dkAnim_progressWin_proc(load_title, count):
     #Progress Bar variable names for GUI elements names
@@ -676,6 +780,39 @@ def dre_dkAnim_progressWin_proc(load_title, count):
     cmds.progressBar(progressBar_Maya, edit=True, beginProgress=True, isInterruptable=True, status=load_message, maxValue=max_value)
     return progress_bar_name_DK
 
+class DkMayaProgressReporter(dkAnimProgress.DkRateLimitedReporter):
+    # dkAnimProgress reporter editing the progress window of dre_dkAnim_progressWin_proc and Maya's main progress bar.
+    # The bars go from 0 to dkAnimProgress.DK_PROGRESS_STEPS, they are edited at most 10 times per second and only when they move,
+    # the cancel state (Esc on the main progress bar) is queried at most 4 times per second.
+
+    def begin(self, title, total):
+        global progressBar_DK
+        progressBar_DK = dre_dkAnim_progressWin_proc(title, dkAnimProgress.DK_PROGRESS_STEPS + 1)
+        self._step = -1
+        dkAnimProgress.DkRateLimitedReporter.begin(self, title, total)
+
+    def show(self, done):
+        step = self.step(done)
+        if step != self._step:
+            self._step = step
+            cmds.progressBar(progressBar_DK, edit=True, progress=step)
+            cmds.progressBar(progressBar_Maya, edit=True, progress=step)
+
+    def queryCancelled(self):
+        # Only the main progress bar is interruptable
+        return cmds.progressBar(progressBar_Maya, q=True, isCancelled=True) or cmds.progressBar(progressBar_DK, q=True, isCancelled=True)
+
+    def end(self):
+        dkAnimProgress.DkRateLimitedReporter.end(self)
+        # Close progress bar DK
+        cmds.progressBar(progressBar_DK, edit=True, endProgress=True)
+        try:
+            cmds.deleteUI(progressWin_DK)
+        except Exception:
+            pass
+        # Reset progress bar Maya
+        cmds.progressBar(progressBar_Maya, edit=True, endProgress=True)
+
 #def dk_animRead_progress(filename, paths):
 def dk_animRead_progress(InTextFieldName, pathsCheckBoxName, *args):
     #recall progressWin_DK as global? Necessary te re-assign it below? no, commented out.
@@ -692,286 +829,183 @@ def dk_animRead_progress(InTextFieldName, pathsCheckBoxName, *args):
         return
     # Progress Bar
     file_count = dre_fileLineCount(strFileName)
-    line_count = file_count[0]
-    obj_count = file_count[1]
     # Prompt user of the job about to occur
     # old translated code : file_short_name = cmds.match("[^(\\/)]*$", strFileName)
     file_short_name = re.search("[ \w-]+?(?=\.)", strFileName, re.IGNORECASE)
     #print("DKDEBUG: Value of: file_short_name : " + file_short_name.group(0))
-    confirm = cmds.confirmDialog(title=f"Read Anim for {obj_count} channels?", message=f"Are you sure you want to read animation for {obj_count} attributes in the file\n\n{file_short_name.group(0)} ?", button=["Yes", "Cancel"], defaultButton="Yes", cancelButton="Cancel", dismissString="Cancel")
+    if file_count is not None:
+        obj_count = file_count[1]
+        confirm = cmds.confirmDialog(title=f"Read Anim for {obj_count} channels?", message=f"Are you sure you want to read animation for {obj_count} attributes in the file\n\n{file_short_name.group(0)} ?", button=["Yes", "Cancel"], defaultButton="Yes", cancelButton="Cancel", dismissString="Cancel")
+    else:
+        # The channels of a file without index are not counted, that would mean reading the file twice
+        size_mb = os.path.getsize(strFileName) / (1024.0 * 1024.0)
+        confirm = cmds.confirmDialog(title="Read Anim?", message=f"Are you sure you want to read animation in the file\n\n{file_short_name.group(0)} ({size_mb:.1f} MB) ?", button=["Yes", "Cancel"], defaultButton="Yes", cancelButton="Cancel", dismissString="Cancel")
     if confirm == "Cancel":
         return
     #global progressBar_Maya commented out at 2024-02-06 as it is defined globally and not reset here.
-    progressBar_DK = dre_dkAnim_progressWin_proc("Importing Animation", line_count) #variable should be renamed? I did it at 2024-02-06
-    #Commented out as this variable is defined in function dre_dkAnim_progressWin_proc: progressWin_DK = "MayaWindow|dkAnimProgess_columnLayout"
-    # Do reading from file
-    #try: uncomment when all script is fixed
-    dk_animRead(strFileName, pathsCheckBoxName)
-    #except Exception as e:
-    #    cmds.warning(f"An error occurred during animation import: {e}")
-    # Close progress bar
-    cmds.progressBar(progressBar_DK, edit=True, endProgress=True)
-    cmds.deleteUI(progressWin_DK)
-    #global progressBar_Maya = "MayaWindow|mainProgressBar"  # This is defined on maya startup
-    cmds.progressBar(progressBar_Maya, edit=True, endProgress=True)
-
-def dk_animRead(filename, paths):
-    import shlex # mel tokenize equivalent
+    # dk_animRead moves the progress bars with the position read in the file, see DkMayaProgressReporter
+    reporter = DkMayaProgressReporter()
+    reporter.begin("Importing Animation", os.path.getsize(strFileName))
+    # Do reading from file, the progress bars are closed even if it fails
+    try:
+        dk_animRead(strFileName, booUseObjPath, reporter=reporter)
+    finally:
+        reporter.end()
+
+def dk_animRead(filename, paths, options=None, interactive=True, reporter=None, profile=None):
+    # options : a DkReadOptions, read from the UI when None
+    # interactive : False when run without UI (dkAnimBatch), no dialog is opened
+    # reporter : a dkAnimProgress reporter, given the number of bytes of the file read (DkMayaProgressReporter from the UI), none by default
+    # Returns the number of channels read and the names of the missing nodes and attributes, or None if the user stopped the import
+    # The target channels are resolved in the scene by chunks of records (see dk_planRecords), the missing and locked channels are
+    # reported once, at the end, instead of one warning per channel.
+    # options.fast : the records are applied in fast import mode, see dkAnimScene.DkFastImport. The scene unit is set back even on
+    # cancel or exception.
+    # profile : time the phases and commands of the import, see dkAnimProfile. DKANIM_PROFILE when None.
     # Variables
     global DKANIM_REFRESH
     #global progressBar_DK commented out at 2024-02-06 as it is defined globally , not assigned but just accessed here.
     #global progressBar_Maya  commented out at 2024-02-06 as it is defined globally and not reset here.
-    tan1 = 0.0
-    tan2 = 0.0
-    weight1 = 0.0
-    weight2 = 0.0
-    weighted = ""
-    preI = ""
-    postI = ""
-    attr = ""
-    node = ""
-    line = ""
     curAttr = ""
-    buffer = []
-    buffer2 = []
-    buffer3 = []
-    readtime = 0.0
-    value = 0.0
-    inType = ""
-    outType = ""
-    tanLock = 0
-    weightLock = 0
-    intWeightLock = 0
-    breakDown = 0
-    filteredNames = []
-    lisObjDotAtt = []
     #old code : selected = cmds.ls(sl=True) or []; rEMOVED " or []", what was this for?
+    profiler = dk_profiler("dk_animRead", filename, profile)
     selected = cmds.ls(sl=True)
-    size = 0
-    endit = 0
-    # Progress Bar
-    fileID = open(filename, "r+")
     print("dkAnimRead: Reading Animation Curves...")
-    startTime = cmds.date(time=True)
-    startTimer = cmds.timerX()
     # Variables again
     currentSceneUnit = ""
     lineCount = 0
     warningCount = []
     attrWarningCount = []
+    ambiguousCount = []
+    lockedCount = []
+    unparsedCount = []
     controlCount = []
-    line = fileID.readline()
     # If selection is not empty, deselect graph editor keys
     #print("DKDEBUG: Value of cmds.ls( selection=True ) : " + str(cmds.ls( selection=True )))
     if selected != []:
         cmds.selectKey(clear=True)
-    #old code : while not cmds.feof(fileID):
-    # Now dkAnim will read all lines and apply the animation on the scene object, but it seems dkAnim does not need to start with selected objetcs here, it will "select" objects based on the file info
-    while line:
-        # Process the line
-        #old code : line = cmds.fgetline(fileID)
-        line = fileID.readline()
-        # Progress progressBar one step further
-        cmds.progressBar(progressBar_DK, edit=True, step=1)
-        cmds.progressBar(progressBar_Maya, edit=True, step=1)
-        weightState = 0
-        if len(line) > 0:
-            #old code : if cmds.substring(line, 1, 5) == "anim " or cmds.substring(line, 1, 7) == "static ":
-            if line[:5] == "anim " or line[:7] == "static ": # To get characters from the begining of the line to the character N°5, it should be coded as : line[0:5]. What it means is that the first char is N°0 and the selection ends BEFORE char N°5 as char N° 5 IS NOT included, more info at https://www.freecodecamp.org/news/how-to-substring-a-string-in-python/ 
-                #print("DKDEBUG: Value of line[0:5] : " + line[0:5] + ".")
-                buffer = shlex.split(line, " ") #Buffer is the array of items that have been separated by spaces using the split function
-                #print("DKDEBUG: Value of buffer : " + str(buffer))
-                size = len(buffer)
-                #print("DKDEBUG: Value of size : " + str(size))
-                # old code : size = len(cmds.tokenize(line, " ", buffer))
-                if size == 6 or size == 7:
-                    if cmds.checkBox("dk_useChannels", q=True, v=True) and cmds.window("dkAnim_channels", ex=True):
-                        if DKANIM_REFRESH == 1:
-                            dk_loadChannels()
-                    #print("DKDEBUG: Value of line : " + line)
-                    filteredNames = dk_filter_nodes(line, paths)
-                    #print("DKDEBUG: Value of filteredNames : " + str(filteredNames))
-                    # Next lines : there does not seem to be a difference between the return values of curAttr and curAttrLong, and these 2 do not seem to be very useful in this function area, so this will need to be tested and cleaned
-                    curAttr = filteredNames[0] + "." + filteredNames[1]
-                    node = filteredNames[0]
-                    attr = filteredNames[1]
-                    endit = 0
-                    curAttrLong = node + "." + attr
-                    # print("DKDEBUG: Value of node : " + node)
-                    # print("DKDEBUG: Value of attr : " + attr)
-                    # print("DKDEBUG: Value of curAttr : " + curAttr)
-                    # print("DKDEBUG: Value of curAttrLong : " + curAttrLong)
-                    lineCount += 1
-                    controlCount.append(node)
-                    if cmds.objExists(node):
-                        # The following line will return the name of the scene object according to what's in the text file
-                        lisObjDotAtt = cmds.ls(curAttrLong)
-                        #print("DKDEBUG: Value of lisObjDotAtt : obj name dot channel name : " + str(lisObjDotAtt))
-                        if len(lisObjDotAtt) > 0:
-                            if line[:7] == "static " and cmds.checkBox("dk_unKeyed", q=True, value=True):
-                                #print("DKDEBUG: unkeyed values will be loaded : " + "checkbox checked")
-                                connected = cmds.listConnections(curAttrLong, d=0, s=0, p=1, c=1, type="animCurve", source=True)
-                                if cmds.getAttr(curAttrLong, lock=True) == 0 and not connected:
-                                    #old code : setMe = "setAttr " + curAttrLong.replace('||', '|') + " " + buffer[5] + ";"
-                                    #setMe = "cmds.setAttr(" + curAttrLong + " " + buffer[5] + ")"
-                                    #try: uncomment when all script is fixed
-                                    #cmds.evalDeferred(setMe)
-                                    cmds.setAttr(curAttrLong, float(buffer[5]))
-                                    #except Exception:
-                                    #    print("Error caught! If possible mail this file to me so I can debug the error: mail danl_kramer@yahoo.com\nmoving on...\n")
-                                else:
-                                    print("dkAnim: Warning: Attribute is locked - " + curAttr)
-                            if line[:5] == "anim ":
-                                #print("DKDEBUG: anim line : " + "reading")
-                                while endit == 0: #old code
-                                    #Old code : line = cmds.fgetline(fileID)
-                                    line = next(fileID)
-                                    #print("DKDEBUG: Value of line : " + line)
-                                    # Progress progressBar one step further
-                                    cmds.progressBar(progressBar_DK, edit=True, step=1)
-                                    cmds.progressBar(progressBar_Maya, edit=True, step=1)
-                                    if line[2:11] == "weighted ":
-                                        if line[11:12] == "T":
-                                            #print("DKDEBUG: weighted : " + "TRUE")
-                                            # old code : weighted = "keyTangent -edit -weightedTangents True " + curAttr
-                                            #Commented out , command used later in the code : weighted = "cmds.keyTangent(edit=True, weightedTangents=True, at='" + curAttr +"')"
-                                            weightState = 1
-                                        else:
-                                            weightState = 0
-                                    if line[2:7] == "preIn":
-                                        # old code : buffer = cmds.tokenize(line, " ")
-                                        buffer = shlex.split(line, " ")
-                                        #print("DKDEBUG: value of buffer1 : " + str(buffer))
-                                        #print("DKDEBUG: value of buffer[1] : " + str(buffer[1]))
-                                        #Old code : buffer = cmds.tokenize(buffer[1], ";")
-                                        #buffer = shlex.split(buffer[1], ";")
-                                        preI = buffer[1].replace(';', '')
-                                        #print("DKDEBUG: value of preI : " + str(preI))
-                                    if line[2:8] == "postIn":
-                                        #Old code : buffer = cmds.tokenize(line, " ")
-                                        buffer = shlex.split(line, " ")
-                                        #Old code : buffer = cmds.tokenize(buffer[1], ";")
-                                        #buffer = shlex.split(buffer[1], ";")
-                                        postI = buffer[1].replace(';', '')
-                                        #print("DKDEBUG: value of postI : " + str(postI))
-                                    if line[2:8] == "keys {":
-                                        line = next(fileID)
-                                        #print("DKDEBUG: Value of line : " + line)
-                                        # Progress progressBar one step further
-                                        cmds.progressBar(progressBar_DK, edit=True, step=1)
-                                        cmds.progressBar(progressBar_Maya, edit=True, step=1)
-                                        while line[2:3] != "}":
-                                            #Old code : argNum = len(cmds.tokenize(line, " ", buffer))
-                                            buffer = shlex.split(line, " ")
-                                            #print("DKDEBUG: value of buffer : " + str(buffer))
-                                            argNum = len(buffer)
-                                            readtime = float(buffer[0])
-                                            value = float(buffer[1])
-                                            inType = buffer[2]
-                                            outType = buffer[3]
-                                            #print("DKDEBUG: value of buffer[4] : " + str(buffer[4]))
-                                            tanLock = bool(buffer[4])
-                                            #weightLock = 1 if buffer[5] == "True" else 0
-                                            weightLock = str(buffer[5])
-                                            if weightLock == "True":
-                                                intWeightLock = 1
-                                            else:
-                                                intWeightLock = 0
-                                            #print("DKDEBUG: value of intWeightLock : " + str(intWeightLock))
-                                            breakDown = int(buffer[6].replace(';', ''))
-                                            if argNum > 7:
-                                                #print("DKDEBUG: value of argNum : " + str(argNum))
-                                                tan1 = float(buffer[7].replace(';', ''))
-                                                #Old code : buffer2 = cmds.tokenize(buffer[8], ";")
-                                                weight1 = float(buffer[8].replace(';', ''))
-                                            if argNum > 9:
-                                                tan2 = float(buffer[9].replace(';', ''))
-                                                weight2 = float(buffer[10].replace(';', ''))
-                                            # This function section does not rely on selected objects so it must be fed an object name. Could the attribute tag accept a syntax such as : objname.attribute? Tested : NO. So I added the node and the short attribute name to each setKeyframe, keytangeant and setinfinity
-                                            #Old code : cmds.setKeyframe(time=readtime, value=value, bd=breakDown, at=curAttr)
-                                            cmds.setKeyframe(node, time=readtime, value=value, bd=breakDown, at=attr)
-                                            #cmds.keyTangent(time=(readtime, readtime), lock=tanLock, at=curAttr)
-                                            cmds.keyTangent(node, time=(readtime, readtime), lock=tanLock, at=attr)
-                                            if weightState == 1:
-                                                #weighted = "keyTangent -edit -weightedTangents True " + curAttr , should be weightedTangents=True ?
-                                                #cmds.evalDeferred(weighted)
-                                                cmds.keyTangent(node, edit=True, weightedTangents=True, at=attr)
-                                                cmds.keyTangent(node, time=(readtime, readtime), weightLock=intWeightLock, at=attr)
-                                            if inType != "fixed" and outType != "fixed":
-                                                cmds.keyTangent(node, e=True, a=True, time=(readtime, readtime), itt=inType, ott=outType, at=attr)
-                                            if inType == "fixed" and outType != "fixed":
-                                                cmds.keyTangent(node, e=True, a=True, time=(readtime, readtime), inAngle=tan1, inWeight=weight1, itt=inType, ott=outType, at=attr)
-                                            if inType != "fixed" and outType == "fixed":
-                                                cmds.keyTangent(node, e=True, a=True, time=(readtime, readtime), outAngle=tan1, inWeight=weight1, itt=inType, ott=outType, at=attr)
-                                            if inType == "fixed" and outType == "fixed":
-                                                cmds.keyTangent(node, e=True, a=True, time=(readtime, readtime), inAngle=tan1, inWeight=weight1, outAngle=tan2, outWeight=weight2, itt=inType, ott=outType, at=attr)
-                                            #Old code : line = cmds.fgetline(fileID)
-                                            line = next(fileID)
-                                            # Progress progressBar one step further
-                                            cmds.progressBar(progressBar_DK, edit=True, step=1)
-                                            cmds.progressBar(progressBar_Maya, edit=True, step=1)
-                                        cmds.setInfinity(node, poi=postI, pri=preI, at=attr)
-                                        endit = 1
-                        else:
-                            if curAttr != "dk_skip":
-                                cmds.warning("[" + curAttr + "] Does not exist... Skipping")
-                                attrWarningCount.append(curAttr)
-                    else:
-                        if node != "dk_skip":
-                            if lineCount == 1:
+    # Now dkAnim will read all records of the file and apply the animation on the scene object, but it seems dkAnim does not need to start with selected objetcs here, it will "select" objects based on the file info
+    # The file is parsed by dkAnimParser : one record per sceneUnit, static and anim entry, anim records come with all their keys
+    records = None
+    reporter = reporter or dkAnimProgress.DkProgressReporter()
+    progress = reporter.update
+    if options is None:
+        if cmds.checkBox("dk_useChannels", q=True, v=True) and cmds.window("dkAnim_channels", ex=True):
+            if DKANIM_REFRESH == 1:
+                dk_loadChannels()
+        # The options and the channel scope are read from the UI once, before the loop
+        options = dk_readOptionsFromUI(paths)
+    booUnKeyed = options.unKeyed
+    # The file parsed in the background since its path was set (see dk_inputChanged), or by a previous import
+    parsed = DKANIM_PREFETCHER.get(filename)
+    if parsed is not None:
+        records = parsed.iterRecords(progress=progress, time_range=options.timeRange)
+    # When the file has an index, the channels out of the scope are filtered out from it and their records are never read
+    elif options.scope is not None:
+        entries = dkAnimParser.dk_readIndex(filename)
+        if entries is not None:
+            offsets = [entry.offset for entry in entries if entry.kind == "sceneUnit" or dk_filter_nodes(entry, options)[0] != "dk_skip"]
+            records = dkAnimParser.dk_iterDkAnimAt(filename, offsets, progress=progress, time_range=options.timeRange)
+    if records is None:
+        # Out of range keys are skipped while parsing, see dkAnimParser.dk_readKeys
+        records = dkAnimParser.dk_iterDkAnim(filename, progress=progress, time_range=options.timeRange)
+        if options.timeRange is None:
+            # All the records are read, they are kept for the next imports of this file
+            records = dkAnimPrefetch.dk_cacheRecords(filename, records)
+    resolver = dkAnimScene.DkSceneResolver()
+    if (options.engine or dkAnimImport.DKANIM_APPLY_ENGINE) in ("api", "auto"):
+        print("dkAnim: WARNING OpenMaya import, the new curves are not in the undo queue : Undo will not remove them")
+    applyStart = time.perf_counter()
+    profiler.instrument(dk_profiledModules())
+    try:
+        with dkAnimScene.DkFastImport(options.fast):
+            for record, node, attr, state in dk_planRecords(records, options, resolver, profiler):
+                with profiler.phase("apply"):
+                    if (record.kind == "anim" or record.kind == "static") and node != "dk_skip":
+                        curAttr = node + "." + attr
+                        lineCount += 1
+                        controlCount.append(node)
+                        if state == dkAnimScene.DK_MISSING_NODE:
+                            if lineCount == 1 and interactive:
                                 # If this is the first line to read data and the object does not exist... and user chooses to continue trying to import animation...
                                 confirmMess = ("Object to import animation onto does not exist:\n" + node + "\nAnimation may not import properly.\nDo you want to continue trying to import animation?")
                                 print("dkAnim: " + confirmMess)
                                 nonExist = cmds.confirmDialog(title="Continue?? Object Does not Exist...", message=confirmMess, button=["Yes", "No"], defaultButton="No", cancelButton="No", dismissString="No",)
                                 if nonExist == "No":
-                                    # catch(deleteUI($progressWin_DK)) # close progresBar window
                                     print("dkAnim: " + nonExist + ", user stopped animation import.")
+                                    # The scene unit is set back before leaving, by the finally clause below
                                     return
                                 else:
                                     print("dkAnim: " + nonExist + ", user Continued animation import.")
+                            warningCount.append(node)
+                        elif state == dkAnimScene.DK_AMBIGUOUS_NODE:
+                            ambiguousCount.append(node)
+                        elif state == dkAnimScene.DK_MISSING_ATTRIBUTE:
+                            attrWarningCount.append(curAttr)
+                        elif record.kind == "static":
+                            # Locked attributes, and attributes driven by a connection, keep their value
+                            if state == dkAnimScene.DK_CHANNEL_OK:
+                                # Booleans are set as True/False and numbers as floats, other values can not be set from their text
+                                value = dkAnimParser.dk_parseStaticValue(record.value)
+                                if value is None:
+                                    unparsedCount.append("{} ({})".format(curAttr, record.value))
+                                else:
+                                    cmds.setAttr(curAttr, value)
+                                    profiler.count("statics")
                             else:
-                                cmds.warning("[" + node + "] Does not exist... Skipping")
-                                warningCount.append(node)
-            #old code : elif cmds.substring(line, 1, 10) == "sceneUnit ":
-            elif line[:10] == "sceneUnit ":
-                currentSceneUnit = cmds.currentUnit(q=True, linear=True)
-                #Old code : parts = cmds.tokenize(line, " ")
-                parts = shlex.split(line, " ")
-                partsSize = len(parts)
-                # Get second part of string data, remove trailing characters (i.e. whitespace, new line, tab, etc.)
-                #Old code : unitData = cmds.substitute("[( \n\t\r)]*$", parts[1], "")
-                unitData = re.sub("[( \n\t\r)]*$", "", parts[1])
-                print("dkAnim: Storing current scene unit preference [" + currentSceneUnit + "] ")
-                print("dkAnim: Setting current scene unit preference to [" + unitData + "] ")
-                if len(unitData) > 0:
-                    cmds.currentUnit(linear=unitData)
-        if cmds.progressBar(progressBar_DK, q=True, isCancelled=True):
-            print("dkAnim: User canceled importing animation file...")
-            break
-    # When the loop while line exits, you've reached the end of the file
-    #Old code : cmds.fclose(fileID)
-    fileID.close()
-    # Set current scene unit back
-    if currentSceneUnit != "":
-        print("dkAnim: Setting current scene unit preference back to [" + currentSceneUnit + "] ")
-        cmds.currentUnit(linear=currentSceneUnit)
+                                lockedCount.append(curAttr)
+                        else:
+                            # All the keys of the curve are set at once, see dkAnimImport
+                            dkAnimImport.dk_applyCurve(node, attr, record, options.engine)
+                            profiler.count("curves")
+                            profiler.count("keys", record.keyCount)
+                    elif record.kind == "sceneUnit":
+                        currentSceneUnit = cmds.currentUnit(q=True, linear=True)
+                        unitData = record.unit
+                        print("dkAnim: Storing current scene unit preference [" + currentSceneUnit + "] ")
+                        print("dkAnim: Setting current scene unit preference to [" + unitData + "] ")
+                        if len(unitData) > 0:
+                            cmds.currentUnit(linear=unitData)
+                with profiler.phase("ui"):
+                    cancelled = reporter.cancelled()
+                if cancelled:
+                    print("dkAnim: User canceled importing animation file...")
+                    break
+    # When the loop exits, you've reached the end of the file
+    finally:
+        profiler.restore()
+        # Set current scene unit back
+        if currentSceneUnit != "":
+            print("dkAnim: Setting current scene unit preference back to [" + currentSceneUnit + "] ")
+            cmds.currentUnit(linear=currentSceneUnit)
+    applySeconds = time.perf_counter() - applyStart
+    print("dkAnim: Animation applied in {:.2f} s, fast import {}".format(applySeconds, "on" if options.fast else "off"))
+    # Summary of the channels that were skipped
+    if len(lockedCount) > 0:
+        dk_printSummary("Warning: {} attributes are locked or connected, their static value was not set", lockedCount)
+    if len(unparsedCount) > 0:
+        dk_printSummary("Warning: {} static values are neither numbers nor booleans, they were not set", unparsedCount)
+    if len(ambiguousCount) > 0:
+        dk_printSummary("Warning: {} node names match more than one object, their animation was not imported", ambiguousCount)
     if len(attrWarningCount) > 0:
         # If there were warnings loading animation...
+        dk_printSummary("{} attributes do not exist", attrWarningCount)
         attrWarningCount = list(set(attrWarningCount))
         cmds.warning("[" + str(len(attrWarningCount)) + "] attributes do NOT exist to import animation to.")
     if len(warningCount) > 0:
         # If there were warnings loading animation...
+        dk_printSummary("{} controls do not exist", warningCount)
         warningCount = list(set(warningCount))
         controlCount = list(set(controlCount))
         cmds.warning("[" + str(len(warningCount)) + " of " + str(len(controlCount)) + "] controls do NOT exist to import animation to.")
-    endTime = cmds.date(time=True)
-    totalTime = cmds.timerX(startTime=startTimer)
-    print("dk_animRead: Finished Reading Animation at [" + endTime + "]")
-    print("dkAnim: Total elapsed time to Read Animation:   " + str(datetime.timedelta(seconds=round(totalTime))))
     cmds.select(clear=True)
     for item in selected:
         cmds.select(item, add=True)
+    report = dk_endProfile(profiler)
     print("dkAnim: script completed")
+    return {"channels": lineCount, "missingNodes": sorted(set(warningCount)), "missingAttributes": sorted(set(attrWarningCount)),
+            "ambiguousNodes": sorted(set(ambiguousCount)), "lockedAttributes": sorted(set(lockedCount)), "fast": options.fast, "applySeconds": applySeconds,
+            "seconds": profiler.seconds, "profile": report}
 
 #Comment out following line when not testing
 #dkAnimEhEh()
\ No newline at end of file
@@ -0,0 +1,385 @@
+##############################################################################################################
+#NAME: dkAnimEval
+#AUTHOR: David Saber, www.dreamcraftdigital.com, based on Dan Erwin and Daniel Kramer's code.
+#SCRIPTING LANGUAGE: Python (no Maya import), NumPy
+#USAGE: Evaluation of the curves of a .dkanim file outside of Maya, and baking of a file to dense sample arrays :
+#           python dkAnimEval.py bake in.dkanim out.npz [--start 1] [--end 100] [--step 1] [--fps 24] [--radians]
+#           python dkAnimEval.py check      (checks of the evaluation and of the bake on built-in curves, exit code 1 on failure)
+#       out.npz holds "times" (the sample times, in frames), "channels" (the "node.attr" names) and "values" (one row of
+#       samples per channel), out.csv one column per channel. Static values are baked as constant rows : booleans
+#       (True/False, as visibility is exported) as 1 and 0, the static values that are not numbers are skipped and listed.
+#       dk_curveArrays() turns a dkAnimParser.DkAnimCurve into NumPy arrays once, dk_evaluate() samples them at an array
+#       of times in a vectorized way :
+#       - non weighted segments are Hermite cubics, weighted segments Bezier cubics (the time of the sample is solved on
+#         the time curve of the segment by bisection), step and stepnext segments are constant
+#       - fixed tangents use the angles and weights of the file (angles are per second, fps converts them to per frame,
+#         as dkAnimReduce does). The other tangent types have no angle in the file, they are computed from the neighbour
+#         keys like Maya does : linear, flat, spline, clamped (flat next to a key of the same value), plateau and auto
+#         (flat on the extremes, no overshoot). Weighted tangents without weight are a third of the segment long.
+#       - pre and post infinity : constant, linear, cycle, cycleRelative and oscillate
+#       The values are the ones of the file (UI units), Maya's own evaluation of the other tangent types may differ slightly.
+##############################################################################################################
+
+
+# Imports
+import argparse
+import itertools
+import sys
+# NumPy is needed by the evaluation, this module can still be imported without it
+try:
+    import numpy
+except ImportError:
+    numpy = None
+try:
+    from . import dkAnimParser
+    from . import dkAnimReduce
+except ImportError:
+    import dkAnimParser
+    import dkAnimReduce
+
+# Iterations of the bisection finding the parameter of a time on a weighted segment (2^-30 of the segment)
+DK_BEZIER_ITERATIONS = 30
+# Codes of the tangent types in the arrays of dk_tangentCodes. The types without a code (spline, global, fast, slow, ...)
+# are computed like spline tangents.
+DK_TANGENT_SPLINE = 0
+DK_TANGENT_LINEAR = 1
+DK_TANGENT_FLAT = 2
+DK_TANGENT_STEP = 3
+DK_TANGENT_STEPNEXT = 4
+DK_TANGENT_FIXED = 5
+DK_TANGENT_CLAMPED = 6
+DK_TANGENT_PLATEAU = 7
+DK_TANGENT_AUTO = 8
+DK_TANGENT_CODES = {"linear": DK_TANGENT_LINEAR, "flat": DK_TANGENT_FLAT, "step": DK_TANGENT_STEP, "stepnext": DK_TANGENT_STEPNEXT,
+                    "fixed": DK_TANGENT_FIXED, "clamped": DK_TANGENT_CLAMPED, "plateau": DK_TANGENT_PLATEAU, "auto": DK_TANGENT_AUTO}
+# Tangent types with a zero slope (fixed tangents are set from their angle afterwards)
+DK_ZERO_TANGENTS = (DK_TANGENT_FLAT, DK_TANGENT_STEP, DK_TANGENT_STEPNEXT, DK_TANGENT_FIXED)
+
+
+class DkCurveArrays(object):
+    # Keys of a curve as NumPy arrays, see dk_curveArrays. Slopes are in value per frame, c1 and c2 are the time and value
+    # of the two inner control points of each segment (len(times) - 1 of them).
+    __slots__ = ("times", "values", "inSlopes", "outSlopes", "step", "stepNext", "weighted", "c1x", "c1y", "c2x", "c2y",
+                 "preInfinity", "postInfinity")
+
+
+def dk_requireNumpy():
+    if numpy is None:
+        raise ImportError("dkAnimEval needs NumPy, it is not installed in this Python")
+
+
+def dk_tangentCodes(types):
+    # Array of the DK_TANGENT_CODES of a column of tangent type names, mapped once per curve without a Python loop
+    return numpy.fromiter(map(DK_TANGENT_CODES.get, types, itertools.repeat(DK_TANGENT_SPLINE)), dtype=numpy.int8, count=len(types))
+
+
+def dk_tangentSlopes(codes, times, values, side_slopes, spline_slopes):
+    # Slopes of the non fixed tangents of each key, codes from dk_tangentCodes. side_slopes is the slope of the segment
+    # on the side of the tangent.
+    count = len(times)
+    slopes = numpy.array(spline_slopes, dtype=float)
+    linear = codes == DK_TANGENT_LINEAR
+    slopes[linear] = side_slopes[linear]
+    zero = numpy.isin(codes, DK_ZERO_TANGENTS)
+    # Clamped : flat next to a key of the same value
+    same = numpy.zeros(count, dtype=bool)
+    same[1:] = values[1:] == values[:-1]
+    same[:-1] |= values[:-1] == values[1:]
+    zero |= (codes == DK_TANGENT_CLAMPED) & same
+    # Plateau and auto : flat on the first and last keys and on the extremes, no overshoot of the neighbour keys elsewhere
+    plateau = (codes == DK_TANGENT_PLATEAU) | (codes == DK_TANGENT_AUTO)
+    if count > 2 and plateau[1:-1].any():
+        previous = values[1:-1] - values[:-2]
+        following = values[2:] - values[1:-1]
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            limit = 3.0 * numpy.minimum(numpy.abs(previous / (times[1:-1] - times[:-2])), numpy.abs(following / (times[2:] - times[1:-1])))
+        inner = plateau[1:-1]
+        slopes[1:-1][inner] = numpy.clip(slopes[1:-1][inner], -limit[inner], limit[inner])
+        zero[1:-1] |= inner & (previous * following <= 0.0)
+    if count:
+        zero[0] |= plateau[0]
+        zero[-1] |= plateau[-1]
+    slopes[zero] = 0.0
+    return slopes
+
+
+def dk_curveArrays(curve, fps=24.0, degrees=True):
+    # Returns the DkCurveArrays of a DkAnimCurve, see header
+    dk_requireNumpy()
+    columns = curve.columns()
+    times = numpy.asarray(columns[dkAnimParser.KEY_TIME], dtype=float)
+    values = numpy.asarray(columns[dkAnimParser.KEY_VALUE], dtype=float)
+    in_codes = dk_tangentCodes(columns[dkAnimParser.KEY_INTYPE])
+    out_codes = dk_tangentCodes(columns[dkAnimParser.KEY_OUTTYPE])
+    count = len(times)
+    arrays = DkCurveArrays()
+    arrays.times = times
+    arrays.values = values
+    arrays.preInfinity = dkAnimParser.dk_infinityName(curve.preInfinity)
+    arrays.postInfinity = dkAnimParser.dk_infinityName(curve.postInfinity)
+    arrays.weighted = str(curve.weighted).lower() in ("true", "1")
+    # Slope of each segment, and of the spline through the neighbour keys
+    lengths = numpy.diff(times)
+    lengths = numpy.where(lengths > 0.0, lengths, 1.0)
+    segment_slopes = numpy.diff(values) / lengths
+    if count > 1:
+        before = numpy.concatenate((segment_slopes[:1], segment_slopes))
+        after = numpy.concatenate((segment_slopes, segment_slopes[-1:]))
+        spline_slopes = numpy.array(after)
+        if count > 2:
+            spans = times[2:] - times[:-2]
+            spline_slopes[1:-1] = (values[2:] - values[:-2]) / numpy.where(spans > 0.0, spans, 1.0)
+        spline_slopes[0] = after[0]
+        spline_slopes[-1] = before[-1]
+    else:
+        before = after = spline_slopes = numpy.zeros(count)
+    in_slopes = dk_tangentSlopes(in_codes, times, values, before, spline_slopes)
+    out_slopes = dk_tangentSlopes(out_codes, times, values, after, spline_slopes)
+    # Fixed tangents : the angles of the file, per second
+    in_fixed = in_codes == DK_TANGENT_FIXED
+    out_fixed = out_codes == DK_TANGENT_FIXED
+    in_angles = numpy.asarray(columns[dkAnimParser.KEY_INANGLE], dtype=float)
+    out_angles = numpy.asarray(columns[dkAnimParser.KEY_OUTANGLE], dtype=float)
+    if degrees:
+        in_angles = numpy.radians(in_angles)
+        out_angles = numpy.radians(out_angles)
+    in_slopes = numpy.where(in_fixed, numpy.tan(in_angles) / fps, in_slopes)
+    out_slopes = numpy.where(out_fixed, numpy.tan(out_angles) / fps, out_slopes)
+    arrays.inSlopes = in_slopes
+    arrays.outSlopes = out_slopes
+    arrays.step = out_codes[:-1] == DK_TANGENT_STEP
+    arrays.stepNext = out_codes[:-1] == DK_TANGENT_STEPNEXT
+    # Control points of the segments : a third of the segment long, or the weight of the fixed weighted tangents
+    third = numpy.diff(times) / 3.0
+    c1x = third.copy()
+    c1y = out_slopes[:-1] * third
+    c2x = third.copy()
+    c2y = in_slopes[1:] * third
+    if arrays.weighted and count > 1:
+        in_weights = numpy.asarray(columns[dkAnimParser.KEY_INWEIGHT], dtype=float)
+        out_weights = numpy.asarray(columns[dkAnimParser.KEY_OUTWEIGHT], dtype=float)
+        use_out = out_fixed[:-1] & (out_weights[:-1] > 0.0)
+        use_in = in_fixed[1:] & (in_weights[1:] > 0.0)
+        c1x = numpy.where(use_out, out_weights[:-1] * numpy.cos(out_angles[:-1]) * fps / 3.0, c1x)
+        c1y = numpy.where(use_out, out_weights[:-1] * numpy.sin(out_angles[:-1]) / 3.0, c1y)
+        c2x = numpy.where(use_in, in_weights[1:] * numpy.cos(in_angles[1:]) * fps / 3.0, c2x)
+        c2y = numpy.where(use_in, in_weights[1:] * numpy.sin(in_angles[1:]) / 3.0, c2y)
+    # The control points stay inside the segment, the time of the segment keeps going forward
+    arrays.c1x = times[:-1] + numpy.clip(c1x, 0.0, numpy.diff(times))
+    arrays.c1y = values[:-1] + c1y
+    arrays.c2x = times[1:] - numpy.clip(c2x, 0.0, numpy.diff(times))
+    arrays.c2y = values[1:] - c2y
+    return arrays
+
+
+def dk_infinityTimes(arrays, times):
+    # Returns (times moved into the range of the keys, value offsets of cycleRelative, masks of the samples before and
+    # after the keys with a linear infinity)
+    first = arrays.times[0]
+    last = arrays.times[-1]
+    period = last - first
+    offsets = numpy.zeros(len(times))
+    linear_before = numpy.zeros(len(times), dtype=bool)
+    linear_after = numpy.zeros(len(times), dtype=bool)
+    local = numpy.array(times, dtype=float)
+    for mode, mask, linear in ((arrays.preInfinity, times < first, linear_before), (arrays.postInfinity, times > last, linear_after)):
+        if not mask.any():
+            continue
+        if mode == "linear":
+            linear[mask] = True
+            continue
+        if mode == "constant" or period <= 0.0:
+            local[mask] = numpy.clip(times[mask], first, last)
+            continue
+        cycles = numpy.floor((times[mask] - first) / period)
+        moved = times[mask] - cycles * period
+        if mode == "oscillate":
+            odd = numpy.mod(cycles, 2.0) != 0.0
+            moved = numpy.where(odd, last - (moved - first), moved)
+        elif mode == "cycleRelative":
+            offsets[mask] = cycles * (arrays.values[-1] - arrays.values[0])
+        local[mask] = moved
+    return local, offsets, linear_before, linear_after
+
+
+def dk_evaluate(arrays, times):
+    # Values of the curve of arrays (see dk_curveArrays) at times, an array of times in frames
+    dk_requireNumpy()
+    times = numpy.asarray(times, dtype=float)
+    count = len(arrays.times)
+    if count == 0:
+        return numpy.zeros(times.shape)
+    if count == 1:
+        return numpy.full(times.shape, arrays.values[0])
+    local, offsets, linear_before, linear_after = dk_infinityTimes(arrays, times)
+    segments = numpy.clip(numpy.searchsorted(arrays.times, local, side="right") - 1, 0, count - 2)
+    t0 = arrays.times[segments]
+    t1 = arrays.times[segments + 1]
+    v0 = arrays.values[segments]
+    v1 = arrays.values[segments + 1]
+    lengths = t1 - t0
+    safe_lengths = numpy.where(lengths > 0.0, lengths, 1.0)
+    if arrays.weighted:
+        # Parameter u of the Bezier segment whose time is local
+        x1 = arrays.c1x[segments]
+        x2 = arrays.c2x[segments]
+        low = numpy.zeros(len(local))
+        high = numpy.ones(len(local))
+        for iteration in range(DK_BEZIER_ITERATIONS):
+            u = (low + high) * 0.5
+            v = 1.0 - u
+            x = v * v * v * t0 + 3.0 * v * v * u * x1 + 3.0 * v * u * u * x2 + u * u * u * t1
+            below = x < local
+            low = numpy.where(below, u, low)
+            high = numpy.where(below, high, u)
+        u = (low + high) * 0.5
+        v = 1.0 - u
+        result = v * v * v * v0 + 3.0 * v * v * u * arrays.c1y[segments] + 3.0 * v * u * u * arrays.c2y[segments] + u * u * u * v1
+    else:
+        u = (local - t0) / safe_lengths
+        u2 = u * u
+        u3 = u2 * u
+        m0 = arrays.outSlopes[segments] * lengths
+        m1 = arrays.inSlopes[segments + 1] * lengths
+        result = (2 * u3 - 3 * u2 + 1) * v0 + (u3 - 2 * u2 + u) * m0 + (-2 * u3 + 3 * u2) * v1 + (u3 - u2) * m1
+    # Step segments, and the keys themselves
+    result = numpy.where(arrays.step[segments] & (local < t1), v0, result)
+    result = numpy.where(arrays.stepNext[segments] & (local > t0), v1, result)
+    result = numpy.where(local == t1, v1, numpy.where(local == t0, v0, result))
+    result = result + offsets
+    if linear_before.any():
+        result[linear_before] = arrays.values[0] + arrays.inSlopes[0] * (times[linear_before] - arrays.times[0])
+    if linear_after.any():
+        result[linear_after] = arrays.values[-1] + arrays.outSlopes[-1] * (times[linear_after] - arrays.times[-1])
+    return result
+
+
+def dk_evaluateCurve(curve, times, fps=24.0, degrees=True):
+    # Values of a DkAnimCurve at times, see dk_evaluate
+    return dk_evaluate(dk_curveArrays(curve, fps, degrees), times)
+
+
+def dk_staticValue(value):
+    # Number of the value of a static record (see dkAnimParser.dk_parseStaticValue), booleans are 1.0/0.0. None when it is not a number.
+    parsed = dkAnimParser.dk_parseStaticValue(value)
+    if parsed is None:
+        return None
+    return float(parsed)
+
+
+def dk_bakeRecords(records, start=None, end=None, step=1.0, fps=24.0, degrees=True):
+    # Samples the anim and static records from start to end (the first and last keys of all the curves by default), every step frames.
+    # Returns (times, channel names, values, skipped channel names), values has one row per channel. The static records
+    # whose value is not a number (see dk_staticValue) are skipped.
+    dk_requireNumpy()
+    channels = [record for record in records if record.kind in ("anim", "static")]
+    if start is None or end is None:
+        bounds = [(record.columns()[dkAnimParser.KEY_TIME][0], record.columns()[dkAnimParser.KEY_TIME][-1])
+                  for record in channels if record.kind == "anim" and record.keyCount]
+        if start is None:
+            start = min(bound[0] for bound in bounds) if bounds else 0.0
+        if end is None:
+            end = max(bound[1] for bound in bounds) if bounds else start
+    if end < start:
+        raise ValueError("The end time {} of the bake is before its start time {}".format(end, start))
+    times = numpy.arange(start, end + step * 0.5, step, dtype=float)
+    values = numpy.empty((len(channels), len(times)))
+    names = []
+    skipped = []
+    for record in channels:
+        name = "{}.{}".format(record.node, record.attr)
+        if record.kind == "static":
+            value = dk_staticValue(record.value)
+            if value is None:
+                skipped.append(name)
+                continue
+            values[len(names)] = value
+        else:
+            values[len(names)] = dk_evaluateCurve(record, times, fps, degrees)
+        names.append(name)
+    return times, names, values[:len(names)], skipped
+
+
+def dk_bakeFile(filename, output, start=None, end=None, step=1.0, fps=24.0, degrees=True):
+    # Bakes the channels of the .dkanim file filename to output, a .npz or .csv file, see header.
+    # Returns the number of channels baked and the names of the channels skipped.
+    times, names, values, skipped = dk_bakeRecords(dkAnimParser.dk_iterDkAnim(filename), start, end, step, fps, degrees)
+    if output.lower().endswith(".csv"):
+        with open(output, "w") as stream:
+            stream.write(",".join(["time"] + names) + "\n")
+            for column, time in enumerate(times):
+                stream.write(",".join([repr(float(time))] + [repr(float(value)) for value in values[:, column]]) + "\n")
+    else:
+        numpy.savez_compressed(output, times=times, channels=numpy.array(names), values=values)
+    return len(names), skipped
+
+
+def dk_check():
+    # Checks of the evaluation and of the bake on built-in curves, returns the list of the failures
+    dk_requireNumpy()
+    failures = []
+    # Fixed tangents : the Hermite segments of dkAnimReduce, the reference of the key reduction
+    keys = [(0.0, 0.0, "fixed", "fixed", True, True, 0, 10.0, 1.0, 20.0, 1.0),
+            (10.0, 5.0, "fixed", "fixed", True, True, 0, -30.0, 1.0, -30.0, 1.0),
+            (20.0, 2.0, "fixed", "fixed", True, True, 0, 0.0, 1.0, 45.0, 1.0)]
+    curve = dkAnimParser.DkAnimCurve("tx", "|check", 1, False, "constant", "constant", keys)
+    times = numpy.linspace(0.0, 20.0, 81)
+    expected = [dkAnimReduce.dk_evaluateSegment(keys[int(min(time, 19.9) // 10)], keys[int(min(time, 19.9) // 10) + 1], time, 24.0) for time in times]
+    error = numpy.abs(dk_evaluateCurve(curve, times) - numpy.array(expected)).max()
+    if error > 1e-9:
+        failures.append("fixed tangents differ from dkAnimReduce.dk_evaluateSegment by {}".format(error))
+    # Static values : booleans as exported for visibility, numbers, and values that are not numbers
+    records = [curve, dkAnimParser.DkStatic("visibility", "|check", 1, "True"), dkAnimParser.DkStatic("visibility", "|off", 1, "False"),
+               dkAnimParser.DkStatic("flag", "|check", 1, "0"), dkAnimParser.DkStatic("sx", "|check", 1, "2.5"),
+               dkAnimParser.DkStatic("label", "|check", 1, "name")]
+    times, names, values, skipped = dk_bakeRecords(records, 0.0, 2.0)
+    expected = {"|check.visibility": 1.0, "|off.visibility": 0.0, "|check.flag": 0.0, "|check.sx": 2.5}
+    for name, value in expected.items():
+        if name not in names or not (values[names.index(name)] == value).all():
+            failures.append("static {} is not baked as {}".format(name, value))
+    if skipped != ["|check.label"] or values.shape != (5, 3):
+        failures.append("static values that are not numbers are not skipped : {}".format(skipped))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate the curves of .dkanim files outside of Maya.")
+    commands = parser.add_subparsers(dest="command")
+    bake_cmd = commands.add_parser("bake", help="Sample every channel of a .dkanim file to a .npz or .csv file")
+    bake_cmd.add_argument("file")
+    bake_cmd.add_argument("output", help=".npz (times, channels, values arrays) or .csv file")
+    bake_cmd.add_argument("--start", type=float, help="first sample time, the first key of the file by default")
+    bake_cmd.add_argument("--end", type=float, help="last sample time, the last key of the file by default")
+    bake_cmd.add_argument("--step", type=float, default=1.0, help="frames between two samples")
+    bake_cmd.add_argument("--fps", type=float, default=24.0, help="frames per second of the time unit of the file")
+    bake_cmd.add_argument("--radians", action="store_true", help="the tangent angles of the file are in radians")
+    commands.add_parser("check", help="Check the evaluation and the bake on built-in curves")
+    args = parser.parse_args(argv)
+    if args.command == "check":
+        try:
+            failures = dk_check()
+        except ImportError as e:
+            print("dkAnimEval: {}".format(e))
+            return 1
+        for failure in failures:
+            print("dkAnimEval: FAILED {}".format(failure))
+        print("dkAnimEval: check {}".format("failed" if failures else "passed"))
+        return 1 if failures else 0
+    if args.command != "bake":
+        parser.print_help()
+        return 1
+    if args.step <= 0.0:
+        parser.error("--step must be positive")
+    try:
+        count, skipped = dk_bakeFile(args.file, args.output, args.start, args.end, args.step, args.fps, not args.radians)
+    except (ImportError, ValueError) as e:
+        print("dkAnimEval: {}".format(e))
+        return 1
+    if skipped:
+        print("dkAnimEval: {} static channels skipped, their value is not a number : {}".format(len(skipped), ", ".join(skipped)))
+    print("dkAnimEval: {} channels baked to [{}]".format(count, args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+##############################################################################################################
+#NAME: dkAnimExport
+#AUTHOR: David Saber, www.dreamcraftdigital.com, based on Dan Erwin and Daniel Kramer's code.
+#SCRIPTING LANGUAGE: Maya Python
+#USAGE: Export engine of dkAnimEhEh : reads animation curves of the scene into dkAnimParser.DkAnimCurve records,
+#       which dkAnimWriter formats. dk_queryCurve() reads all the keys of a curve through OpenMaya MFnAnimCurve when
+#       available, else with one cmds query per key property (never one per key). Breakdowns are looked up in a set.
+#       With a dkAnimParser.DkTimeRange, only the keys of the range are queried, and they are moved by its offset.
+#       dk_queryStatics() reads the static values of an object : the long name and parent flag are resolved once per node,
+#       the channels with an incoming connection (keyed ones included) are found with one listConnections per node, and
+#       the values are read through OpenMaya MPlug when available, else with one getAttr per static channel.
+##############################################################################################################
+
+
+# Imports
+import maya.cmds as cmds
+# The OpenMaya path is optional, dk_queryCurve falls back to cmds without it
+try:
+    import maya.api.OpenMaya as om
+    import maya.api.OpenMayaAnim as oma
+except ImportError:
+    om = None
+    oma = None
+try:
+    from . import dkAnimParser
+except ImportError:
+    import dkAnimParser
+
+# Global variables
+DKANIM_QUERY_ENGINE = "auto" # "auto" uses OpenMaya when available, "cmds" forces the cmds queries
+# dk_queryStatics also accepts "attrs" : the former queries, 5 or 6 per channel, kept to compare with dkAnimBench
+DK_API_TANGENT_NAMES = {"kTangentGlobal": "global", "kTangentFixed": "fixed", "kTangentLinear": "linear", "kTangentFlat": "flat", "kTangentSmooth": "spline", "kTangentStep": "step", "kTangentSlow": "slow", "kTangentFast": "fast", "kTangentClamped": "clamped", "kTangentPlateau": "plateau", "kTangentStepNext": "stepnext", "kTangentAuto": "auto"}
+
+
+def dk_queryCurve(chan, attr, node, parent, engine=None, time_range=None):
+    # Returns the DkAnimCurve of the animCurve node chan driving node.attr, or None if chan has no key (in time_range)
+    engine = engine or DKANIM_QUERY_ENGINE
+    curve = None
+    if engine == "auto" and oma is not None:
+        try:
+            curve = dk_queryCurveAPI(chan, attr, node, parent, time_range)
+        except Exception as e:
+            print("dkAnim: OpenMaya could not read [{}] ({}), using cmds".format(chan, e))
+    if curve is None:
+        curve = dk_queryCurveCmds(chan, attr, node, parent, time_range)
+    if curve is not None and time_range is not None and time_range.offset:
+        # The keys are in the range already, only their offset is applied
+        curve = dkAnimParser.dk_clipCurve(curve, time_range)
+        if not curve.keys:
+            return None
+    return curve
+
+
+def dk_nodeInfo(node, node_infos):
+    # Returns the long name of node and 1 if it has a parent, 0 otherwise. node_infos caches the answers of previous calls.
+    info = node_infos.get(node)
+    if info is None:
+        long_name = cmds.ls(node, l=True)[0] #The ls command returns the names (and optionally the type names) of objects in the scene.
+        parent = 1 if cmds.listRelatives(long_name, p=True) else 0
+        info = node_infos[node] = (long_name, parent)
+    return info
+
+
+def dk_queryStatics(item, node_infos, engine=None):
+    # Returns the DkStatic records of the animatable channels of item that are neither keyed nor connected.
+    # node_infos : dk_nodeInfo cache, shared by all the objects of an export
+    engine = engine or DKANIM_QUERY_ENGINE
+    plugs = cmds.listAnimatable(item)
+    if not plugs:
+        return []
+    if engine == "attrs":
+        return dk_queryStaticsPerChannel(plugs, node_infos)
+    # Channels of each node, in the order of listAnimatable (it also lists the shape of a transform)
+    node_attrs = {}
+    for plug in plugs:
+        node, _, attr = plug.rpartition(".")
+        node_attrs.setdefault(node, []).append(attr)
+    statics = []
+    for node, attrs in node_attrs.items():
+        long_name, parent = dk_nodeInfo(node, node_infos)
+        # Pairs of destination plug (this node) and source plug. Keyed channels are connected to their animCurve.
+        connections = cmds.listConnections(["{}.{}".format(long_name, attr) for attr in attrs], s=True, d=False, c=True, p=True) or []
+        connected = set(plug.rpartition(".")[2] for plug in connections[0::2])
+        attrs = [attr for attr in attrs if attr not in connected]
+        values = None
+        if engine == "auto" and om is not None:
+            try:
+                values = dk_queryValuesAPI(long_name, attrs)
+            except Exception as e:
+                print("dkAnim: OpenMaya could not read the values of [{}] ({}), using cmds".format(long_name, e))
+        if values is None:
+            values = [cmds.getAttr("{}.{}".format(long_name, attr)) for attr in attrs]
+        for attr, value in zip(attrs, values):
+            statics.append(dkAnimParser.DkStatic(attr, long_name, parent, value))
+    return statics
+
+
+def dk_queryStaticsPerChannel(plugs, node_infos):
+    # Former static queries of dk_animWrite, one node lookup, keyframe, listConnections and getAttr per channel
+    statics = []
+    for plug in plugs:
+        node = ".".join(plug.split(".")[:-1])
+        attr = plug.split(".")[-1]
+        node = cmds.ls(node, l=True)[0]
+        parent = 1 if cmds.listRelatives(node, p=True) else 0
+        static_chan = "{}.{}".format(node, attr)
+        testit = cmds.keyframe(static_chan, q=True)
+        connected = cmds.listConnections(static_chan, d=False)
+        if not testit and not connected:
+            statics.append(dkAnimParser.DkStatic(attr, node, parent, cmds.getAttr(static_chan)))
+    return statics
+
+
+def dk_queryValuesAPI(node, attrs):
+    # OpenMaya path of dk_queryStatics : values of node.attr in UI units, as cmds.getAttr returns them, for every attr
+    # of attrs. Plugs of other types (matrices, strings...) are read with getAttr.
+    selection = om.MSelectionList()
+    for attr in attrs:
+        selection.add("{}.{}".format(node, attr))
+    angle_unit = om.MAngle.uiUnit()
+    distance_unit = om.MDistance.uiUnit()
+    time_unit = om.MTime.uiUnit()
+    values = []
+    for i, attr in enumerate(attrs):
+        plug = selection.getPlug(i)
+        attribute = plug.attribute()
+        if attribute.hasFn(om.MFn.kUnitAttribute):
+            unit_type = om.MFnUnitAttribute(attribute).unitType()
+            if unit_type == om.MFnUnitAttribute.kAngle:
+                values.append(plug.asMAngle().asUnits(angle_unit))
+            elif unit_type == om.MFnUnitAttribute.kDistance:
+                values.append(plug.asMDistance().asUnits(distance_unit))
+            elif unit_type == om.MFnUnitAttribute.kTime:
+                values.append(plug.asMTime().asUnits(time_unit))
+            else:
+                values.append(plug.asDouble())
+        elif attribute.hasFn(om.MFn.kNumericAttribute):
+            numeric_type = om.MFnNumericAttribute(attribute).numericType()
+            if numeric_type == om.MFnNumericData.kBoolean:
+                values.append(plug.asBool())
+            elif numeric_type in (om.MFnNumericData.kByte, om.MFnNumericData.kChar, om.MFnNumericData.kShort, om.MFnNumericData.kInt, om.MFnNumericData.kLong):
+                values.append(plug.asInt())
+            else:
+                values.append(plug.asDouble())
+        elif attribute.hasFn(om.MFn.kEnumAttribute):
+            values.append(plug.asInt())
+        else:
+            values.append(cmds.getAttr("{}.{}".format(node, attr)))
+    return values
+
+
+def dk_timeRangeString(time_range):
+    # time flag of the keyframe and keyTangent queries : "start:end", either of them empty when there is no limit
+    return "{}:{}".format("" if time_range.start is None else time_range.start, "" if time_range.end is None else time_range.end)
+
+
+def dk_apiTangentNames():
+    # Maps the MFnAnimCurve tangent types available in this Maya version to the names used by keyTangent
+    names = {}
+    for constant, name in DK_API_TANGENT_NAMES.items():
+        if hasattr(oma.MFnAnimCurve, constant):
+            names[getattr(oma.MFnAnimCurve, constant)] = name
+    return names
+
+
+def dk_queryCurveAPI(chan, attr, node, parent, time_range=None):
+    # OpenMaya path : no command at all, every key property is read from the MFnAnimCurve function set.
+    # Returns None when the curve uses a tangent type unknown to DK_API_TANGENT_NAMES, so that cmds reads it.
+    selection = om.MSelectionList()
+    selection.add(chan)
+    fn = oma.MFnAnimCurve(selection.getDependNode(0))
+    count = fn.numKeys
+    if count == 0:
+        return None
+    tangent_names = dk_apiTangentNames()
+    # Values and angles are written in UI units, as cmds.keyframe and cmds.keyTangent return them
+    curve_type = fn.animCurveType
+    if curve_type in (oma.MFnAnimCurve.kAnimCurveTA, oma.MFnAnimCurve.kAnimCurveUA):
+        factor = om.MAngle(1.0, om.MAngle.uiUnit()).asRadians()
+    elif curve_type in (oma.MFnAnimCurve.kAnimCurveTL, oma.MFnAnimCurve.kAnimCurveUL):
+        factor = om.MDistance(1.0, om.MDistance.uiUnit()).asCentimeters()
+    else:
+        factor = 1.0
+    time_unit = om.MTime.uiUnit()
+    angle_unit = om.MAngle.uiUnit()
+    unitless = fn.isUnitlessInput
+    # Keys of the time range, found by a binary search on their time
+    first, last = 0, count
+    if time_range is not None:
+        first, last = dkAnimParser.dk_findKeyRange(lambda i: fn.unitlessInput(i) if unitless else fn.input(i).asUnits(time_unit), count, time_range)
+        if first == last:
+            return None
+    keys = []
+    append = keys.append
+    for i in range(first, last):
+        in_type = tangent_names.get(fn.inTangentType(i))
+        out_type = tangent_names.get(fn.outTangentType(i))
+        if in_type is None or out_type is None:
+            return None
+        in_angle, in_weight = fn.getTangentAngleWeight(i, True)
+        out_angle, out_weight = fn.getTangentAngleWeight(i, False)
+        append((fn.unitlessInput(i) if unitless else fn.input(i).asUnits(time_unit), fn.value(i) / factor, in_type, out_type,
+                fn.tangentsLocked(i), fn.weightsLocked(i), int(fn.isBreakdown(i)),
+                in_angle.asUnits(angle_unit), in_weight, out_angle.asUnits(angle_unit), out_weight))
+    return dkAnimParser.DkAnimCurve(attr, node, parent, fn.isWeighted, fn.preInfinityType, fn.postInfinityType, keys)
+
+
+def dk_queryCurveCmds(chan, attr, node, parent, time_range=None):
+    # cmds path : one query per key property for the whole curve, or for the keys of time_range
+    flags = {} if time_range is None else {"time": (dk_timeRangeString(time_range),)}
+    keys = cmds.keyframe(chan, q=True, **flags)
+    if not keys:
+        return None
+    values = cmds.keyframe(chan, q=True, vc=True, **flags)
+    in_tan = cmds.keyTangent(chan, q=True, itt=True, **flags) #outTangentType inTangentType. "Fixed tangents" means retaining the tangent's angle
+    out_tan = cmds.keyTangent(chan, q=True, ott=True, **flags)
+    tan_lock = cmds.keyTangent(chan, q=True, lock=True, **flags) #Lock a tangent so in and out tangents move together. Returns an int[] when queried.
+    weight_lock = cmds.keyTangent(chan, q=True, weightLock=True, **flags) #Lock the weight of a tangent so it is fixed. -weightLock off means tangent has free length, and on means locked length
+    # A set, so that finding if a key is a breakdown does not scan the whole list of breakdowns
+    breakdown = set(cmds.keyframe(chan, q=True, breakdown=True, **flags) or [])
+    in_angle = cmds.keyTangent(chan, q=True, inAngle=True, **flags) #the following 4 lines are float values for tangents angles and length
+    out_angle = cmds.keyTangent(chan, q=True, outAngle=True, **flags)
+    in_weight = cmds.keyTangent(chan, q=True, inWeight=True, **flags)
+    out_weight = cmds.keyTangent(chan, q=True, outWeight=True, **flags)
+    pre_in = cmds.getAttr("{}.preInfinity".format(chan))
+    post_in = cmds.getAttr("{}.postInfinity".format(chan))
+    weighted = cmds.getAttr("{}.weightedTangents".format(chan))
+    breakdowns = [1 if key in breakdown else 0 for key in keys]
+    return dkAnimParser.DkAnimCurve(attr, node, parent, weighted, pre_in, post_in,
+                                    list(zip(keys, values, in_tan, out_tan, tan_lock, weight_lock, breakdowns, in_angle, in_weight, out_angle, out_weight)))
@@ -0,0 +1,289 @@
+##############################################################################################################
+#NAME: dkAnimFakeMaya
+#AUTHOR: David Saber, www.dreamcraftdigital.com, based on Dan Erwin and Daniel Kramer's code.
+#SCRIPTING LANGUAGE: Python (no Maya import)
+#USAGE: Recording stand-in for maya.cmds and maya.mel, to run the dkAnimEhEh modules without a Maya session.
+#       dk_installFakeMaya() must be called before importing dkAnimEhEh, dkAnimImport, ... :
+#           cmds = dkAnimFakeMaya.dk_installFakeMaya()
+#           import dkAnimImport
+#       Every command is counted in cmds.calls and returns None, unless a handler was registered in cmds.handlers.
+#       cmds.log, when set to a list, records every call as (command, args, kwargs).
+#       DkFakeScene registers the handlers of a synthetic scene holding the channels of a list of records (the nodes,
+#       attributes, curves and static values of a .dkanim file), and of the dkAnimEhEh windows, so that dk_animRead,
+#       dk_animWrite and dk_loadChannels run to the end on the stand-in, see dkAnimBench suite.
+##############################################################################################################
+
+
+# Imports
+import collections
+import sys
+import types
+
+
+class DkFakeCmds(object):
+    # Stand-in for the maya.cmds module
+
+    def __init__(self):
+        self.calls = collections.Counter()
+        self.handlers = {}
+        self.log = None
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        def command(*args, **kwargs):
+            self.calls[name] += 1
+            if self.log is not None:
+                self.log.append((name, args, kwargs))
+            handler = self.handlers.get(name)
+            if handler is None:
+                return None
+            return handler(*args, **kwargs)
+        command.__name__ = name
+        return command
+
+    def dk_reset(self):
+        # Forgets the recorded calls, keeps the handlers
+        self.calls.clear()
+
+    def dk_total(self):
+        return sum(self.calls.values())
+
+
+class DkFakeMel(object):
+    # Stand-in for the maya.mel module, eval is only used to get the name of the main progress bar
+
+    def __init__(self):
+        self.calls = collections.Counter()
+
+    def eval(self, command):
+        self.calls["eval"] += 1
+        return "MayaWindow|mainProgressBar"
+
+
+class DkFakeScene(object):
+    # Synthetic scene answering the queries of the dkAnimEhEh modules. records are DkAnimCurve and DkStatic records of
+    # dkAnimParser : each one is a channel of the scene, keyed with the keys of the curve or set to the static value.
+    # ui holds the values of the checkboxes and text fields, by control name. The channels list of the Channels window
+    # is kept in chan_items and chan_selected (1-based indices).
+
+    def __init__(self, records, ui=None):
+        self.curves = {}
+        self.statics = {}
+        self.attrs = collections.OrderedDict()
+        for record in records:
+            if record.kind == "anim":
+                self.curves["{}_{}".format(record.node.split("|")[-1], record.attr)] = record
+            elif record.kind == "static":
+                self.statics["{}.{}".format(record.node, record.attr)] = record.value
+            else:
+                continue
+            self.attrs.setdefault(record.node, []).append(record.attr)
+        # Curve of each channel, and channel of each curve
+        self.channel_curves = dict(("{}.{}".format(curve.node, curve.attr), name) for name, curve in self.curves.items())
+        self.short_names = dict((node.split("|")[-1], node) for node in self.attrs)
+        self.selection = list(self.attrs)
+        self.ui = {"dk_paths": True, "dk_unKeyed": True, "dk_useChannels": False}
+        self.ui.update(ui or {})
+        self.chan_items = []
+        self.chan_selected = []
+
+    def install(self, cmds):
+        # Registers the handlers of the scene on cmds, a DkFakeCmds
+        for name in ("ls", "objExists", "listAttr", "listConnections", "listRelatives", "listAnimatable", "keyframe", "keyTangent",
+                     "getAttr", "currentUnit", "file", "date", "timerX", "window", "checkBox", "textField", "textFieldGrp",
+                     "textScrollList", "autoKeyframe", "evaluationManager", "progressBar", "scrollLayout"):
+            cmds.handlers[name] = getattr(self, name)
+        return cmds
+
+    def longName(self, node):
+        return node if node in self.attrs else self.short_names.get(node, node)
+
+    def ls(self, *args, **kwargs):
+        if kwargs.get("sl"):
+            return list(self.selection)
+        node = self.longName(args[0])
+        return [node] if node in self.attrs else []
+
+    def objExists(self, name):
+        node, _, attr = name.partition(".")
+        node = self.longName(node)
+        return node in self.attrs and (not attr or attr in self.attrs[node])
+
+    def listAttr(self, node, **kwargs):
+        if kwargs.get("locked"):
+            return []
+        return list(self.attrs.get(self.longName(node), []))
+
+    def listConnections(self, names, **kwargs):
+        if kwargs.get("type") == "animCurve":
+            node = self.longName(names)
+            curves = [self.channel_curves.get("{}.{}".format(node, attr)) for attr in self.attrs.get(node, [])]
+            return [curve for curve in curves if curve] or None
+        if kwargs.get("p") and not kwargs.get("c") and names in self.curves:
+            # Channel driven by a curve
+            curve = self.curves[names]
+            return ["{}.{}".format(curve.node.split("|")[-1], curve.attr)]
+        # Incoming connections of plugs : the keyed ones
+        pairs = []
+        for name in names if isinstance(names, list) else [names]:
+            node, _, attr = name.partition(".")
+            node = self.longName(node)
+            for attr in [attr] if attr else self.attrs.get(node, []):
+                curve = self.channel_curves.get("{}.{}".format(node, attr))
+                if curve:
+                    pairs += ["{}.{}".format(node.split("|")[-1], attr), curve + ".output"]
+        if not kwargs.get("c"):
+            pairs = pairs[1::2]
+        return pairs or None
+
+    def listRelatives(self, node, **kwargs):
+        parent = self.longName(node).rpartition("|")[0]
+        return [parent.split("|")[-1]] if parent else None
+
+    def listAnimatable(self, name):
+        if "." in name:
+            return [name]
+        node = self.longName(name)
+        return ["{}.{}".format(node, attr) for attr in self.attrs.get(node, [])]
+
+    def keyframe(self, name, **kwargs):
+        if not kwargs.get("q"):
+            return None
+        curve = self.curves.get(name)
+        if curve is None:
+            curve = self.curves.get(self.channel_curves.get(self._channel(name)))
+        if curve is None:
+            return None
+        if kwargs.get("keyframeCount"):
+            return curve.keyCount
+        if kwargs.get("vc"):
+            return [float(key[1]) for key in curve.keys]
+        if kwargs.get("breakdown"):
+            return [key[0] for key in curve.keys if int(key[6])] or None
+        return [key[0] for key in curve.keys]
+
+    def keyTangent(self, name, **kwargs):
+        curve = self.curves.get(name)
+        if not kwargs.get("q") or curve is None:
+            return None
+        for flag, field in (("itt", 2), ("ott", 3), ("lock", 4), ("weightLock", 5), ("inAngle", 7), ("inWeight", 8), ("outAngle", 9), ("outWeight", 10)):
+            if kwargs.get(flag):
+                return [key[field] if len(key) > field else 0.0 for key in curve.keys]
+        return None
+
+    def getAttr(self, name, **kwargs):
+        chan, _, attr = name.rpartition(".")
+        curve = self.curves.get(chan)
+        if curve is not None:
+            return {"preInfinity": curve.preInfinity, "postInfinity": curve.postInfinity, "weightedTangents": curve.weighted}.get(attr)
+        if kwargs.get("lock"):
+            return False
+        value = self.statics.get(self._channel(name))
+        return 0.0 if value is None else float(value)
+
+    def _channel(self, plug):
+        node, _, attr = plug.rpartition(".")
+        return "{}.{}".format(self.longName(node), attr)
+
+    def currentUnit(self, **kwargs):
+        if kwargs.get("time"):
+            return "film"
+        if kwargs.get("angle"):
+            return "deg"
+        return "cm" if kwargs.get("q") else None
+
+    def file(self, *args, **kwargs):
+        return "synthetic.ma" if kwargs.get("q") else None
+
+    def date(self, **kwargs):
+        return "00:00:00"
+
+    def timerX(self, **kwargs):
+        return 0.0
+
+    def window(self, name, **kwargs):
+        return name == "dkAnim_channels"
+
+    def checkBox(self, name, **kwargs):
+        return bool(self.ui.get(name, False))
+
+    def textField(self, name, **kwargs):
+        return self.ui.get(name, "")
+
+    def textFieldGrp(self, name, **kwargs):
+        return self.ui.get(name, "")
+
+    def autoKeyframe(self, **kwargs):
+        return False
+
+    def evaluationManager(self, **kwargs):
+        return ["off"] if kwargs.get("q") else None
+
+    def progressBar(self, *args, **kwargs):
+        return False
+
+    def scrollLayout(self, *args, **kwargs):
+        return 400
+
+    def textScrollList(self, name, **kwargs):
+        # Channels list of the Channels window : items, selected indices, and the edits of dk_loadChannels
+        if kwargs.get("q"):
+            if kwargs.get("ai"):
+                return list(self.chan_items) or None
+            if kwargs.get("sii"):
+                return list(self.chan_selected) or None
+            if kwargs.get("si"):
+                return [self.chan_items[i - 1] for i in self.chan_selected] or None
+            if kwargs.get("ni"):
+                return len(self.chan_items)
+            if kwargs.get("nsi"):
+                return len(self.chan_selected)
+            return 400
+        if kwargs.get("ra"):
+            self.chan_items = []
+            self.chan_selected = []
+        if kwargs.get("da"):
+            self.chan_selected = []
+        for flag, edit in (("a", self._appendItems), ("append", self._appendItems), ("sii", self._selectIndices), ("si", self._selectItems),
+                           ("dii", self._deselectIndices), ("ri", self._removeItems)):
+            if flag in kwargs:
+                values = kwargs[flag]
+                edit(values if isinstance(values, (list, tuple)) else [values])
+        return None
+
+    def _appendItems(self, items):
+        self.chan_items.extend(items)
+
+    def _selectIndices(self, indices):
+        selected = set(self.chan_selected)
+        self.chan_selected.extend(i for i in indices if i not in selected)
+        self.chan_selected.sort()
+
+    def _selectItems(self, items):
+        positions = dict((item, i + 1) for i, item in enumerate(self.chan_items))
+        self._selectIndices([positions[item] for item in items if item in positions])
+
+    def _removeItems(self, items):
+        for item in items:
+            if item in self.chan_items:
+                position = self.chan_items.index(item) + 1
+                self.chan_items.remove(item)
+                self.chan_selected = [i - 1 if i > position else i for i in self.chan_selected if i != position]
+
+    def _deselectIndices(self, indices):
+        indices = set(indices)
+        self.chan_selected = [i for i in self.chan_selected if i not in indices]
+
+
+def dk_installFakeMaya(cmds=None):
+    # Registers the stand-ins as the maya, maya.cmds and maya.mel modules. Returns the DkFakeCmds instance.
+    cmds = cmds or DkFakeCmds()
+    maya = types.ModuleType("maya")
+    maya.cmds = cmds
+    maya.mel = DkFakeMel()
+    sys.modules["maya"] = maya
+    sys.modules["maya.cmds"] = cmds
+    sys.modules["maya.mel"] = maya.mel
+    return cmds
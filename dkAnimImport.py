@@ -0,0 +1,179 @@
+##############################################################################################################
+#NAME: dkAnimImport
+#AUTHOR: David Saber, www.dreamcraftdigital.com, based on Dan Erwin and Daniel Kramer's code.
+#SCRIPTING LANGUAGE: Maya Python
+#USAGE: Import engine of dkAnimEhEh : applies the DkAnimCurve records read by dkAnimParser onto scene attributes.
+#       dk_applyCurve() sets all the keys of a curve at once instead of issuing 3 to 5 commands per key :
+#       - "cmds" : one setKeyframe per key, then one keyTangent per group of keys sharing the same tangent settings.
+#                  The default : every edit is in Maya's undo queue.
+#       - "api"  : OpenMaya MFnAnimCurve.addKeys on a new curve, tangents, locks and breakdowns set by index.
+#                  Opt-in ("OpenMaya Import" of the UI, "engine" of the batch jobs) : it is NOT recorded in Maya's undo
+#                  queue, like any OpenMaya edit made from a script. Undo, even of a fast import (dkAnimScene.DkFastImport),
+#                  only removes the cmds edits and leaves the curves created through OpenMaya.
+#       - "keys" : the historical key by key path (setKeyframe + keyTangent for every key), kept for comparison.
+#       "api" and "auto" use OpenMaya for curves that do not exist yet or have no keys, "cmds" otherwise or when OpenMaya fails.
+##############################################################################################################
+
+
+# Imports
+import maya.cmds as cmds
+# The OpenMaya bulk path is optional, dk_applyCurve falls back to cmds without it
+try:
+    import maya.api.OpenMaya as om
+    import maya.api.OpenMayaAnim as oma
+except ImportError:
+    om = None
+    oma = None
+try:
+    from . import dkAnimParser
+except ImportError:
+    import dkAnimParser
+
+# Global variables
+DKANIM_APPLY_ENGINE = "cmds" # "cmds", "api", "auto" or "keys", see header. "api" and "auto" can not be undone.
+DK_API_TANGENT_NAMES = {"global": "kTangentGlobal", "fixed": "kTangentFixed", "linear": "kTangentLinear", "flat": "kTangentFlat", "spline": "kTangentSmooth", "step": "kTangentStep", "slow": "kTangentSlow", "fast": "kTangentFast", "clamped": "kTangentClamped", "plateau": "kTangentPlateau", "stepnext": "kTangentStepNext", "auto": "kTangentAuto"}
+
+
+def dk_applyCurve(node, attr, curve, engine=None):
+    # Sets the keys and infinity of a DkAnimCurve on node.attr. Returns the name of the engine that was used.
+    # engine : DKANIM_APPLY_ENGINE when None, see header
+    engine = engine or DKANIM_APPLY_ENGINE
+    if not curve.keys:
+        return ""
+    if engine == "keys":
+        dk_applyCurveKeyByKey(node, attr, curve)
+        return "keys"
+    if engine in ("auto", "api") and oma is not None:
+        try:
+            if dk_applyCurveAPI(node, attr, curve):
+                return "api"
+        except Exception as e:
+            print("dkAnim: OpenMaya could not key [{}.{}] ({}), using cmds".format(node, attr, e))
+    dk_applyCurveCmds(node, attr, curve)
+    return "cmds"
+
+
+def dk_apiTangentTypes():
+    # Maps the tangent type names of the file to MFnAnimCurve tangent types available in this Maya version
+    types = {}
+    for name, constant in DK_API_TANGENT_NAMES.items():
+        if hasattr(oma.MFnAnimCurve, constant):
+            types[name] = getattr(oma.MFnAnimCurve, constant)
+    return types
+
+
+def dk_applyCurveAPI(node, attr, curve):
+    # OpenMaya bulk path. Returns False, without changing anything, when the curve must go through cmds :
+    # the attribute already has keys (setKeyframe merges keys into them) or the file uses a tangent type unknown to the API.
+    tangent_types = dk_apiTangentTypes()
+    times, values, in_types, out_types, tan_locks, weight_locks, breakdowns, in_angles, in_weights, out_angles, out_weights = curve.columns()
+    for name in set(in_types) | set(out_types):
+        if name not in tangent_types:
+            return False
+    selection = om.MSelectionList()
+    selection.add(node + "." + attr)
+    plug = selection.getPlug(0)
+    fn = oma.MFnAnimCurve()
+    existing = oma.MAnimUtil.findAnimation(plug)
+    if len(existing) > 0:
+        fn.setObject(existing[0])
+        if fn.numKeys > 0:
+            return False
+    else:
+        fn.create(plug)
+    # Times, values and angles of the file are in UI units, the API works in internal units
+    curve_type = fn.animCurveType
+    if curve_type in (oma.MFnAnimCurve.kAnimCurveTA, oma.MFnAnimCurve.kAnimCurveUA):
+        factor = om.MAngle(1.0, om.MAngle.uiUnit()).asRadians()
+    elif curve_type in (oma.MFnAnimCurve.kAnimCurveTL, oma.MFnAnimCurve.kAnimCurveUL):
+        factor = om.MDistance(1.0, om.MDistance.uiUnit()).asCentimeters()
+    else:
+        factor = 1.0
+    time_unit = om.MTime.uiUnit()
+    angle_unit = om.MAngle.uiUnit()
+    fn.addKeys(om.MTimeArray([om.MTime(t, time_unit) for t in times]), om.MDoubleArray([v * factor for v in values]), tangent_types["spline"], tangent_types["spline"], True)
+    if fn.numKeys != len(times):
+        raise RuntimeError("{} keys added for {} keys in the file".format(fn.numKeys, len(times)))
+    if curve.weighted:
+        fn.setIsWeighted(True)
+    for i in range(len(times)):
+        if in_types[i] != "spline":
+            fn.setInTangentType(i, tangent_types[in_types[i]])
+        if out_types[i] != "spline":
+            fn.setOutTangentType(i, tangent_types[out_types[i]])
+        if in_types[i] == "fixed":
+            fn.setAngle(i, om.MAngle(in_angles[i], angle_unit), True)
+            fn.setWeight(i, in_weights[i], True)
+        if out_types[i] == "fixed":
+            fn.setAngle(i, om.MAngle(out_angles[i], angle_unit), False)
+            fn.setWeight(i, out_weights[i], False)
+        if breakdowns[i]:
+            fn.setIsBreakdown(i, True)
+        # Locks last, so that setting one fixed tangent does not move the other one
+        fn.setTangentsLocked(i, tan_locks[i])
+        if curve.weighted:
+            fn.setWeightsLocked(i, weight_locks[i])
+    fn.setPreInfinityType(dkAnimParser.DK_INFINITY_VALUES[dkAnimParser.dk_infinityName(curve.preInfinity)])
+    fn.setPostInfinityType(dkAnimParser.DK_INFINITY_VALUES[dkAnimParser.dk_infinityName(curve.postInfinity)])
+    return True
+
+
+def dk_applyCurveCmds(node, attr, curve):
+    # cmds path : setKeyframe still has to be called once per key, but every keyTangent edit is shared by all the keys with the same settings
+    tangent_groups = {}
+    lock_groups = {}
+    weight_lock_groups = {}
+    fixed_keys = []
+    for key in curve.keys:
+        readtime = key[dkAnimParser.KEY_TIME]
+        cmds.setKeyframe(node, time=readtime, value=key[dkAnimParser.KEY_VALUE], bd=key[dkAnimParser.KEY_BREAKDOWN], at=attr)
+        lock_groups.setdefault(key[dkAnimParser.KEY_TANLOCK], []).append((readtime, readtime))
+        weight_lock_groups.setdefault(key[dkAnimParser.KEY_WEIGHTLOCK], []).append((readtime, readtime))
+        if key[dkAnimParser.KEY_INTYPE] == "fixed" or key[dkAnimParser.KEY_OUTTYPE] == "fixed":
+            # Angles and weights differ from key to key
+            fixed_keys.append(key)
+        else:
+            tangent_groups.setdefault((key[dkAnimParser.KEY_INTYPE], key[dkAnimParser.KEY_OUTTYPE]), []).append((readtime, readtime))
+    for tan_lock, times in lock_groups.items():
+        cmds.keyTangent(node, time=times, lock=tan_lock, at=attr)
+    if curve.weighted:
+        cmds.keyTangent(node, edit=True, weightedTangents=True, at=attr)
+        for weight_lock, times in weight_lock_groups.items():
+            cmds.keyTangent(node, time=times, weightLock=int(weight_lock), at=attr)
+    for (in_type, out_type), times in tangent_groups.items():
+        cmds.keyTangent(node, e=True, a=True, time=times, itt=in_type, ott=out_type, at=attr)
+    for key in fixed_keys:
+        dk_setFixedTangents(node, attr, key)
+    cmds.setInfinity(node, poi=dkAnimParser.dk_infinityName(curve.postInfinity), pri=dkAnimParser.dk_infinityName(curve.preInfinity), at=attr)
+
+
+def dk_setFixedTangents(node, attr, key):
+    # keyTangent edit of one key having at least one fixed tangent
+    readtime = key[dkAnimParser.KEY_TIME]
+    in_type = key[dkAnimParser.KEY_INTYPE]
+    out_type = key[dkAnimParser.KEY_OUTTYPE]
+    angles = {}
+    if in_type == "fixed":
+        angles["inAngle"] = key[dkAnimParser.KEY_INANGLE]
+        angles["inWeight"] = key[dkAnimParser.KEY_INWEIGHT]
+    if out_type == "fixed":
+        angles["outAngle"] = key[dkAnimParser.KEY_OUTANGLE]
+        angles["outWeight"] = key[dkAnimParser.KEY_OUTWEIGHT]
+    cmds.keyTangent(node, e=True, a=True, time=(readtime, readtime), itt=in_type, ott=out_type, at=attr, **angles)
+
+
+def dk_applyCurveKeyByKey(node, attr, curve):
+    # Sets the keys of a DkAnimCurve on node.attr, key by key, as dk_animRead always did
+    # This function section does not rely on selected objects so it must be fed an object name. Could the attribute tag accept a syntax such as : objname.attribute? Tested : NO. So I added the node and the short attribute name to each setKeyframe, keytangeant and setinfinity
+    for key in curve.keys:
+        readtime = key[dkAnimParser.KEY_TIME]
+        cmds.setKeyframe(node, time=readtime, value=key[dkAnimParser.KEY_VALUE], bd=key[dkAnimParser.KEY_BREAKDOWN], at=attr)
+        cmds.keyTangent(node, time=(readtime, readtime), lock=key[dkAnimParser.KEY_TANLOCK], at=attr)
+        if curve.weighted:
+            cmds.keyTangent(node, edit=True, weightedTangents=True, at=attr)
+            cmds.keyTangent(node, time=(readtime, readtime), weightLock=int(key[dkAnimParser.KEY_WEIGHTLOCK]), at=attr)
+        if key[dkAnimParser.KEY_INTYPE] != "fixed" and key[dkAnimParser.KEY_OUTTYPE] != "fixed":
+            cmds.keyTangent(node, e=True, a=True, time=(readtime, readtime), itt=key[dkAnimParser.KEY_INTYPE], ott=key[dkAnimParser.KEY_OUTTYPE], at=attr)
+        else:
+            dk_setFixedTangents(node, attr, key)
+    cmds.setInfinity(node, poi=dkAnimParser.dk_infinityName(curve.postInfinity), pri=dkAnimParser.dk_infinityName(curve.preInfinity), at=attr)
@@ -0,0 +1,595 @@
+##############################################################################################################
+#NAME: dkAnimParser
+#AUTHOR: David Saber, www.dreamcraftdigital.com, based on Dan Erwin and Daniel Kramer's code.
+#SCRIPTING LANGUAGE: Python (no Maya import, can be used from any Python 3 interpreter)
+#USAGE: Streaming reader for *.dkanim files. dk_iterDkAnim() yields one record per sceneUnit, static and anim
+#       entry of the file, so the file never has to be loaded in memory as a whole.
+#       Used by dkAnimEhEh.dk_animRead and dkAnimEhEh.dk_loadChannels, and by dkAnimBench.py to time parsing.
+#       Files written by dkAnimWriter end with an index of their records (see dk_formatIndex) : dk_readIndex() lists
+#       the channels without reading the keys, and dk_iterDkAnimAt() reads only the records at chosen offsets.
+#       Text files compressed with gzip, bz2 or xz (see DK_COMPRESSIONS) are detected and decompressed while read.
+#       A DkTimeRange limits the keys read to a range of time, and can move them to a new start time : the keys of a
+#       text file are sorted by time, so the key lines after the range are skipped without being parsed.
+#       Shared curves : a channel with the same keys, tangents, infinity and weighting as a curve written before it is
+#       written as a reference to that curve ("animRef attr attr node parent <offset of the curve>;"). Readers return it
+#       as a DkAnimCurve sharing the keys of the referenced curve, decoded once : the offsets of the referenced curves
+#       are listed by the "#dkShared" lines of the index, so they are kept when read. Readers older than the shared
+#       curves skip the animRef lines.
+##############################################################################################################
+
+
+# Imports
+import bz2
+import collections
+import gzip
+import io
+import os
+# lzma is missing from some Python builds, xz files can not be read without it
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+# Layout of the tuples stored in DkAnimCurve.keys, one tuple per key, in file order:
+# (time, value, inType, outType, tanLock, weightLock, breakdown, inAngle, inWeight, outAngle, outWeight)
+KEY_FIELDS = ("time", "value", "inType", "outType", "tanLock", "weightLock", "breakdown", "inAngle", "inWeight", "outAngle", "outWeight")
+KEY_TIME = 0
+KEY_VALUE = 1
+KEY_INTYPE = 2
+KEY_OUTTYPE = 3
+KEY_TANLOCK = 4
+KEY_WEIGHTLOCK = 5
+KEY_BREAKDOWN = 6
+KEY_INANGLE = 7
+KEY_INWEIGHT = 8
+KEY_OUTANGLE = 9
+KEY_OUTWEIGHT = 10
+
+# Read buffer size of the file, bigger than the default one as .dkanim files are read from top to bottom
+DK_READ_BUFFER = 1024 * 1024
+# Lock flags are written by dk_animWrite as "True"/"False" (older files may use 1/0)
+_DK_BOOLS = {b"True": True, b"False": False, b"1": True, b"0": False, b"true": True, b"false": False}
+# Static values of boolean attributes are written as "True"/"False", 1/0 are read as numbers
+_DK_STATIC_BOOLS = {"True": True, "False": False, "true": True, "false": False}
+# Infinity modes are written by dk_animWrite as the preInfinity/postInfinity enum values of the animCurve node
+DK_INFINITY_NAMES = {0: "constant", 1: "linear", 3: "cycle", 4: "cycleRelative", 5: "oscillate"}
+DK_INFINITY_VALUES = dict((name, value) for value, name in DK_INFINITY_NAMES.items())
+# Record counts of the files read by dk_iterDkAnim, by dk_fileKey, see dk_countRecords
+_dk_recordCounts = {}
+# Codecs of compressed text files, detected by the first bytes of the file : name -> (magic bytes, module)
+DK_COMPRESSIONS = {"gzip": (b"\x1f\x8b", gzip), "bz2": (b"BZh", bz2), "xz": (b"\xfd7zXZ\x00", lzma)}
+# Range of time of the keys to read or write : start and end are included, None for no limit. offset is added to the time of the keys kept.
+DkTimeRange = collections.namedtuple("DkTimeRange", ["start", "end", "offset"], defaults=(None, None, 0.0))
+
+
+class DkSceneUnit(object):
+    # "sceneUnit cm" line: the linear unit the file was written with
+    kind = "sceneUnit"
+    __slots__ = ("unit", "offset")
+
+    def __init__(self, unit, offset=0):
+        self.unit = unit
+        self.offset = offset
+
+    def __repr__(self):
+        return "DkSceneUnit({!r})".format(self.unit)
+
+
+class DkStatic(object):
+    # "static attr attr node parent value" line: an un-keyed attribute value. value is kept as written in the file.
+    kind = "static"
+    __slots__ = ("attr", "node", "parent", "value", "offset")
+
+    def __init__(self, attr, node, parent, value, offset=0):
+        self.attr = attr
+        self.node = node
+        self.parent = parent
+        self.value = value
+        self.offset = offset
+
+    def __repr__(self):
+        return "DkStatic({}.{} = {})".format(self.node, self.attr, self.value)
+
+
+class DkAnimCurve(object):
+    # "anim attr attr node parent 0 0;" line and its animData block.
+    # keys is a list of tuples laid out as KEY_FIELDS, or None when the file was read with keys=False (keyCount is always set).
+    # Curves read from a binary file (dkAnimBinary) hold their keys as columns instead, keys is then built from them on first use.
+    kind = "anim"
+    __slots__ = ("attr", "node", "parent", "weighted", "preInfinity", "postInfinity", "keyCount", "_keys", "_columns", "offset")
+
+    def __init__(self, attr, node, parent, weighted=False, preInfinity="constant", postInfinity="constant", keys=None, keyCount=0, offset=0, columns=None):
+        self.attr = attr
+        self.node = node
+        self.parent = parent
+        self.weighted = weighted
+        self.preInfinity = preInfinity
+        self.postInfinity = postInfinity
+        self._keys = keys
+        self._columns = columns
+        if keys is not None:
+            keyCount = len(keys)
+        elif columns is not None:
+            keyCount = len(columns[KEY_TIME])
+        self.keyCount = keyCount
+        self.offset = offset
+
+    @property
+    def keys(self):
+        if self._keys is None and self._columns is not None:
+            self._keys = list(zip(*[column.tolist() if hasattr(column, "tolist") else list(column) for column in self._columns]))
+        return self._keys
+
+    @keys.setter
+    def keys(self, keys):
+        self._keys = keys
+        self._columns = None
+
+    def hasKeys(self):
+        # False when the curve was read with keys=False
+        return self._keys is not None or self._columns is not None
+
+    def columns(self):
+        # Returns the keys as one sequence per field of KEY_FIELDS (times, values, inTypes, ...), handy for bulk operations.
+        # For binary files the numeric columns are views on the file (NumPy arrays when NumPy is available), not copies.
+        if self._columns is not None:
+            return self._columns
+        if not self._keys:
+            return tuple(() for field in KEY_FIELDS)
+        return tuple(zip(*self._keys))
+
+    def __repr__(self):
+        return "DkAnimCurve({}.{}, {} keys)".format(self.node, self.attr, self.keyCount)
+
+
+def dk_infinityName(infinity):
+    # Returns the setInfinity name ("constant", "cycle", ...) of an infinity mode read from a file, which may be an enum value or a name
+    try:
+        return DK_INFINITY_NAMES.get(int(infinity), "constant")
+    except ValueError:
+        return infinity if infinity in DK_INFINITY_VALUES else "constant"
+
+
+def dk_parseStaticValue(value):
+    # Value of a static record as it is set on its attribute : True/False for a boolean, a float for a number,
+    # None for anything else (strings, ...), which can not be set from its text
+    flag = _DK_STATIC_BOOLS.get(str(value).strip())
+    if flag is not None:
+        return flag
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def dk_tokenizeKey(line, strings):
+    # Fast replacement for shlex.split on a key line : "    time value inType outType tanLock weightLock breakdown [inAngle inWeight] [outAngle outWeight];"
+    # strings is a dict used to share the decoded tangent type names between keys.
+    # Returns a tuple laid out as KEY_FIELDS, or None if the line is not a valid key line.
+    parts = line.rstrip().rstrip(b";").split()
+    size = len(parts)
+    if size < 7:
+        return None
+    in_type = strings.get(parts[2])
+    if in_type is None:
+        in_type = strings[parts[2]] = parts[2].decode()
+    out_type = strings.get(parts[3])
+    if out_type is None:
+        out_type = strings[parts[3]] = parts[3].decode()
+    in_angle = in_weight = out_angle = out_weight = 0.0
+    # Angles and weights are only written for fixed tangents, in first then out
+    i = 7
+    if in_type == "fixed" and size > i + 1:
+        in_angle = float(parts[i])
+        in_weight = float(parts[i + 1])
+        i += 2
+    if out_type == "fixed" and size > i + 1:
+        out_angle = float(parts[i])
+        out_weight = float(parts[i + 1])
+    return (float(parts[0]), float(parts[1]), in_type, out_type, _DK_BOOLS.get(parts[4], False), _DK_BOOLS.get(parts[5], False), int(parts[6]), in_angle, in_weight, out_angle, out_weight)
+
+
+def dk_timeRange(start=None, end=None, move_to=None):
+    # DkTimeRange of the keys from start to end, moved so that start lands on move_to. None when there is no limit and no move.
+    if start is None and end is None and move_to is None:
+        return None
+    if move_to is not None and start is None:
+        raise ValueError("The keys can only be moved to a new start time when the range has a start time")
+    if start is not None and end is not None and end < start:
+        raise ValueError("The end time {} of the range is before its start time {}".format(end, start))
+    return DkTimeRange(start, end, 0.0 if move_to is None else move_to - start)
+
+
+def dk_findKeyRange(time_at, count, time_range):
+    # Returns (first, last) : the keys first to last - 1 are in time_range. time_at(i) is the time of the key i, keys sorted by time.
+    first = 0
+    last = count
+    if time_range.start is not None:
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if time_at(middle) < time_range.start:
+                low = middle + 1
+            else:
+                high = middle
+        first = low
+    if time_range.end is not None:
+        low, high = first, count
+        while low < high:
+            middle = (low + high) // 2
+            if time_at(middle) <= time_range.end:
+                low = middle + 1
+            else:
+                high = middle
+        last = low
+    return first, last
+
+
+def dk_clipCurve(curve, time_range):
+    # Keeps the keys of curve in time_range, moved by its offset. Returns curve.
+    if time_range is None or not curve.hasKeys():
+        return curve
+    keys = curve.keys
+    first, last = dk_findKeyRange(lambda i: keys[i][KEY_TIME], len(keys), time_range)
+    keys = keys[first:last]
+    if time_range.offset:
+        offset = time_range.offset
+        keys = [(key[KEY_TIME] + offset,) + tuple(key[1:]) for key in keys]
+    curve.keys = keys
+    curve.keyCount = len(keys)
+    return curve
+
+
+def dk_readKeys(stream, strings, time_range=None):
+    # Reads key lines up to the closing "}" of the keys block.
+    # time_range : only the keys of this DkTimeRange are parsed, the lines after its end are skipped.
+    keys = []
+    append = keys.append
+    if time_range is not None:
+        start = float("-inf") if time_range.start is None else time_range.start
+        end = float("inf") if time_range.end is None else time_range.end
+        offset = time_range.offset
+    for line in stream:
+        stripped = line.lstrip()
+        if stripped[:1] == b"}":
+            break
+        if time_range is not None:
+            # Only the time is read before the key is known to be in the range
+            parts = stripped.split(None, 1)
+            if not parts:
+                continue
+            time = float(parts[0])
+            if time < start:
+                continue
+            if time > end:
+                dk_skipKeys(stream)
+                break
+        key = dk_tokenizeKey(stripped, strings)
+        if key is not None:
+            if time_range is not None and offset:
+                key = (key[KEY_TIME] + offset,) + key[1:]
+            append(key)
+    return keys
+
+
+def dk_skipKeys(stream):
+    # Same as dk_readKeys, but only counts the key lines
+    count = 0
+    for line in stream:
+        stripped = line.lstrip()
+        if stripped[:1] == b"}":
+            break
+        if stripped:
+            count += 1
+    return count
+
+
+def dk_readAnimData(stream, curve, keys, strings, time_range=None):
+    # Reads the animData block following an anim line and fills curve with it
+    for line in stream:
+        stripped = line.strip()
+        if stripped[:4] == b"keys":
+            if keys:
+                curve.keys = dk_readKeys(stream, strings, time_range)
+                curve.keyCount = len(curve.keys)
+            else:
+                curve.keyCount = dk_skipKeys(stream)
+            return
+        if stripped[:8] == b"weighted":
+            curve.weighted = stripped[9:10] in (b"T", b"t", b"1")
+        elif stripped[:11] == b"preInfinity":
+            curve.preInfinity = stripped[11:].strip(b" \t;").decode()
+        elif stripped[:12] == b"postInfinity":
+            curve.postInfinity = stripped[12:].strip(b" \t;").decode()
+        elif stripped[:1] == b"}":
+            # animData block without keys
+            return
+
+
+def dk_iterDkAnimStream(stream, keys=True, time_range=None, shared_offsets=None, shared=None):
+    # Generator of DkSceneUnit, DkStatic and DkAnimCurve records read from a binary stream positioned at the start of a .dkanim file.
+    # With keys=False the key lines are only counted, which is enough to list the channels of a file.
+    # time_range : a DkTimeRange, the curves only get the keys of this range
+    # shared_offsets : offsets of the curves referenced by animRef records (see dk_readSharedOffsets), kept in shared, a dictionary
+    # {offset: DkAnimCurve}. A referenced curve that was not kept is read by seeking back to it.
+    strings = {}
+    if shared is None:
+        shared = {}
+    for line in stream:
+        if line[:5] == b"anim ":
+            buffer = line.split()
+            # anim attr attr node parent 0 0;
+            if len(buffer) == 6 or len(buffer) == 7:
+                offset = stream.tell() - len(line)
+                curve = DkAnimCurve(buffer[2].decode(), buffer[3].decode(), int(buffer[4]), offset=offset)
+                dk_readAnimData(stream, curve, keys, strings, time_range)
+                if shared_offsets and offset in shared_offsets:
+                    shared[offset] = curve
+                yield curve
+        elif line[:8] == b"animRef ":
+            buffer = line.split()
+            # animRef attr attr node parent <offset of the referenced curve>;
+            if len(buffer) == 6:
+                offset = stream.tell() - len(line)
+                source = int(buffer[5].rstrip(b";"))
+                template = shared.get(source)
+                if template is None:
+                    position = stream.tell()
+                    stream.seek(source)
+                    for template in dk_iterDkAnimStream(stream, keys, time_range):
+                        break
+                    stream.seek(position)
+                    shared[source] = template
+                curve = DkAnimCurve(buffer[2].decode(), buffer[3].decode(), int(buffer[4]), template.weighted, template.preInfinity, template.postInfinity,
+                                    template.keys if keys else None, template.keyCount, offset)
+                yield curve
+        elif line[:7] == b"static ":
+            buffer = line.split()
+            # static attr attr node parent value
+            if len(buffer) == 6 or len(buffer) == 7:
+                yield DkStatic(buffer[2].decode(), buffer[3].decode(), int(buffer[4]), buffer[5].decode(), stream.tell() - len(line))
+        elif line[:10] == b"sceneUnit ":
+            buffer = line.split()
+            if len(buffer) > 1:
+                yield DkSceneUnit(buffer[1].rstrip(b";").decode(), stream.tell() - len(line))
+
+
+def dk_compression(filename):
+    # Returns the name of the codec filename is compressed with (a key of DK_COMPRESSIONS), or None for a plain file
+    with open(filename, "rb") as stream:
+        head = stream.read(6)
+    for name, (magic, module) in DK_COMPRESSIONS.items():
+        if head.startswith(magic):
+            if module is None:
+                raise IOError("{} is compressed with {}, which this Python can not read".format(filename, name))
+            return name
+    return None
+
+
+class DkCompressedReader(io.BufferedReader):
+    # Decompressing reader of a compressed file. source is the compressed file itself : source.tell() is how much of the
+    # file has been read from the disk. The extra buffer saves the per-line overhead of the codec readers.
+
+    def __init__(self, source, module):
+        io.BufferedReader.__init__(self, module.open(source, "rb"), DK_READ_BUFFER)
+        self.source = source
+
+    def close(self):
+        try:
+            io.BufferedReader.close(self)
+        finally:
+            self.source.close()
+
+
+def dk_openDkAnim(filename):
+    # Opens a .dkanim file for dk_iterDkAnimStream. Compressed files are decompressed as they are read, their offsets
+    # (stream.tell()) are those of the decompressed text.
+    compression = dk_compression(filename)
+    if compression is not None:
+        return DkCompressedReader(open(filename, "rb", buffering=DK_READ_BUFFER), DK_COMPRESSIONS[compression][1])
+    return open(filename, "rb", buffering=DK_READ_BUFFER)
+
+
+def dk_sourcePosition(stream):
+    # Number of bytes of the file on disk read so far by a stream of dk_openDkAnim, to report progress
+    return getattr(stream, "source", stream).tell()
+
+
+def _dk_binaryModule():
+    # dkAnimBinary imports this module, so it is only imported when needed
+    try:
+        from . import dkAnimBinary
+    except ImportError:
+        import dkAnimBinary
+    return dkAnimBinary
+
+
+def dk_isBinaryFile(filename):
+    # True if filename is a binary .dkanim file, written by dkAnimBinary
+    dkAnimBinary = _dk_binaryModule()
+    with open(filename, "rb") as stream:
+        return dkAnimBinary.dk_isBinaryDkAnim(stream.read(len(dkAnimBinary.DK_BINARY_MAGIC)))
+
+
+def dk_iterDkAnim(filename, keys=True, progress=None, time_range=None):
+    # Generator of the records of the .dkanim file filename, see dk_iterDkAnimStream. Binary files are read by dkAnimBinary.
+    # time_range : a DkTimeRange, the curves only get the keys of this range
+    # progress : None, or a function called after each record with the number of bytes of the file read so far and the
+    # size of the file, so that progress is reported without counting the records first.
+    # The record counts of a file read to the end are kept for dk_countRecords.
+    size = os.path.getsize(filename)
+    counts = {"sceneUnit": 0, "static": 0, "anim": 0}
+    if dk_isBinaryFile(filename):
+        for record in _dk_binaryModule().dk_iterBinaryDkAnim(filename, keys):
+            counts[record.kind] += 1
+            if record.kind == "anim":
+                dk_clipCurve(record, time_range)
+            yield record
+            if progress is not None:
+                progress(record.offset, size)
+    else:
+        with dk_openDkAnim(filename) as stream:
+            # Offsets of the referenced curves, read from the index trailer : a compressed file would have to be decompressed to reach it
+            shared_offsets = None
+            if dk_compression(filename) is None:
+                shared_offsets = dk_readSharedOffsets(stream)
+                stream.seek(0)
+            for record in dk_iterDkAnimStream(stream, keys, time_range, shared_offsets):
+                counts[record.kind] += 1
+                yield record
+                if progress is not None:
+                    progress(dk_sourcePosition(stream), size)
+    if progress is not None:
+        progress(size, size)
+    _dk_recordCounts[dk_fileKey(filename)] = (sum(counts.values()), counts["static"] + counts["anim"])
+
+
+class DkIndexEntry(object):
+    # One entry of the index of a file : where a record starts, how long it is, and the channel it holds.
+    # It has the kind, attr, node and parent of the record, so it can be filtered like the record itself.
+    __slots__ = ("offset", "length", "kind", "keyCount", "parent", "attr", "node")
+
+    def __init__(self, offset, length, kind, keyCount, parent, attr, node):
+        self.offset = offset
+        self.length = length
+        self.kind = kind
+        self.keyCount = keyCount
+        self.parent = parent
+        self.attr = attr
+        self.node = node
+
+    def __repr__(self):
+        return "DkIndexEntry({} {}.{} at {})".format(self.kind, self.node, self.attr, self.offset)
+
+
+def dk_formatIndex(entries, shared_offsets=()):
+    # Index trailer written at the end of text files by dkAnimWriter. Every line is a comment for older readers.
+    # The last line gives the offset of the first one, so that readers only read the end of the file to find it.
+    #   #dkIndex 1 records=<count>
+    #   #dkShared <offset> <offset>...    offsets of the curves referenced by animRef records, 1000 per line
+    #   #dkIdx <offset> <length> <kind> <keyCount> <parent> <attr> <node>
+    #   #dkIndexEnd <offset of the #dkIndex line>
+    lines = ["#dkIndex 1 records={}\n".format(len(entries))]
+    shared_offsets = sorted(shared_offsets)
+    for i in range(0, len(shared_offsets), 1000):
+        lines.append("#dkShared {}\n".format(" ".join(str(offset) for offset in shared_offsets[i:i + 1000])))
+    for entry in entries:
+        lines.append("#dkIdx {} {} {} {} {} {} {}\n".format(entry.offset, entry.length, entry.kind, entry.keyCount, entry.parent, entry.attr or "-", entry.node or "-"))
+    return "".join(lines)
+
+
+def dk_seekTextIndex(stream):
+    # Moves stream after the "#dkIndex" line of the index trailer of a text file. Returns False if the file has no index.
+    stream.seek(0, 2)
+    size = stream.tell()
+    stream.seek(max(0, size - 64))
+    tail = stream.read().rstrip()
+    position = tail.rfind(b"#dkIndexEnd ")
+    if position < 0:
+        return False
+    try:
+        index_offset = int(tail[position + 12:].split()[0])
+    except (ValueError, IndexError):
+        return False
+    stream.seek(index_offset)
+    return stream.readline().startswith(b"#dkIndex ")
+
+
+def dk_readSharedOffsets(stream):
+    # Returns the set of the offsets of the curves referenced by animRef records, from the "#dkShared" lines of the index trailer
+    # of a text file (read before the "#dkIdx" lines), or None if the file has no index
+    if not dk_seekTextIndex(stream):
+        return None
+    offsets = set()
+    for line in stream:
+        if not line.startswith(b"#dkShared "):
+            break
+        offsets.update(int(offset) for offset in line.split()[1:])
+    return offsets
+
+
+def dk_readTextIndex(stream):
+    # Returns the DkIndexEntry list of the index trailer of a text file, or None if the file has none (written before the index existed)
+    if not dk_seekTextIndex(stream):
+        return None
+    entries = []
+    for line in stream:
+        if line.startswith(b"#dkShared "):
+            continue
+        if not line.startswith(b"#dkIdx "):
+            break
+        parts = line.split()
+        attr, node = ("" if name == b"-" else name.decode() for name in parts[6:8])
+        entries.append(DkIndexEntry(int(parts[1]), int(parts[2]), parts[3].decode(), int(parts[4]), int(parts[5]), attr, node))
+    return entries
+
+
+def dk_readIndex(filename):
+    # Returns the DkIndexEntry list of filename, without reading the records, or None for a text file without index.
+    # The index of a compressed file is not used : reaching it, or any offset, means decompressing the file up to there.
+    if dk_isBinaryFile(filename):
+        return _dk_binaryModule().dk_openBinaryFile(filename).readIndex()
+    if dk_compression(filename) is not None:
+        return None
+    with dk_openDkAnim(filename) as stream:
+        return dk_readTextIndex(stream)
+
+
+def dk_iterChannels(filename):
+    # Generator of the sceneUnit, static and anim entries of filename, without their keys : DkIndexEntry objects read from
+    # the index when the file has one, else records read by a full scan of the file with keys=False.
+    entries = dk_readIndex(filename)
+    if entries is None:
+        for record in dk_iterDkAnim(filename, keys=False):
+            yield record
+    else:
+        for entry in entries:
+            yield entry
+
+
+def dk_iterDkAnimAt(filename, offsets, keys=True, progress=None, time_range=None):
+    # Generator of the records starting at the given offsets (taken from dk_readIndex) : only those records are read.
+    # progress : see dk_iterDkAnim, it is given the offset of each record read. time_range : see dk_iterDkAnim
+    size = os.path.getsize(filename)
+    if dk_isBinaryFile(filename):
+        binary_file = _dk_binaryModule().dk_openBinaryFile(filename)
+        for offset in offsets:
+            record = binary_file.readRecord(offset, keys)
+            if record.kind == "anim":
+                dk_clipCurve(record, time_range)
+            yield record
+            if progress is not None:
+                progress(offset, size)
+    else:
+        with dk_openDkAnim(filename) as stream:
+            # The referenced curves are kept across the records read
+            shared_offsets = dk_readSharedOffsets(stream) if dk_compression(filename) is None else None
+            shared = {}
+            for offset in offsets:
+                stream.seek(offset)
+                for record in dk_iterDkAnimStream(stream, keys, time_range, shared_offsets, shared):
+                    yield record
+                    break
+                if progress is not None:
+                    progress(offset, size)
+    if progress is not None:
+        progress(size, size)
+
+
+def dk_fileKey(filename):
+    # Identifies a version of a file : its path, size and modification time
+    stat = os.stat(filename)
+    return (os.path.abspath(filename), stat.st_size, stat.st_mtime)
+
+
+def dk_countRecords(filename):
+    # Returns the number of records and the number of static and anim channels of filename, without reading the file :
+    # from its index, or from the counts kept by dk_iterDkAnim when the same version of the file was already read.
+    # Returns None when they are unknown (a file without index, or a compressed file, that was never read).
+    counts = _dk_recordCounts.get(dk_fileKey(filename))
+    if counts is None:
+        entries = dk_readIndex(filename)
+        if entries is not None:
+            counts = (len(entries), len([entry for entry in entries if entry.kind != "sceneUnit"]))
+            _dk_recordCounts[dk_fileKey(filename)] = counts
+    return counts
@@ -0,0 +1,225 @@
+##############################################################################################################
+#NAME: dkAnimPrefetch
+#AUTHOR: David Saber, www.dreamcraftdigital.com, based on Dan Erwin and Daniel Kramer's code.
+#SCRIPTING LANGUAGE: Python (no Maya import)
+#USAGE: Background parsing of the file to import of dkAnimEhEh. As soon as its path is set (Browse or typing),
+#       DkPrefetcher.request() parses the file on a worker thread, while Maya stays responsive. dk_loadChannels,
+#       dre_fileLineCount and dk_animRead then pick the parsed file up with DkPrefetcher.get() instead of reading it
+#       again : only the edits of the Maya scene run on the main thread. Nothing of Maya is called by the worker.
+#       A DkParsedFile holds all the records of one version of a file (dkAnimParser.dk_fileKey), with their keys.
+#       It is only used for that version : a file saved again after the request is read again.
+#       Files whose records would not fit in the cache are not prefetched, they are read while importing : the memory of
+#       the records is estimated from the size of the file (dk_estimateFileBytes), and a parse that still goes over the
+#       budget of the cache is dropped.
+#       The parsed files are kept in a cache shared by the whole Maya session, DKANIM_CACHE : importing the same clip onto
+#       several characters, or refreshing the channels list, parses it once. The cache holds at most
+#       DKANIM_CACHE_MAX_BYTES of records (estimated, see DkParsedFile.memoryBytes), the least recently used files are
+#       dropped first. dk_cacheRecords fills it from a read that streams the records of a file.
+##############################################################################################################
+
+
+# Imports
+import collections
+import concurrent.futures
+import os
+import threading
+try:
+    from . import dkAnimParser
+except ImportError:
+    import dkAnimParser
+
+# Memory budget of DKANIM_CACHE, in bytes
+DKANIM_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Estimated memory of a parsed record and of a parsed key, in bytes (Python 3, 64 bits)
+DK_RECORD_BYTES = 500
+DK_KEY_BYTES = 240
+# Estimated memory of the parsed records per byte of a plain text file, of a binary file and of a compressed file
+DK_PARSED_BYTES_RATIO = 6
+DK_BINARY_BYTES_RATIO = 11
+DK_COMPRESSED_BYTES_RATIO = 30
+
+
+class DkParsedFile(object):
+    # All the records of one version of a .dkanim file, see header. key is the dkAnimParser.dk_fileKey of that version.
+
+    def __init__(self, filename, key, records):
+        self.filename = filename
+        self.key = key
+        self.records = records
+        self.recordCount = len(records)
+        self.channelCount = sum(1 for record in records if record.kind != "sceneUnit")
+        self.memoryBytes = dk_estimateBytes(records)
+
+    def iterRecords(self, progress=None, time_range=None):
+        # Generator of the records, as dkAnimParser.dk_iterDkAnim gives them. The curves are copied before time_range
+        # clips them, the records of the file are never changed. progress is given the offset of each record.
+        size = self.key[1]
+        for record in self.records:
+            if record.kind == "anim" and time_range is not None:
+                record = dkAnimParser.dk_clipCurve(dkAnimParser.DkAnimCurve(record.attr, record.node, record.parent, record.weighted, record.preInfinity,
+                                                                            record.postInfinity, record.keys, offset=record.offset), time_range)
+            yield record
+            if progress is not None:
+                progress(record.offset, size)
+
+
+def dk_estimateBytes(records):
+    # Estimated memory of records, see DK_RECORD_BYTES
+    return sum(DK_RECORD_BYTES + (DK_KEY_BYTES * record.keyCount if record.kind == "anim" else 0) for record in records)
+
+
+def dk_estimateFileBytes(filename, size=None):
+    # Estimated memory of the records of filename once parsed, from its size (size, read from the file when None)
+    if size is None:
+        size = os.path.getsize(filename)
+    if dkAnimParser.dk_compression(filename) is not None:
+        return size * DK_COMPRESSED_BYTES_RATIO
+    return size * (DK_BINARY_BYTES_RATIO if dkAnimParser.dk_isBinaryFile(filename) else DK_PARSED_BYTES_RATIO)
+
+
+class DkParsedFileCache(object):
+    # DkParsedFile objects by dkAnimParser.dk_fileKey, least recently used first, see header. Shared by threads.
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = DKANIM_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.memoryBytes = 0
+        self._files = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, filename):
+        # DkParsedFile of the current version of filename, or None
+        try:
+            key = dkAnimParser.dk_fileKey(filename)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            parsed = self._files.get(key)
+            if parsed is not None:
+                self._files.move_to_end(key)
+            return parsed
+
+    def put(self, parsed):
+        # Keeps parsed, dropping the least recently used files over the budget. Returns False when parsed alone is over it.
+        if parsed.memoryBytes > self.max_bytes:
+            return False
+        with self._lock:
+            previous = self._files.pop(parsed.key, None)
+            if previous is not None:
+                self.memoryBytes -= previous.memoryBytes
+            # Older versions of the same file are never used again
+            for key in [key for key in self._files if key[0] == parsed.key[0]]:
+                self.memoryBytes -= self._files.pop(key).memoryBytes
+            while self._files and self.memoryBytes + parsed.memoryBytes > self.max_bytes:
+                self.memoryBytes -= self._files.popitem(last=False)[1].memoryBytes
+            self._files[parsed.key] = parsed
+            self.memoryBytes += parsed.memoryBytes
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._files.clear()
+            self.memoryBytes = 0
+
+
+# Cache of the Maya session, see header
+DKANIM_CACHE = DkParsedFileCache()
+
+
+def dk_cacheRecords(filename, records, cache=None):
+    # Yields the records of filename read by records, a generator of all its records (dkAnimParser.dk_iterDkAnim without
+    # time range), and puts them in cache (DKANIM_CACHE by default) once all of them were read. Nothing is cached when the
+    # read stops before the end, or when the records go over the budget of the cache.
+    cache = cache or DKANIM_CACHE
+    key = dkAnimParser.dk_fileKey(filename)
+    collected = []
+    memory = 0
+    for record in records:
+        if collected is not None:
+            collected.append(record)
+            memory += DK_RECORD_BYTES + (DK_KEY_BYTES * record.keyCount if record.kind == "anim" else 0)
+            if memory > cache.max_bytes:
+                collected = None
+        yield record
+    if collected is not None:
+        cache.put(DkParsedFile(filename, key, collected))
+
+
+def dk_parseFile(filename):
+    # Reads all the records of filename into a DkParsedFile
+    key = dkAnimParser.dk_fileKey(filename)
+    return DkParsedFile(filename, key, list(dkAnimParser.dk_iterDkAnim(filename)))
+
+
+class DkPrefetcher(object):
+    # Parses the last file requested on a worker thread, and puts it in cache (DKANIM_CACHE by default), see header.
+    # max_bytes : largest estimated memory of the records of a file prefetched (dk_estimateFileBytes), the budget of the cache when None
+
+    def __init__(self, max_bytes=None, cache=None):
+        self.max_bytes = max_bytes
+        self.cache = cache or DKANIM_CACHE
+        self._lock = threading.Lock()
+        self._key = None
+        self._future = None
+
+    def request(self, filename):
+        # Starts parsing filename in the background, unless it is already parsed or being parsed.
+        # Returns False when the file is not prefetched (missing, or its records would not fit in the cache).
+        try:
+            key = dkAnimParser.dk_fileKey(filename)
+        except (OSError, ValueError):
+            return False
+        max_bytes = self.cache.max_bytes if self.max_bytes is None else min(self.max_bytes, self.cache.max_bytes)
+        if not os.path.isfile(filename) or dk_estimateFileBytes(filename, key[1]) > max_bytes:
+            return False
+        if self.cache.get(filename) is not None:
+            return True
+        with self._lock:
+            if key == self._key:
+                return True
+            if self._future is not None:
+                # Not needed anymore, when it did not start yet
+                self._future.cancel()
+            self._key = key
+            self._future = future = concurrent.futures.Future()
+        # A daemon thread : quitting Maya does not wait for the parsing to end
+        thread = threading.Thread(target=self._parse, args=(filename, future), name="dkAnimPrefetch")
+        thread.daemon = True
+        thread.start()
+        return True
+
+    def _parse(self, filename, future):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            parsed = dk_parseFile(filename)
+        except Exception as e:
+            future.set_exception(e)
+            return
+        # Over the budget of the cache : the records are not kept by the future either, the import reads the file itself
+        if not self.cache.put(parsed):
+            parsed = None
+        future.set_result(parsed)
+
+    def get(self, filename, wait=True):
+        # Returns the DkParsedFile of the current version of filename when it is in the cache, or when it was requested,
+        # waiting for the worker when wait is True, else None (and the caller reads the file itself). A parse error is
+        # raised again by that read.
+        parsed = self.cache.get(filename)
+        if parsed is not None:
+            return parsed
+        try:
+            key = dkAnimParser.dk_fileKey(filename)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            if key != self._key:
+                return None
+            future = self._future
+        if not wait and not future.done():
+            return None
+        try:
+            parsed = future.result()
+        except Exception:
+            return None
+        # The file may have been saved again while it was parsed
+        return parsed if parsed is not None and parsed.key == key else None
@@ -0,0 +1,187 @@
+##############################################################################################################
+#NAME: dkAnimProfile
+#AUTHOR: David Saber, www.dreamcraftdigital.com, based on Dan Erwin and Daniel Kramer's code.
+#SCRIPTING LANGUAGE: Python (no Maya import)
+#USAGE: Instrumentation of dkAnimEhEh.dk_animRead, dk_animWrite and dk_loadChannels. Each run has a DkProfiler :
+#           profiler.phase(name)        context manager adding its wall time and one call to the phase name
+#           profiler.iterate(name, it)  iterator whose next() calls are timed in the phase name (file reading and parsing)
+#           profiler.count(name, n)     counts curves, keys, statics... processed
+#           profiler.instrument(mods)   times every maya.cmds command called by the modules mods, until profiler.restore()
+#                                       or profiler.end()
+#       The total time and the counts are always kept, they make the console summary printed at the end of a run.
+#       Phases and commands are only timed when the profiler is enabled (dkAnimEhEh.DKANIM_PROFILE), the report of
+#       the run is then also written as JSON (see dk_writeReport), in DKANIM_PROFILE_DIR :
+#           {"run": "dk_animRead", "file": ..., "seconds": total, "counts": {...},
+#            "phases": {name: {"seconds": s, "calls": n}}, "commands": {command: {"seconds": s, "calls": n}}}
+#       Time spent in a command is also counted in the phase calling it.
+##############################################################################################################
+
+
+# Imports
+import collections
+import datetime
+import json
+import os
+import tempfile
+import time
+
+# Folder of the JSON reports, the temporary folder when None
+DKANIM_PROFILE_DIR = None
+
+
+class DkPhase(object):
+    # Context manager of one phase : adds the time spent in the with block to the phase
+    __slots__ = ("timing", "clock", "start")
+
+    def __init__(self, timing, clock):
+        self.timing = timing
+        self.clock = clock
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = self.clock()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.timing[0] += self.clock() - self.start
+        self.timing[1] += 1
+        return False
+
+
+class DkNullPhase(object):
+    # Phase of a disabled profiler, times nothing
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+
+_dk_nullPhase = DkNullPhase()
+
+
+class DkCmdsProxy(object):
+    # Stand-in for maya.cmds timing each command, see DkProfiler.instrument
+
+    def __init__(self, cmds, commands, clock):
+        self._cmds = cmds
+        self._commands = commands
+        self._clock = clock
+
+    def __getattr__(self, name):
+        command = getattr(self._cmds, name)
+        if not callable(command):
+            return command
+        timing = self._commands[name]
+        clock = self._clock
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return command(*args, **kwargs)
+            finally:
+                timing[0] += clock() - start
+                timing[1] += 1
+        return timed
+
+
+class DkProfiler(object):
+    # Timings and counts of one run, see header. name is the function profiled, filename the .dkanim file.
+
+    def __init__(self, name, filename="", enabled=False, clock=time.perf_counter):
+        self.name = name
+        self.filename = filename
+        self.enabled = enabled
+        self.clock = clock
+        self.counts = collections.OrderedDict()
+        self.phases = collections.OrderedDict()
+        self.commands = collections.defaultdict(lambda: [0.0, 0])
+        self.start = clock()
+        self.seconds = None
+        self._saved = []
+
+    def phase(self, name):
+        if not self.enabled:
+            return _dk_nullPhase
+        timing = self.phases.get(name)
+        if timing is None:
+            timing = self.phases[name] = [0.0, 0]
+        return DkPhase(timing, self.clock)
+
+    def iterate(self, name, iterable):
+        # Yields the items of iterable, the time spent producing them is added to the phase name
+        if not self.enabled:
+            for item in iterable:
+                yield item
+            return
+        iterator = iter(iterable)
+        phase = self.phase(name)
+        while True:
+            with phase:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def instrument(self, modules):
+        # Replaces the cmds of each module of modules by a DkCmdsProxy, when the profiler is enabled
+        if not self.enabled:
+            return
+        for module in modules:
+            cmds = getattr(module, "cmds", None)
+            if cmds is None:
+                continue
+            # A run inside a profiled run times the real commands, and gives the outer proxy back on restore
+            self._saved.append((module, cmds))
+            while isinstance(cmds, DkCmdsProxy):
+                cmds = cmds._cmds
+            module.cmds = DkCmdsProxy(cmds, self.commands, self.clock)
+
+    def restore(self):
+        # Gives the modules of instrument their maya.cmds back
+        while self._saved:
+            module, cmds = self._saved.pop()
+            module.cmds = cmds
+
+    def end(self):
+        # Stops the clock of the run and restores maya.cmds, returns the total time
+        self.restore()
+        self.seconds = self.clock() - self.start
+        return self.seconds
+
+    def report(self):
+        # JSON serializable report of the run, see header
+        seconds = self.seconds if self.seconds is not None else self.clock() - self.start
+        report = {"run": self.name, "file": self.filename, "seconds": seconds, "counts": dict(self.counts)}
+        if self.enabled:
+            report["phases"] = dict((name, {"seconds": timing[0], "calls": timing[1]}) for name, timing in self.phases.items())
+            report["commands"] = dict((name, {"seconds": timing[0], "calls": timing[1]}) for name, timing in self.commands.items() if timing[1])
+        return report
+
+    def summary(self):
+        # Lines of the console summary : total time and counts, then the phases and the slowest commands when enabled
+        seconds = self.seconds if self.seconds is not None else self.clock() - self.start
+        counts = ", ".join("{} {}".format(n, name) for name, n in self.counts.items())
+        lines = ["{} finished in {:.2f} s{}".format(self.name, seconds, " : " + counts if counts else "")]
+        if self.enabled:
+            if self.phases:
+                lines.append("  phases : " + ", ".join("{} {:.2f} s".format(name, timing[0]) for name, timing in
+                                                       sorted(self.phases.items(), key=lambda item: -item[1][0])))
+            commands = sorted(((timing[0], timing[1], name) for name, timing in self.commands.items() if timing[1]), reverse=True)
+            if commands:
+                lines.append("  commands : " + ", ".join("{} {} calls {:.2f} s".format(name, calls, seconds) for seconds, calls, name in commands[:8]))
+        return lines
+
+
+def dk_writeReport(profiler, directory=None):
+    # Writes the report of profiler to a new JSON file of directory (DKANIM_PROFILE_DIR by default) and returns its name
+    directory = directory or DKANIM_PROFILE_DIR or tempfile.gettempdir()
+    filename = os.path.join(directory, "{}_{}_{}.json".format(profiler.name, datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f"), os.getpid()))
+    with open(filename, "w") as stream:
+        json.dump(profiler.report(), stream, indent=2)
+    return filename
@@ -0,0 +1,123 @@
+##############################################################################################################
+#NAME: dkAnimProgress
+#AUTHOR: David Saber, www.dreamcraftdigital.com, based on Dan Erwin and Daniel Kramer's code.
+#SCRIPTING LANGUAGE: Python (no Maya import)
+#USAGE: Progress and cancel reporters of the read and write loops of dkAnimEhEh. The loops call :
+#           reporter.begin(title, total)   total units of work (objects to write, bytes of the file to read)
+#           reporter.update(done)          after each unit, cheap : the reporter decides when to show it
+#           reporter.cancelled()           after each unit, cheap too
+#           reporter.end()
+#       DkProgressReporter does nothing (batch runs), DkLoggingReporter logs, dkAnimEhEh.DkMayaProgressReporter
+#       edits the progress bars of Maya. The last two show progress and check cancellation at most rate times per
+#       second, or when every units of work were done since the last time.
+##############################################################################################################
+
+
+# Imports
+import logging
+import time
+
+# Steps of the progress bars : the bars go from 0 to DK_PROGRESS_STEPS, whatever the total of the work
+DK_PROGRESS_STEPS = 1000
+
+
+class DkProgressReporter(object):
+    # Reporter that shows nothing and is never cancelled
+
+    def begin(self, title, total):
+        pass
+
+    def update(self, done, total=None):
+        # done units of the total of begin are done. total replaces that total when given.
+        pass
+
+    def cancelled(self):
+        return False
+
+    def end(self):
+        pass
+
+
+class DkRateLimitedReporter(DkProgressReporter):
+    # Base of the reporters that show something : update and cancelled only call show and queryCancelled when
+    # 1 / rate seconds went by since the last call, or every units of work were done (when every is not None)
+
+    def __init__(self, rate=10.0, every=None, cancel_rate=4.0, clock=time.perf_counter):
+        self.interval = 1.0 / rate
+        self.every = every
+        self.cancel_interval = 1.0 / cancel_rate
+        self.clock = clock
+        self.title = ""
+        self.total = 0
+        self.done = 0
+        self._shown_done = None
+        self._shown_time = 0.0
+        self._cancel_time = 0.0
+        self._cancelled = False
+
+    def begin(self, title, total):
+        self.title = title
+        self.total = total
+        self.done = 0
+        self._cancel_time = self.clock()
+        self._cancelled = False
+        self._show(0, self._cancel_time)
+
+    def update(self, done, total=None):
+        if total is not None:
+            self.total = total
+        self.done = done
+        if self._shown_done is not None and self.every is not None and done - self._shown_done >= self.every:
+            self._show(done)
+            return
+        now = self.clock()
+        if now - self._shown_time >= self.interval:
+            self._show(done, now)
+
+    def cancelled(self):
+        if not self._cancelled:
+            now = self.clock()
+            if now - self._cancel_time >= self.cancel_interval:
+                self._cancel_time = now
+                self._cancelled = bool(self.queryCancelled())
+        return self._cancelled
+
+    def end(self):
+        if self._shown_done != self.done:
+            self.show(self.done)
+
+    def step(self, done):
+        # Position of done in the DK_PROGRESS_STEPS steps of the bars
+        return min(DK_PROGRESS_STEPS, done * DK_PROGRESS_STEPS // max(self.total, 1))
+
+    def _show(self, done, now=None):
+        self._shown_done = done
+        self._shown_time = self.clock() if now is None else now
+        self.show(done)
+
+    def show(self, done):
+        # Shows that done units of self.total are done
+        pass
+
+    def queryCancelled(self):
+        return False
+
+
+class DkLoggingReporter(DkRateLimitedReporter):
+    # Logs the progress, by default every 5 seconds, to the "dkAnim" logger
+
+    def __init__(self, rate=0.2, every=None, logger=None, clock=time.perf_counter):
+        DkRateLimitedReporter.__init__(self, rate, every, clock=clock)
+        self.logger = logger or logging.getLogger("dkAnim")
+        self._begin_time = 0.0
+
+    def begin(self, title, total):
+        self._begin_time = self.clock()
+        DkRateLimitedReporter.begin(self, title, total)
+
+    def show(self, done):
+        self.logger.info("%s : %.1f%% (%d / %d)", self.title, self.step(done) * 100.0 / DK_PROGRESS_STEPS, done, self.total)
+
+    def end(self):
+        DkRateLimitedReporter.end(self)
+        self.logger.info("%s : done in %.2f s", self.title, self.clock() - self._begin_time)
@@ -0,0 +1,159 @@
+##############################################################################################################
+#NAME: dkAnimReduce
+#AUTHOR: David Saber, www.dreamcraftdigital.com, based on Dan Erwin and Daniel Kramer's code.
+#SCRIPTING LANGUAGE: Python (no Maya import)
+#USAGE: Key reduction of the curves written by dkAnimEhEh.dk_animWrite : dk_reduceCurve() removes the keys that the
+#       curve rebuilds within a tolerance without them, using the curve's own tangents. Baked curves (one key per
+#       frame) often shrink to a fraction of their keys, and the import time shrinks with them.
+#       - The tolerance depends on the attribute type, see DK_REDUCE_TOLERANCES and dk_attributeType. Values are in
+#         the UI units of the file (cm, degrees...).
+#       - A segment between two kept keys is evaluated as Maya does for non weighted curves : a Hermite cubic using
+#         the out tangent of the first key and the in tangent of the second (angles are per second of time, fps
+#         converts them to per frame), constant for step tangents.
+#       - The curve is checked at every removed key and in the middle of every original segment.
+#       - The tangents of the kept keys next to a removed key become "fixed", with their original angles : spline,
+#         linear, clamped... tangents would otherwise be recomputed by Maya from the new neighbour keys.
+#       - The first and last keys are always kept (infinity), weighted curves are left as they are.
+##############################################################################################################
+
+
+# Imports
+import math
+try:
+    from . import dkAnimParser
+except ImportError:
+    import dkAnimParser
+
+# Tolerance per attribute type, in the UI units of the values
+DK_REDUCE_TOLERANCES = {"translate": 0.01, "rotate": 0.05, "scale": 0.001, "custom": 0.001}
+# Longest run of keys a segment may replace : bounds the cost of the checks, a run is checked again each time it grows
+DK_REDUCE_MAX_SPAN = 64
+# Attribute names of each type, other than the names starting with the type
+DK_ATTRIBUTE_TYPES = {"tx": "translate", "ty": "translate", "tz": "translate", "t": "translate",
+                      "rx": "rotate", "ry": "rotate", "rz": "rotate", "r": "rotate",
+                      "sx": "scale", "sy": "scale", "sz": "scale", "s": "scale"}
+# Tangent types that do not depend on the neighbour keys, kept as they are
+DK_STABLE_TANGENTS = ("fixed", "flat", "step", "stepnext")
+# Frames per second of the time units of cmds.currentUnit, other than the "<n>fps" units
+DK_TIME_UNIT_FPS = {"game": 15.0, "film": 24.0, "pal": 25.0, "ntsc": 30.0, "show": 48.0, "palf": 50.0, "ntscf": 60.0}
+
+
+def dk_attributeType(attr):
+    # "translate", "rotate", "scale" or "custom"
+    attr_type = DK_ATTRIBUTE_TYPES.get(attr)
+    if attr_type is not None:
+        return attr_type
+    for name in ("translate", "rotate", "scale"):
+        if attr.startswith(name):
+            return name
+    return "custom"
+
+
+def dk_isWeighted(curve):
+    # weighted is a bool when the curve comes from Maya, a string when it comes from a file
+    return str(curve.weighted).lower() in ("true", "1")
+
+
+def dk_evaluateSegment(key0, key1, time, fps, degrees=True):
+    # Value at time of the segment from key0 to key1, laid out as dkAnimParser.KEY_FIELDS
+    t0 = key0[dkAnimParser.KEY_TIME]
+    t1 = key1[dkAnimParser.KEY_TIME]
+    v0 = float(key0[dkAnimParser.KEY_VALUE])
+    v1 = float(key1[dkAnimParser.KEY_VALUE])
+    out_type = key0[dkAnimParser.KEY_OUTTYPE]
+    if out_type == "step":
+        return v0
+    if out_type == "stepnext":
+        return v1
+    length = float(t1 - t0)
+    if length <= 0.0:
+        return v0
+    out_angle = float(key0[dkAnimParser.KEY_OUTANGLE])
+    in_angle = float(key1[dkAnimParser.KEY_INANGLE])
+    if degrees:
+        out_angle = math.radians(out_angle)
+        in_angle = math.radians(in_angle)
+    # Tangents in value per frame, times the length of the segment
+    m0 = math.tan(out_angle) / fps * length
+    m1 = math.tan(in_angle) / fps * length
+    u = (time - t0) / length
+    u2 = u * u
+    u3 = u2 * u
+    return (2 * u3 - 3 * u2 + 1) * v0 + (u3 - 2 * u2 + u) * m0 + (-2 * u3 + 3 * u2) * v1 + (u3 - u2) * m1
+
+
+def dk_reduceKeys(keys, tolerance, fps=24.0, degrees=True, max_span=None):
+    # Returns the list of the indices of keys to keep, see header
+    max_span = max_span or DK_REDUCE_MAX_SPAN
+    count = len(keys)
+    if count <= 2:
+        return list(range(count))
+    # Points the reduced curve must go through : each key, and the middle of each original segment
+    times = []
+    values = []
+    for i in range(count - 1):
+        t0 = keys[i][dkAnimParser.KEY_TIME]
+        middle = (t0 + keys[i + 1][dkAnimParser.KEY_TIME]) * 0.5
+        times.append(middle)
+        values.append(dk_evaluateSegment(keys[i], keys[i + 1], middle, fps, degrees))
+    kept = [0]
+    start = 0
+    end = 2
+    while end < count:
+        # Can keys[start] to keys[end] replace the keys in between ?
+        fits = end - start <= max_span
+        if fits:
+            key0 = keys[start]
+            key1 = keys[end]
+            for i in range(start, end):
+                if i > start and abs(dk_evaluateSegment(key0, key1, keys[i][dkAnimParser.KEY_TIME], fps, degrees) - float(keys[i][dkAnimParser.KEY_VALUE])) > tolerance:
+                    fits = False
+                    break
+                if abs(dk_evaluateSegment(key0, key1, times[i], fps, degrees) - values[i]) > tolerance:
+                    fits = False
+                    break
+        if fits:
+            end += 1
+        else:
+            start = end - 1
+            kept.append(start)
+            end = start + 2
+    kept.append(count - 1)
+    return kept
+
+
+def dk_reduceCurve(curve, tolerances=None, fps=24.0, degrees=True, max_span=None):
+    # Returns (reduced DkAnimCurve, number of keys dropped). curve is returned as it is when no key can be dropped.
+    # tolerances : {attribute type: tolerance}, DK_REDUCE_TOLERANCES by default, see dk_attributeType
+    keys = curve.keys
+    if not keys or len(keys) <= 2 or dk_isWeighted(curve):
+        return curve, 0
+    tolerances = tolerances or DK_REDUCE_TOLERANCES
+    tolerance = tolerances.get(dk_attributeType(curve.attr), DK_REDUCE_TOLERANCES["custom"])
+    kept = dk_reduceKeys(keys, tolerance, fps, degrees, max_span)
+    if len(kept) == len(keys):
+        return curve, 0
+    reduced = []
+    previous = -1
+    for position, i in enumerate(kept):
+        key = list(keys[i])
+        following = kept[position + 1] if position + 1 < len(kept) else len(keys)
+        # A neighbour key was removed : the tangents are fixed to their original angles
+        if i - previous > 1 or following - i > 1:
+            if key[dkAnimParser.KEY_INTYPE] not in DK_STABLE_TANGENTS:
+                key[dkAnimParser.KEY_INTYPE] = "fixed"
+            if key[dkAnimParser.KEY_OUTTYPE] not in DK_STABLE_TANGENTS:
+                key[dkAnimParser.KEY_OUTTYPE] = "fixed"
+        reduced.append(tuple(key))
+        previous = i
+    return (dkAnimParser.DkAnimCurve(curve.attr, curve.node, curve.parent, curve.weighted, curve.preInfinity, curve.postInfinity, reduced),
+            len(keys) - len(reduced))
+
+
+def dk_timeUnitFps(unit):
+    # Frames per second of a Maya time unit name, such as "film" or "120fps"
+    if unit in DK_TIME_UNIT_FPS:
+        return DK_TIME_UNIT_FPS[unit]
+    if unit.endswith("fps"):
+        return float(unit[:-3])
+    raise ValueError("Unknown time unit {!r}".format(unit))
@@ -0,0 +1,96 @@
+##############################################################################################################
+#NAME: dkAnimRemap
+#AUTHOR: David Saber, www.dreamcraftdigital.com, based on Dan Erwin and Daniel Kramer's code.
+#SCRIPTING LANGUAGE: Python (no Maya import)
+#USAGE: Renaming of the nodes of a .dkanim file into the nodes of the scene, used by dkAnimEhEh.dk_filter_nodes.
+#       A DkRemapper is compiled once per import from the read options, then remap() computes the target of each
+#       node once : a rig with thousands of channels on a few hundred nodes only renames a few hundred paths.
+#       The rules are applied in this order :
+#       1. mapping table : a node (or node.attr channel) listed in the table is renamed to its target, and no other
+#          rule but "explicit node paths off" applies to it
+#       2. literal search and replace, then the regular expression rules, in their order
+#       3. prefix, added to every node of the path, or to the top node only for nodes having a parent
+#       4. explicit node paths off : only the last node of the path is kept
+#       Mapping table files have one "source target" pair per line, separated by spaces, a tab or a comma,
+#       lines starting with # are comments. Sources and targets are node paths, or node.attr channels.
+##############################################################################################################
+
+
+# Imports
+import re
+
+
+def dk_loadMappingTable(filename):
+    # Returns the {source: target} dictionary of a mapping table file, see header
+    table = {}
+    with open(filename, "r") as stream:
+        for number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.replace(",", " ").split()
+            if len(parts) != 2:
+                raise ValueError("{} line {} : expected 'source target', got {!r}".format(filename, number, line))
+            table[parts[0]] = parts[1]
+    return table
+
+
+class DkRemapper(object):
+    # Compiled renaming rules, see header. regex_rules is a sequence of (pattern, replacement) pairs for re.sub,
+    # mapping a {source: target} dictionary (see dk_loadMappingTable).
+
+    def __init__(self, search="", replace="", regex_rules=(), prefix="", topNodes=False, paths=True, mapping=None):
+        self.search = search
+        self.replace = replace
+        self.regex_rules = [(re.compile(pattern), replacement) for pattern, replacement in regex_rules]
+        self.prefix = prefix
+        self.topNodes = topNodes
+        self.paths = paths
+        mapping = mapping or {}
+        # node.attr entries are looked up per channel, node entries per node
+        self.channel_mapping = dict((source, target) for source, target in mapping.items() if "." in source)
+        self.node_mapping = dict((source, target) for source, target in mapping.items() if "." not in source)
+        self._nodes = {}
+
+    def remap(self, node, attr, parent):
+        # Returns the target node and attribute of the channel node.attr of the file. parent is the parent flag of the file.
+        if self.channel_mapping:
+            target = self.channel_mapping.get(node + "." + attr)
+            if target is not None:
+                node, _, attr = target.rpartition(".")
+                return (node if self.paths else node.split("|")[-1]), attr
+        key = (node, parent)
+        target = self._nodes.get(key)
+        if target is None:
+            target = self._nodes[key] = self.remapNode(node, parent)
+        return target, attr
+
+    def remapNode(self, node, parent):
+        # Target of node, without memoization
+        target = self.node_mapping.get(node)
+        if target is not None:
+            node = target
+        else:
+            if self.search:
+                node = node.replace(self.search, self.replace)
+            for pattern, replacement in self.regex_rules:
+                node = pattern.sub(replacement, node)
+            if self.prefix:
+                node = self.prefixNode(node, parent)
+        # Load explicit node path: if this checkbox is unchecked :
+        if not self.paths:
+            node = node.split("|")[-1]
+        return node
+
+    def prefixNode(self, node, parent):
+        prefix = self.prefix
+        #parent is the parental status: 0 means no parent and 1 means "has a parent", so next line means : if topNodes is off, or if it is on but object has no parent
+        if not self.topNodes or not parent:
+            if "|" in node:
+                return "".join("|" + prefix + item for item in node.split("|") if item != "")
+            return prefix + node
+        # Add to top nodes only
+        if "|" in node:
+            items = node.split("|")
+            return "|" + prefix + items[0] + "".join("|" + item for item in items[1:])
+        return node
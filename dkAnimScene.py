@@ -0,0 +1,166 @@
+##############################################################################################################
+#NAME: dkAnimScene
+#AUTHOR: David Saber, www.dreamcraftdigital.com, based on Dan Erwin and Daniel Kramer's code.
+#SCRIPTING LANGUAGE: Maya Python
+#USAGE: Scene side of the import planning of dkAnimEhEh.dk_animRead : before a group of records is applied, the
+#       target channels of the group are resolved in one batch, and the answers are kept for the whole import.
+#       DkSceneResolver.resolve() finds if each node and attribute exists, and if the attribute is locked or has an
+#       incoming connection :
+#       - "api"  : OpenMaya MSelectionList and MPlug, no command at all
+#       - "cmds" : 4 queries per node (objExists, listAttr, listAttr -locked, listConnections), none per channel,
+#                  except for attribute names listAttr does not return (short names, array elements)
+#       "auto" uses "api" when OpenMaya is available, "cmds" otherwise.
+#       DkFastImport is the fast import mode of dk_animRead : the import is one undo chunk, with the viewport refresh
+#       suspended, autokey off and the evaluation manager off (the DG only evaluates what is pulled, and nothing is
+#       pulled until the refresh is back), so the curves are evaluated once, at the end.
+##############################################################################################################
+
+
+# Imports
+import maya.cmds as cmds
+# The OpenMaya path is optional, DkSceneResolver falls back to cmds without it
+try:
+    import maya.api.OpenMaya as om
+except ImportError:
+    om = None
+
+# Global variables
+DKANIM_RESOLVE_ENGINE = "auto" # "auto", "api" or "cmds", see header
+# States of a target channel
+DK_CHANNEL_OK = "ok"
+DK_CHANNEL_LOCKED = "locked"
+DK_CHANNEL_CONNECTED = "connected"
+DK_MISSING_NODE = "missingNode"
+DK_AMBIGUOUS_NODE = "ambiguousNode" # more than one node matches the name
+DK_MISSING_ATTRIBUTE = "missingAttribute"
+
+
+class DkSceneResolver(object):
+    # States of the target channels of an import, see header. Each node and channel is resolved once.
+
+    def __init__(self, engine=None):
+        engine = engine or DKANIM_RESOLVE_ENGINE
+        self.engine = "api" if engine in ("auto", "api") and om is not None else "cmds"
+        self.nodes = {}
+        self.channels = {}
+
+    def resolve(self, channels):
+        # Resolves the (node, attr) channels that were not resolved yet
+        channels = [channel for channel in set(channels) if channel not in self.channels]
+        if not channels:
+            return
+        if self.engine == "api":
+            self._resolveAPI(channels)
+        else:
+            self._resolveCmds(channels)
+
+    def state(self, node, attr):
+        # State of a channel given to resolve
+        return self.channels[(node, attr)]
+
+    def _resolveAPI(self, channels):
+        for node, attr in channels:
+            node_state = self.nodes.get(node)
+            if node_state is None:
+                selection = om.MSelectionList()
+                try:
+                    selection.add(node)
+                    node_state = DK_AMBIGUOUS_NODE if selection.length() > 1 else DK_CHANNEL_OK
+                except RuntimeError:
+                    node_state = DK_MISSING_NODE
+                self.nodes[node] = node_state
+            if node_state != DK_CHANNEL_OK:
+                self.channels[(node, attr)] = node_state
+                continue
+            selection = om.MSelectionList()
+            try:
+                selection.add(node + "." + attr)
+                plug = selection.getPlug(0)
+            except RuntimeError:
+                self.channels[(node, attr)] = DK_MISSING_ATTRIBUTE
+                continue
+            if plug.isLocked:
+                self.channels[(node, attr)] = DK_CHANNEL_LOCKED
+            elif plug.isDestination:
+                self.channels[(node, attr)] = DK_CHANNEL_CONNECTED
+            else:
+                self.channels[(node, attr)] = DK_CHANNEL_OK
+
+    def _resolveCmds(self, channels):
+        for node in set(node for node, attr in channels):
+            if node not in self.nodes:
+                self.nodes[node] = self._queryNodeCmds(node)
+        for node, attr in channels:
+            node_info = self.nodes[node]
+            if not isinstance(node_info, tuple):
+                self.channels[(node, attr)] = node_info
+                continue
+            attributes, locked, connected = node_info
+            plug = node + "." + attr
+            if attr in attributes:
+                is_locked = attr in locked
+            elif cmds.objExists(plug):
+                is_locked = cmds.getAttr(plug, lock=True)
+            else:
+                self.channels[(node, attr)] = DK_MISSING_ATTRIBUTE
+                continue
+            if is_locked:
+                self.channels[(node, attr)] = DK_CHANNEL_LOCKED
+            elif attr in connected:
+                self.channels[(node, attr)] = DK_CHANNEL_CONNECTED
+            else:
+                self.channels[(node, attr)] = DK_CHANNEL_OK
+
+    def _queryNodeCmds(self, node):
+        # Returns (attributes, locked attributes, attributes with an incoming connection) of node, as sets, or its state when it can not be keyed
+        if not cmds.objExists(node):
+            return DK_MISSING_NODE
+        try:
+            attributes = set(cmds.listAttr(node) or [])
+        except (RuntimeError, ValueError):
+            # More than one object matches the name
+            return DK_AMBIGUOUS_NODE
+        locked = set(cmds.listAttr(node, locked=True) or [])
+        # Pairs of destination plug (this node) and source plug
+        plugs = cmds.listConnections(node, s=True, d=False, c=True, p=True) or []
+        connected = set(plug.split(".", 1)[1] for plug in plugs[0::2])
+        return (attributes, locked, connected)
+
+
+class DkFastImport(object):
+    # Context manager of the fast import mode, see header. Every state it changes is restored on exit, including on
+    # cancel and on exceptions. Does nothing when enabled is False.
+
+    def __init__(self, enabled=True, name="dkAnimImport"):
+        self.enabled = enabled
+        self.name = name
+        self._restore = []
+
+    def __enter__(self):
+        if not self.enabled:
+            return self
+        cmds.undoInfo(openChunk=True, chunkName=self.name)
+        self._restore.append(lambda: cmds.undoInfo(closeChunk=True))
+        if cmds.autoKeyframe(q=True, state=True):
+            cmds.autoKeyframe(state=False)
+            self._restore.append(lambda: cmds.autoKeyframe(state=True))
+        # The evaluation manager is set back before the refresh
+        cmds.refresh(suspend=True)
+        self._restore.append(lambda: (cmds.refresh(suspend=False), cmds.refresh()))
+        mode = (cmds.evaluationManager(q=True, mode=True) or ["off"])[0]
+        if mode != "off":
+            cmds.evaluationManager(mode="off")
+            self._restore.append(lambda: cmds.evaluationManager(mode=mode))
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        # Restores in the reverse order, every state is restored even when one of them fails
+        errors = []
+        while self._restore:
+            try:
+                self._restore.pop()()
+            except RuntimeError as e:
+                errors.append(e)
+        if errors and exc_type is None:
+            raise errors[0]
+        return False
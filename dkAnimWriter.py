@@ -0,0 +1,279 @@
+##############################################################################################################
+#NAME: dkAnimWriter
+#AUTHOR: David Saber, www.dreamcraftdigital.com, based on Dan Erwin and Daniel Kramer's code.
+#SCRIPTING LANGUAGE: Python (no Maya import, can be used from any Python 3 interpreter)
+#USAGE: Writer for *.dkanim files, the counterpart of dkAnimParser : it writes the same DkSceneUnit, DkStatic and
+#       DkAnimCurve records. Each record is formatted in one pass and written with a single write call.
+#       Used by dkAnimEhEh.dk_animWrite.
+#       Incremental export (DkIncrementalTextWriter) : a hash of each curve is saved next to the file, in
+#       <file>.dkhash (see dk_saveCurveHashes). When the same file is exported again, the curves whose hash did not
+#       change are copied from the previous file by byte range, through its index, instead of being formatted again.
+#       The file is written next to the previous one and only replaces it, with its .dkhash, when the export is complete :
+#       a cancelled or failed export keeps the previous file and its hashes.
+#       Shared curves (share=True) : a curve identical to a curve written before it (see dk_payloadHash) is written as a
+#       reference to it, see the header of dkAnimParser. Opt-in : older readers skip the channels written as references.
+#       Compressed files do not share curves : reading a reference seeks back to its curve, which decompresses the file
+#       again from its start.
+##############################################################################################################
+
+
+# Imports
+import hashlib
+import json
+import os
+try:
+    from . import dkAnimParser
+except ImportError:
+    import dkAnimParser
+
+# Write buffer size of the file
+DK_WRITE_BUFFER = 1024 * 1024
+# Options of the codecs of dkAnimParser.DK_COMPRESSIONS, gzip level 6 compresses almost as well as 9 and much faster
+DK_COMPRESS_OPTIONS = {"gzip": {"compresslevel": 6}, "bz2": {"compresslevel": 9}, "xz": {"preset": 6}}
+# Version of the .dkhash files of the incremental export
+DK_HASH_VERSION = 1
+
+
+def dk_formatHeader(scene_name):
+    # Comment lines at the top of every .dkanim file
+    return ("#Generated by dkAnim script\n#\n#dkAnim written by Daniel Kramer danl_kramer@yahoo.com\n"
+            "#dkAnimErwin is a version of dkAnim by Dan Erwin - danimations@gmail.com\n"
+            "#dkAnimEhEh is a version of dkAnimErwin by David Saber - dreamcraftdigital.com\n"
+            "#Written out of {}\n#\n\n".format(scene_name))
+
+
+def dk_formatSceneUnit(scene_unit):
+    return "sceneUnit {}\n\n".format(scene_unit.unit)
+
+
+def dk_formatStatic(static):
+    return "static {0} {0} {1} {2} {3}\n".format(static.attr, static.node, static.parent, static.value)
+
+
+def dk_formatKeys(keys):
+    # Key lines of an animData block, angles and weights are only written for fixed tangents
+    lines = []
+    append = lines.append
+    for time, value, in_type, out_type, tan_lock, weight_lock, breakdown, in_angle, in_weight, out_angle, out_weight in keys:
+        if in_type == "fixed":
+            if out_type == "fixed":
+                append("    {} {} {} {} {} {} {} {} {} {} {};\n".format(time, value, in_type, out_type, tan_lock, weight_lock, breakdown, in_angle, in_weight, out_angle, out_weight))
+            else:
+                append("    {} {} {} {} {} {} {} {} {};\n".format(time, value, in_type, out_type, tan_lock, weight_lock, breakdown, in_angle, in_weight))
+        elif out_type == "fixed":
+            append("    {} {} {} {} {} {} {} {} {};\n".format(time, value, in_type, out_type, tan_lock, weight_lock, breakdown, out_angle, out_weight))
+        else:
+            append("    {} {} {} {} {} {} {};\n".format(time, value, in_type, out_type, tan_lock, weight_lock, breakdown))
+    return "".join(lines)
+
+
+def dk_formatReference(curve, source):
+    # animRef line of a curve sharing the keys of the curve written at offset source
+    return "animRef {0} {0} {1} {2} {3};\n".format(curve.attr, curve.node, curve.parent, source)
+
+
+def dk_payloadHash(curve):
+    # Hash of what identical curves share : keys, tangents, infinity and weighting
+    return hashlib.sha1(repr((curve.weighted, curve.preInfinity, curve.postInfinity, curve.keys)).encode("utf-8")).digest()
+
+
+def dk_formatCurve(curve):
+    # anim line and animData block of a DkAnimCurve
+    return "anim {0} {0} {1} {2} 0 0;\nanimData {{\n  weighted {3};\n  preInfinity {4};\n  postInfinity {5};\n  keys {{\n{6}  }}\n}}\n".format(
+        curve.attr, curve.node, curve.parent, curve.weighted, curve.preInfinity, curve.postInfinity, dk_formatKeys(curve.keys))
+
+
+class DkAnimTextWriter(object):
+    # Writes records to a binary stream and keeps track of the byte offset of each of them.
+    # share : identical curves are written once, see header
+
+    def __init__(self, stream, share=False):
+        self.stream = stream
+        self.offset = 0
+        # Index written at the end of the file, see dkAnimParser.dk_formatIndex
+        self.entries = []
+        # {payload hash: offset of the first curve written with it}, and the offsets referenced by animRef records
+        self.shared = {} if share else None
+        self.shared_offsets = set()
+        self.references = 0
+
+    def write(self, text):
+        # Writes text and returns its offset in the file
+        return self.writeBytes(text.encode("utf-8"))
+
+    def writeBytes(self, data):
+        offset = self.offset
+        self.stream.write(data)
+        self.offset += len(data)
+        return offset
+
+    def writeHeader(self, scene_name):
+        return self.write(dk_formatHeader(scene_name))
+
+    def sharedSource(self, record):
+        # Offset of the curve record shares its payload with, or None when it is the first one, which record is then
+        # expected to be written at the current offset
+        if self.shared is None:
+            return None
+        payload = dk_payloadHash(record)
+        source = self.shared.get(payload)
+        if source is None:
+            self.shared[payload] = self.offset
+        return source
+
+    def writeReference(self, record, source):
+        offset = self.write(dk_formatReference(record, source))
+        self.entries.append(dkAnimParser.DkIndexEntry(offset, self.offset - offset, "anim", record.keyCount, record.parent, record.attr, record.node))
+        self.shared_offsets.add(source)
+        self.references += 1
+        return offset
+
+    def writeRecord(self, record):
+        if record.kind == "anim":
+            source = self.sharedSource(record)
+            if source is not None:
+                return self.writeReference(record, source)
+            offset = self.write(dk_formatCurve(record))
+            self.entries.append(dkAnimParser.DkIndexEntry(offset, self.offset - offset, "anim", record.keyCount, record.parent, record.attr, record.node))
+        elif record.kind == "static":
+            offset = self.write(dk_formatStatic(record))
+            self.entries.append(dkAnimParser.DkIndexEntry(offset, self.offset - offset, "static", 0, record.parent, record.attr, record.node))
+        else:
+            offset = self.write(dk_formatSceneUnit(record))
+            self.entries.append(dkAnimParser.DkIndexEntry(offset, self.offset - offset, "sceneUnit", 0, 0, "", record.unit))
+        return offset
+
+    def close(self, success=True):
+        # Writes the index trailer, then closes the stream. success is False when the export was cancelled or failed, the
+        # records written so far are still a valid file.
+        index_offset = self.write("\n" + dkAnimParser.dk_formatIndex(self.entries, self.shared_offsets)) + 1
+        self.write("#dkIndexEnd {}\n".format(index_offset))
+        self.stream.close()
+
+
+def dk_curveHash(curve):
+    # Content hash of a DkAnimCurve : channel, parent flag, infinity, weighted flag, keys and tangents
+    data = (curve.node, curve.attr, curve.parent, curve.preInfinity, curve.postInfinity, curve.weighted, curve.keys)
+    return hashlib.sha1(repr(data).encode("utf-8")).hexdigest()
+
+
+def dk_hashFileName(filename):
+    return filename + ".dkhash"
+
+
+def dk_saveCurveHashes(filename, hashes):
+    # Writes the {"node.attr": hash} of the curves of filename to its .dkhash file, with the size and time of filename
+    stat = os.stat(filename)
+    with open(dk_hashFileName(filename), "w") as stream:
+        json.dump({"version": DK_HASH_VERSION, "size": stat.st_size, "mtime": stat.st_mtime, "curves": hashes}, stream)
+
+
+def dk_loadCurveHashes(filename):
+    # Returns the {"node.attr": hash} saved for filename, or None when there are none, or when filename changed since
+    try:
+        with open(dk_hashFileName(filename), "r") as stream:
+            saved = json.load(stream)
+        stat = os.stat(filename)
+    except (OSError, ValueError):
+        return None
+    if saved.get("version") != DK_HASH_VERSION or saved.get("size") != stat.st_size or saved.get("mtime") != stat.st_mtime:
+        return None
+    return saved.get("curves")
+
+
+class DkIncrementalTextWriter(DkAnimTextWriter):
+    # DkAnimTextWriter of the incremental export, see header. The file is written next to filename, and replaces it on close,
+    # when the export succeeded.
+    # The curves of the previous file whose hash did not change are copied from it, others are formatted.
+
+    def __init__(self, filename, share=False):
+        self.filename = filename
+        self.temp_filename = filename + ".tmp"
+        DkAnimTextWriter.__init__(self, open(self.temp_filename, "wb", buffering=DK_WRITE_BUFFER), share)
+        self.hashes = {}
+        self.copied = 0
+        self.formatted = 0
+        self.previous = None
+        self.previous_hashes = {}
+        self.previous_entries = {}
+        hashes = dk_loadCurveHashes(filename)
+        if hashes and dkAnimParser.dk_compression(filename) is None and not dkAnimParser.dk_isBinaryFile(filename):
+            previous = dkAnimParser.dk_openDkAnim(filename)
+            entries = dkAnimParser.dk_readTextIndex(previous)
+            if entries is None:
+                previous.close()
+            else:
+                self.previous = previous
+                self.previous_hashes = hashes
+                self.previous_entries = dict(("{}.{}".format(entry.node, entry.attr), entry) for entry in entries if entry.kind == "anim")
+
+    def writeRecord(self, record):
+        if record.kind != "anim":
+            return DkAnimTextWriter.writeRecord(self, record)
+        channel = "{}.{}".format(record.node, record.attr)
+        digest = self.hashes[channel] = dk_curveHash(record)
+        entry = self.previous_entries.get(channel)
+        if entry is not None and self.previous_hashes.get(channel) == digest:
+            self.previous.seek(entry.offset)
+            data = self.previous.read(entry.length)
+            # An animRef record refers to an offset of the previous file, it is written again
+            if data.startswith(b"anim "):
+                source = self.sharedSource(record)
+                if source is not None:
+                    return self.writeReference(record, source)
+                offset = self.writeBytes(data)
+                self.entries.append(dkAnimParser.DkIndexEntry(offset, entry.length, "anim", entry.keyCount, entry.parent, entry.attr, entry.node))
+                self.copied += 1
+                return offset
+        self.formatted += 1
+        return DkAnimTextWriter.writeRecord(self, record)
+
+    def close(self, success=True):
+        # success False : the partial file is deleted, the previous file and its hashes are kept
+        try:
+            if success:
+                DkAnimTextWriter.close(self)
+            else:
+                self.stream.close()
+        finally:
+            if self.previous is not None:
+                self.previous.close()
+        if not success:
+            os.remove(self.temp_filename)
+            return
+        os.replace(self.temp_filename, self.filename)
+        dk_saveCurveHashes(self.filename, self.hashes)
+
+
+def dk_openDkAnimWriter(filename, scene_name, binary=False, compression=None, incremental=False, share=False):
+    # Creates filename and writes the header, returns a DkAnimTextWriter, or a dkAnimBinary.DkAnimBinaryWriter if binary is True
+    # compression : None, or "gzip", "bz2" or "xz" to write a compressed text file, see dkAnimParser.DK_COMPRESSIONS
+    # incremental : True to return a DkIncrementalTextWriter, plain text files only
+    # share : True to write identical curves once, see header. Not with compression.
+    if incremental:
+        if binary or compression:
+            raise ValueError("The incremental export copies curves from the previous file by byte range, it only writes plain text files")
+        writer = DkIncrementalTextWriter(filename, share)
+        writer.writeHeader(scene_name)
+        return writer
+    if compression:
+        if share:
+            raise ValueError("Shared curves are read by seeking back to them, compressed files can not share curves")
+        if binary:
+            raise ValueError("Binary .dkanim files are read through mmap, they can not be compressed")
+        module = dkAnimParser.DK_COMPRESSIONS[compression][1]
+        if module is None:
+            raise ValueError("This Python can not write {} files".format(compression))
+        stream = module.open(filename, "wb", **DK_COMPRESS_OPTIONS[compression])
+    else:
+        stream = open(filename, "wb", buffering=DK_WRITE_BUFFER)
+    if binary:
+        try:
+            from . import dkAnimBinary
+        except ImportError:
+            import dkAnimBinary
+        writer = dkAnimBinary.DkAnimBinaryWriter(stream, share)
+    else:
+        writer = DkAnimTextWriter(stream, share)
+    writer.writeHeader(scene_name)
+    return writer